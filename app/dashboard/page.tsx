@@ -24,6 +24,7 @@ import { Input } from "@/components/ui/input";
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
 import { Badge } from "@/components/ui/badge";
 import { supabase } from '@/lib/supabase';
+import apiClient from '@/lib/api-client';
 import { useAuth } from '@/contexts/AuthContext';
 import { User, Session } from '@supabase/supabase-js';
 import {
@@ -292,56 +293,6 @@ export default function DashboardPage() {
     }
   };
 
-  // Calculate metrics for a habit
-  const calculateHabitMetrics = (habitId: string, logs: HabitLog[]): HabitMetrics => {
-    const habitLogs = logs.filter(log => log.habit_id === habitId);
-    const completedLogs = habitLogs.filter(log => log.status === 'completed');
-    
-    const totalSessions = completedLogs.length;
-    const totalDuration = completedLogs.reduce((sum, log) => sum + (log.duration || 0), 0);
-    
-    // Calculate current streak (consecutive days with completed logs)
-    let currentStreak = 0;
-    if (completedLogs.length > 0) {
-      const sortedLogs = completedLogs
-        .sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime());
-      
-      const today = new Date();
-      today.setHours(0, 0, 0, 0);
-      
-      let currentDate = today;
-      for (const log of sortedLogs) {
-        const logDate = new Date(log.date);
-        logDate.setHours(0, 0, 0, 0);
-        
-        const daysDiff = Math.floor((currentDate.getTime() - logDate.getTime()) / (1000 * 60 * 60 * 24));
-        
-        if (daysDiff <= 1) { // Same day or consecutive day
-          currentStreak++;
-          currentDate = logDate;
-        } else {
-          break; // Streak broken
-        }
-      }
-    }
-    
-    // Calculate completion rate
-    const completionRate = habitLogs.length > 0 ? (completedLogs.length / habitLogs.length) * 100 : 0;
-    
-    // Get last completed date
-    const lastCompleted = completedLogs.length > 0 
-      ? completedLogs.sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime())[0].date 
-      : undefined;
-    
-    return {
-      totalSessions,
-      totalDuration,
-      currentStreak,
-      completionRate,
-      lastCompleted
-    };
-  };
-
   // Get display text for habit metrics
   const getHabitMetricDisplay = (habit: TrackedHabit): string => {
     const metrics = habitMetrics[habit.id];
@@ -418,27 +369,31 @@ export default function DashboardPage() {
       
       setTrackedHabits(habitsData);
       
-      // Fetch habit logs for all habits
-      const logsResponse = await fetch(`${API_BASE_URL}/habit-logs`, {
+      // Fetch per-habit summary metrics computed server-side
+      const localToday = new Date();
+      const today = `${localToday.getFullYear()}-${String(localToday.getMonth() + 1).padStart(2, '0')}-${String(localToday.getDate()).padStart(2, '0')}`;
+      const metricsResponse = await fetch(`${API_BASE_URL}/habits/metrics?today=${today}`, {
         method: 'GET',
         headers,
       });
       
-      if (!logsResponse.ok) {
-        const errorText = await logsResponse.text();
-        console.error('❌ API Error fetching logs:', logsResponse.status, errorText);
-        throw new Error(`API Error: ${logsResponse.status} - ${errorText}`);
+      if (!metricsResponse.ok) {
+        const errorText = await metricsResponse.text();
+        console.error('❌ API Error fetching metrics:', metricsResponse.status, errorText);
+        throw new Error(`API Error: ${metricsResponse.status} - ${errorText}`);
       }
       
-      const logsData = await logsResponse.json();
-      console.log('✅ Habit logs fetched successfully:', logsData);
+      const metricsData = await metricsResponse.json();
       
-      // Calculate metrics for each habit using real log data
       const newMetrics: Record<string, HabitMetrics> = {};
-      habitsData.forEach((habit: TrackedHabit) => {
-        const metrics = calculateHabitMetrics(habit.id, logsData);
-        console.log(`📊 Metrics for ${habit.name}:`, metrics);
-        newMetrics[habit.id] = metrics;
+      metricsData.forEach((metrics: any) => {
+        newMetrics[metrics.habit_id] = {
+          totalSessions: metrics.total_sessions,
+          totalDuration: metrics.total_duration,
+          currentStreak: metrics.current_streak,
+          completionRate: metrics.completion_rate,
+          lastCompleted: metrics.last_completed ?? undefined,
+        };
       });
       setHabitMetrics(newMetrics);
       
@@ -491,11 +446,22 @@ export default function DashboardPage() {
       window.addEventListener('ritual-timer-updated', handleTimerUpdate);
     }
 
-    // Poll for Swift widget updates (check trigger file)
+    // Sessions saved by the Swift widget arrive as server events. Only while the
+    // event stream is down do we fall back to polling the widget's trigger file.
     let pollInterval: NodeJS.Timeout | null = null;
     let lastTriggerTime = 0;
-    
-    if (typeof window !== 'undefined') {
+
+    const stopPolling = () => {
+      if (pollInterval) {
+        clearInterval(pollInterval);
+        pollInterval = null;
+      }
+    };
+
+    const startPolling = () => {
+      if (pollInterval || typeof window === 'undefined') {
+        return;
+      }
       pollInterval = setInterval(async () => {
         try {
           // Check if running in Tauri
@@ -513,16 +479,21 @@ export default function DashboardPage() {
           // Silently ignore errors - polling is best effort
         }
       }, 2000); // Check every 2 seconds
-    }
+    };
+
+    startPolling();
+    const unsubscribe = apiClient.events.subscribe(
+      handleTimerUpdate,
+      (open) => (open ? stopPolling() : startPolling())
+    );
 
     return () => {
       if (typeof window !== 'undefined') {
         window.removeEventListener('storage', handleTimerUpdate);
         window.removeEventListener('ritual-timer-updated', handleTimerUpdate);
       }
-      if (pollInterval) {
-        clearInterval(pollInterval);
-      }
+      unsubscribe();
+      stopPolling();
     };
   }, [fetchTrackedHabits]);
 
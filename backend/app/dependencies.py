@@ -1,73 +1,118 @@
 # app/dependencies.py
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from supabase import create_client, Client
 from app.utils.supabase import get_supabase_client, get_supabase_admin_client
+from app.utils.cache import profile_cache
+from app.utils.jwt_verifier import get_jwt_verifier, SigningKeyUnavailable, TokenVerificationError, SUPABASE_AUTH_REMOTE_FALLBACK
 from app.models.user import Profile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.utils.database import get_db  # or however you import your DB session
+from app.utils.database import get_db, get_async_db  # or however you import your DB session
+from app.utils.log import get_logger
 import requests
+import uuid
+from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
-def debug_get_token(token: str = Depends(oauth2_scheme)):
-    """Debug function to see if OAuth2PasswordBearer is working"""
-    print(f"🔧 [DEBUG] OAuth2PasswordBearer extracted token: {token[:20] if token and len(token) > 20 else token}")
-    
-    # Try to decode token to see its claims (without verification)
+logger = get_logger("auth")
+
+def _parse_user_id(subject) -> uuid.UUID:
+    # Profile ids are UUID columns; binding a str to them fails on SQLite
     try:
-        import jwt
-        decoded = jwt.decode(token, options={"verify_signature": False})
-        print(f"🔧 [DEBUG] Token claims: {list(decoded.keys())}")
-        print(f"🔧 [DEBUG] Has 'sub' claim: {'sub' in decoded}")
-        if 'sub' in decoded:
-            print(f"🔧 [DEBUG] Subject: {decoded['sub']}")
-    except Exception as e:
-        print(f"🔧 [DEBUG] Could not decode token: {e}")
-    
-    return token
+        return uuid.UUID(str(subject))
+    except ValueError as e:
+        raise TokenVerificationError(f"Token subject is not a user id: {subject!r}") from e
 
-def get_current_user(
-    token: str = Depends(debug_get_token),
-    supabase: Client = Depends(get_supabase_client),
-    db: Session = Depends(get_db)
-) -> Profile:
+async def _resolve_user_id(token: str) -> uuid.UUID:
+    """
+    Return the user id for a token, verifying it locally when a signing key is available
+    """
     try:
-        print(f"🔐 [DEBUG] Received token: {token[:20]}..." if len(token) > 20 else token)
-        
-        # Validate token with Supabase
-        user_response = supabase.auth.get_user(token)
-        user_data = user_response.user
-        
-        print(f"🔐 [DEBUG] Supabase response: {user_data is not None}")
-        print(f"🔐 [DEBUG] User ID: {user_data.id if user_data else 'None'}")
+        claims = await get_jwt_verifier().verify(token)
+        return _parse_user_id(claims["sub"])
+    except SigningKeyUnavailable as e:
+        if not SUPABASE_AUTH_REMOTE_FALLBACK:
+            raise
+        logger.info("Local token verification unavailable, asking Supabase: %s", e)
+
+    # Fallback: validate token with Supabase
+    supabase = get_supabase_client()
+    user_response = await run_in_threadpool(supabase.auth.get_user, token)
+    user_data = user_response.user
+
+    if not user_data or not user_data.id:
+        logger.warning("Supabase rejected the access token")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _parse_user_id(user_data.id)
 
-        if not user_data or not user_data.id:
-            print("❌ [DEBUG] Invalid user data from Supabase")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Profile:
+    try:
+        user_id = await _resolve_user_id(token)
 
-        # Fetch from your `profiles` table
-        user_id = user_data.id
-        user = db.query(Profile).filter(Profile.id == user_id).first()
-        
-        print(f"🔐 [DEBUG] Profile found in DB: {user is not None}")
+        # Profiles rarely change, so serve them from the per-process cache
+        user = profile_cache.get(user_id)
+        if user is None:
+            # Fetch from your `profiles` table
+            result = await db.execute(select(Profile).where(Profile.id == user_id))
+            user = result.scalars().first()
 
-        if not user:
-            print(f"❌ [DEBUG] User {user_id} not found in profiles table")
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found in profiles table"
-            )
+            if not user:
+                logger.warning("User %s not found in profiles table", user_id)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found in profiles table"
+                )
+            user = profile_cache.put(user)
+            logger.debug("Profile for %s loaded from database", user_id)
 
-        print(f"✅ [DEBUG] Authentication successful for user: {user_id}")
+        logger.debug("Authenticated %s", user_id)
         return user
 
     except Exception as e:
-        print(f"[get_current_user] Auth error: {e}")
+        logger.info("Authentication failed: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+async def get_stream_user_id(
+    request: Request,
+    access_token: Optional[str] = Query(None, description="Access token, for clients such as EventSource that cannot set headers")
+) -> str:
+    """
+    User id for long-lived streams, from the Authorization header or the access_token query parameter.
+
+    Unlike get_current_user this does not open a database session, which would
+    otherwise stay checked out for as long as the stream is open.
+    """
+    token = access_token
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return str(await _resolve_user_id(token))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.info("Stream authentication failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -1,7 +1,28 @@
 # app/main.py
-from fastapi import FastAPI
+import os
+import secrets
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import all_routers
+from app.utils.cache import profile_cache
+from app.utils.streaks import streak_index
+from app.utils.database import async_engine, engine, get_pool_stats
+from app.utils.etags import listing_versions
+from app.utils.events import event_broker
+from app.utils.ingest import ingest_buffer
+from app.utils.log import RequestIdMiddleware, configure_logging, get_logging_stats
+from app.utils.palette_search import palette_indexes, palette_snapshots
+from app.utils.query_stats import QueryStatsMiddleware, get_query_stats, instrument
+from app.utils.supabase import get_supabase_registry
+from app.utils.timers import heartbeat_buffer
+
+configure_logging()
+
+# /debug/stats exposes pool, cache and SQL internals: only served when a token is configured,
+# and only to callers presenting it in X-Debug-Token
+DEBUG_STATS_TOKEN = os.getenv("DEBUG_STATS_TOKEN")
 
 app = FastAPI(
     title="Ritual API",
@@ -15,11 +36,76 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend read ETags for conditional requests, per-request DB timings and request ids
+    expose_headers=["ETag", "Server-Timing", "X-Request-ID"],
 )
 
+# Count SQL statements per request (Server-Timing, slow query and N+1 logging, query budgets)
+instrument(engine, async_engine.sync_engine)
+app.add_middleware(QueryStatsMiddleware)
+# Added last so it is outermost: every log record of a request, SQL warnings included, carries its id
+app.add_middleware(RequestIdMiddleware)
+
 for router, prefix in all_routers:
     app.include_router(router, prefix=prefix)
 
+@app.on_event("startup")
+def open_supabase_clients():
+    get_supabase_registry().start()
+
+@app.on_event("startup")
+async def start_ingest_flusher():
+    ingest_buffer.start()
+
+@app.on_event("startup")
+async def start_event_broker():
+    event_broker.start()
+
+@app.on_event("startup")
+async def start_heartbeat_flusher():
+    heartbeat_buffer.start()
+
+@app.on_event("shutdown")
+def close_supabase_clients():
+    get_supabase_registry().close()
+
+# Registered before close_async_engine so buffered samples are written while the engine is still open
+@app.on_event("shutdown")
+async def stop_ingest_flusher():
+    await ingest_buffer.stop()
+
+@app.on_event("shutdown")
+async def stop_heartbeat_flusher():
+    await heartbeat_buffer.stop()
+
+@app.on_event("shutdown")
+async def stop_event_broker():
+    await event_broker.stop()
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    await async_engine.dispose()
+
 @app.get("/")
 def read_root():
     return {"message": "Ritual API is running"}
+
+@app.get("/debug/stats", include_in_schema=False)
+def read_stats(x_debug_token: Optional[str] = Header(None)):
+    """In-process cache, connection, SQL, ingest, event stream, timer, ETag, logging and palette index statistics for this worker"""
+    if not DEBUG_STATS_TOKEN or not x_debug_token or not secrets.compare_digest(x_debug_token, DEBUG_STATS_TOKEN):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {
+        "profile_cache": profile_cache.stats(),
+        "streak_cache": streak_index.stats(),
+        "supabase": get_supabase_registry().stats(),
+        "db_pool": get_pool_stats(),
+        "ingest": ingest_buffer.stats(),
+        "events": event_broker.stats(),
+        "timers": heartbeat_buffer.stats(),
+        "etag_versions": listing_versions.stats(),
+        "sql": get_query_stats(),
+        "logging": get_logging_stats(),
+        "palette_indexes": palette_indexes.stats(),
+        "palette_snapshots": palette_snapshots.stats(),
+    }
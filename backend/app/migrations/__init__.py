@@ -0,0 +1,140 @@
+"""
+Versioned schema migrations
+
+Each module in `app.migrations.versions` is named `NNNN_description.py` and
+defines `upgrade(connection)`. Applied versions are recorded in the
+`schema_migrations` table, and every migration runs in its own transaction.
+Migrations are written to be idempotent (create-if-missing) so they can be
+applied both to fresh SQLite files and to Supabase databases whose tables
+already exist.
+
+A migration is frozen once it ships: it declares the tables and columns it
+creates on its own MetaData and carries its own data backfills, instead of
+using the live models (`Model.__table__`) or app helpers, which change as the
+schema moves on. Replaying the migrations therefore always builds the same
+schema, version by version.
+"""
+
+import importlib
+import pkgutil
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from types import ModuleType
+from typing import List, Optional, Set
+
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, inspect, insert, select, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from app.migrations import versions
+from app.utils.log import get_logger
+
+logger = get_logger("migrations")
+
+_migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    module: ModuleType
+
+    def upgrade(self, connection: Connection) -> None:
+        self.module.upgrade(connection)
+
+
+def discover_migrations() -> List[Migration]:
+    """
+    Return all migrations in version order
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(versions.__path__):
+        prefix, _, name = module_info.name.partition("_")
+        if not prefix.isdigit():
+            continue
+        module = importlib.import_module(f"{versions.__name__}.{module_info.name}")
+        migrations.append(Migration(version=int(prefix), name=name, module=module))
+
+    migrations.sort(key=lambda m: m.version)
+    seen = set()
+    for migration in migrations:
+        if migration.version in seen:
+            raise RuntimeError(f"Duplicate migration version {migration.version:04d}")
+        seen.add(migration.version)
+    return migrations
+
+
+def applied_versions(connection: Connection) -> Set[int]:
+    schema_migrations.create(connection, checkfirst=True)
+    return {row[0] for row in connection.execute(select(schema_migrations.c.version))}
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as connection:
+        return max(applied_versions(connection), default=0)
+
+
+def run_migrations(engine: Engine, target: Optional[int] = None) -> List[Migration]:
+    """
+    Apply every pending migration up to `target` (default: latest)
+    """
+    with engine.begin() as connection:
+        done = applied_versions(connection)
+
+    applied = []
+    for migration in discover_migrations():
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_migrations).values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.now(timezone.utc),
+            ))
+        logger.info("Applied %04d_%s", migration.version, migration.name)
+        applied.append(migration)
+    return applied
+
+
+# Operations available to migration modules
+
+def referenced_tables(metadata: MetaData, *names: str) -> None:
+    """
+    Declare tables that a migration's foreign keys point at (by their UUID "id") without creating them
+    """
+    for name in names:
+        if name not in metadata.tables:
+            Table(name, metadata, Column("id", UUID(as_uuid=True), primary_key=True))
+
+
+def create_table(connection: Connection, table: Table) -> None:
+    table.create(connection, checkfirst=True)
+
+
+def create_index(connection: Connection, index: Index) -> None:
+    index.create(connection, checkfirst=True)
+
+
+def drop_index(connection: Connection, table_name: str, index_name: str) -> None:
+    existing = {ix["name"] for ix in inspect(connection).get_indexes(table_name)}
+    if index_name in existing:
+        connection.execute(text(f"DROP INDEX {index_name}"))
+
+
+def add_column(connection: Connection, table_name: str, column: Column) -> None:
+    existing = {col["name"] for col in inspect(connection).get_columns(table_name)}
+    if column.name in existing:
+        return
+    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
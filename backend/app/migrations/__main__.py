@@ -0,0 +1,54 @@
+"""
+Command line entry point for schema migrations
+
+    python -m app.migrations upgrade [--target N]
+    python -m app.migrations current
+    python -m app.migrations explain
+"""
+
+import argparse
+import sys
+
+from app.migrations import current_version, discover_migrations, run_migrations
+from app.migrations.explain import check_hot_queries
+from app.utils.database import engine
+from app.utils.log import configure_logging
+
+
+def explain_hot_queries() -> bool:
+    """
+    Print the query plan of each hot query and whether it uses its index
+    """
+    with engine.connect() as connection:
+        checks = check_hot_queries(connection)
+    for check in checks:
+        print(f"{'OK  ' if check.uses_index else 'MISS'} {check.description} -> {' | '.join(check.indexes)}")
+        for line in check.plan.splitlines():
+            print(f"       {line}")
+    return all(check.uses_index for check in checks)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrations", description="Ritual schema migrations")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    upgrade = subcommands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade.add_argument("--target", type=int, default=None, help="Stop after this version")
+    subcommands.add_parser("current", help="Show the applied schema version")
+    subcommands.add_parser("explain", help="Check that the hot queries use their indexes")
+    args = parser.parse_args(argv)
+    # "Applied NNNN_name" lines come through the migrations logger
+    configure_logging()
+
+    if args.command == "upgrade":
+        applied = run_migrations(engine, target=args.target)
+        print(f"Schema at version {current_version(engine):04d} ({len(applied)} applied)")
+    elif args.command == "current":
+        latest = max((m.version for m in discover_migrations()), default=0)
+        print(f"Schema at version {current_version(engine):04d} (latest {latest:04d})")
+    elif args.command == "explain":
+        return 0 if explain_hot_queries() else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+EXPLAIN the hot list queries and check that each one uses its index
+
+The statements are the ones the routes run (built by the same functions), so
+a change to a route's query is checked against the indexes the migrations
+create.
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.elements import ClauseElement
+
+from app.routes.habit import habits_query
+from app.routes.habit_data_integration import data_page_query
+from app.routes.habit_log import logs_page_query
+from app.routes.sync import changes_query
+from app.utils.events import poll_query
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (EXPLAIN QUERY PLAN on SQLite) of a statement, with its parameters bound as usual
+    """
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    prefix = "EXPLAIN QUERY PLAN " if compiler.dialect.name == "sqlite" else "EXPLAIN "
+    return prefix + compiler.process(element.statement, **kw)
+
+
+_USER = uuid.UUID(int=1)
+_HABIT = uuid.UUID(int=2)
+_OTHER_USER = uuid.UUID(int=3)
+
+# (description, statement builder, indexes the planner may pick)
+HOT_QUERIES: List[Tuple[str, Callable, Tuple[str, ...]]] = [
+    (
+        "GET /habit-logs (date range, next page)",
+        lambda: logs_page_query(_USER, start_date=date(2020, 1, 1), after=(date(2024, 1, 1), _HABIT)),
+        ("ix_habit_logs_user_id_date",),
+    ),
+    (
+        "GET /habit-logs?habit_id (next page)",
+        lambda: logs_page_query(_USER, habit_id=_HABIT, after=(date(2024, 1, 1), _HABIT)),
+        ("ix_habit_logs_habit_id_date", "ix_habit_logs_user_id_date"),
+    ),
+    (
+        "GET /habit-data (next page)",
+        lambda: data_page_query(_USER, after=(datetime(2024, 1, 1, tzinfo=timezone.utc), _HABIT)),
+        ("ix_habit_data_integrations_user_id_timestamp",),
+    ),
+    (
+        "GET /habits",
+        lambda: habits_query(_USER),
+        ("ix_habits_user_id",),
+    ),
+    (
+        "GET /sync",
+        lambda: changes_query(_USER, after=0, limit=1000),
+        ("ix_change_log_user_id_seq",),
+    ),
+    (
+        "GET /events poll (changelog broker)",
+        lambda: poll_query({_USER: 10, _OTHER_USER: 20}),
+        ("ix_change_log_user_id_seq",),
+    ),
+]
+
+
+@dataclass
+class PlanCheck:
+    description: str
+    indexes: Tuple[str, ...]
+    plan: str
+
+    @property
+    def uses_index(self) -> bool:
+        return any(index in self.plan for index in self.indexes)
+
+
+def check_hot_queries(connection: Connection) -> List[PlanCheck]:
+    if connection.dialect.name != "sqlite":
+        # Tiny tables make a sequential scan cheaper; we only want to know the index is usable
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+    checks = []
+    for description, build, indexes in HOT_QUERIES:
+        # Read the plan straight off the cursor: the result columns are the explained query's, not the plan's
+        rows = connection.execute(Explain(build())).cursor.fetchall()
+        checks.append(PlanCheck(description, indexes, "\n".join(str(row[-1]) for row in rows)))
+    return checks
@@ -0,0 +1,101 @@
+"""
+Baseline tables that previously came from Base.metadata.create_all
+"""
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Enum, ForeignKey, Integer, MetaData, Numeric, String, Table, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table
+
+metadata = MetaData()
+
+profiles = Table(
+    "profiles", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("email", String),
+    Column("full_name", String),
+    Column("birth_year", Integer),
+    Column("gender", String),
+    Column("country", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+habits = Table(
+    "habits", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE")),
+    Column("name", String, nullable=False),
+    Column("category", Enum("manual", "wearable", name="habit_category"), nullable=False),
+    Column("integration_source", String),
+    Column("unit_type", String),
+    Column("target_duration", Integer),
+    Column("is_custom", Boolean),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Column("icon", String, nullable=True),
+)
+
+habit_logs = Table(
+    "habit_logs", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("habit_id", UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE")),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE")),
+    Column("date", Date, nullable=False),
+    Column("duration", Integer),
+    Column("amount", Numeric),
+    Column("unit", String),
+    Column("status", Enum("completed", "skipped", "missed", name="habit_status")),
+    Column("notes", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+habit_units = Table(
+    "habit_units", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("type", String, unique=True, nullable=False),
+    Column("default_unit", String, nullable=False),
+    Column("allowed_units", String, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+predefined_habits = Table(
+    "predefined_habits", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("name", String, nullable=False),
+    Column("type", Enum("manual", "wearable", name="predefined_habit_type")),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+subscriptions = Table(
+    "subscriptions", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE")),
+    Column("plan", Enum("free", "trial", "core", name="subscription_plan"), nullable=False),
+    Column("status", Enum("active", "expired", "cancelled", name="subscription_status"), nullable=False),
+    Column("is_trial", Boolean),
+    Column("start_date", DateTime(timezone=True), nullable=False),
+    Column("end_date", DateTime(timezone=True)),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+habit_data_integrations = Table(
+    "habit_data_integrations", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("habit_id", UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE")),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE")),
+    Column("source", String, nullable=False),
+    Column("metric_name", String, nullable=False),
+    Column("value", Numeric, nullable=False),
+    Column("unit", String),
+    Column("timestamp", DateTime(timezone=True), nullable=False),
+    Column("extra_data", Text),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+TABLES = (profiles, habits, habit_logs, habit_units, predefined_habits, subscriptions, habit_data_integrations)
+
+
+def upgrade(connection):
+    for table in TABLES:
+        create_table(connection, table)
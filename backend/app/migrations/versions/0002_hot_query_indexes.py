@@ -0,0 +1,36 @@
+"""
+Composite indexes for the /habits, /habit-logs and /habit-data list queries
+"""
+
+from sqlalchemy import Column, Date, DateTime, Index, MetaData, Table
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_index
+
+metadata = MetaData()
+
+# Only the indexed columns; the tables exist since 0001
+habits = Table("habits", metadata, Column("user_id", UUID(as_uuid=True)))
+habit_logs = Table(
+    "habit_logs", metadata,
+    Column("user_id", UUID(as_uuid=True)),
+    Column("habit_id", UUID(as_uuid=True)),
+    Column("date", Date),
+)
+habit_data_integrations = Table(
+    "habit_data_integrations", metadata,
+    Column("user_id", UUID(as_uuid=True)),
+    Column("timestamp", DateTime(timezone=True)),
+)
+
+INDEXES = (
+    Index("ix_habit_logs_user_id_date", habit_logs.c.user_id, habit_logs.c.date),
+    Index("ix_habit_logs_habit_id_date", habit_logs.c.habit_id, habit_logs.c.date),
+    Index("ix_habit_data_integrations_user_id_timestamp", habit_data_integrations.c.user_id, habit_data_integrations.c.timestamp),
+    Index("ix_habits_user_id", habits.c.user_id),
+)
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index(connection, index)
@@ -0,0 +1,56 @@
+"""
+habit_daily_rollups table, backfilled from existing habit_logs
+"""
+
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, Numeric, String, Table, case, delete, func, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles", "habits")
+
+habit_daily_rollups = Table(
+    "habit_daily_rollups", metadata,
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("habit_id", UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("log_count", Integer, nullable=False),
+    Column("completed_count", Integer, nullable=False),
+    Column("total_duration", Integer, nullable=False),
+    Column("total_amount", Numeric, nullable=False),
+)
+
+# The columns of habit_logs the backfill reads
+habit_logs = Table(
+    "habit_logs", MetaData(),
+    Column("id", UUID(as_uuid=True)),
+    Column("user_id", UUID(as_uuid=True)),
+    Column("habit_id", UUID(as_uuid=True)),
+    Column("date", Date),
+    Column("duration", Integer),
+    Column("amount", Numeric),
+    Column("status", String),
+)
+
+
+def upgrade(connection):
+    create_table(connection, habit_daily_rollups)
+
+    # Rebuild every rollup row from the logs: totals count completed logs only
+    logs = habit_logs.c
+    completed = logs.status == "completed"
+    aggregate = select(
+        logs.user_id,
+        logs.habit_id,
+        logs.date,
+        func.count(logs.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((completed, func.coalesce(logs.duration, 0)), else_=0)),
+        func.sum(case((completed, func.coalesce(logs.amount, 0)), else_=0)),
+    ).where(logs.user_id.isnot(None), logs.habit_id.isnot(None)).group_by(logs.user_id, logs.habit_id, logs.date)
+    connection.execute(delete(habit_daily_rollups))
+    connection.execute(habit_daily_rollups.insert().from_select(
+        ["user_id", "habit_id", "day", "log_count", "completed_count", "total_duration", "total_amount"],
+        aggregate,
+    ))
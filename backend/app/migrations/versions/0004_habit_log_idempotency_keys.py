@@ -0,0 +1,21 @@
+"""
+habit_logs.idempotency_key for retry-safe bulk ingestion
+"""
+
+from sqlalchemy import Column, Index, MetaData, String, Table
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import add_column, create_index
+
+habit_logs = Table(
+    "habit_logs", MetaData(),
+    Column("user_id", UUID(as_uuid=True)),
+    Column("idempotency_key", String(64)),
+)
+
+
+def upgrade(connection):
+    add_column(connection, habit_logs.name, habit_logs.c.idempotency_key)
+    create_index(connection, Index(
+        "ux_habit_logs_user_id_idempotency_key", habit_logs.c.user_id, habit_logs.c.idempotency_key, unique=True,
+    ))
@@ -0,0 +1,87 @@
+"""
+habit_data_rollups table, built from existing habit_data_integrations samples
+"""
+
+from datetime import timezone
+from decimal import Decimal
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Numeric, String, Table, delete, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles")
+
+habit_data_rollups = Table(
+    "habit_data_rollups", metadata,
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True),
+    Column("metric_name", String, primary_key=True),
+    Column("resolution", String(8), primary_key=True),
+    Column("bucket_start", DateTime(timezone=True), primary_key=True),
+    Column("sample_count", Integer, nullable=False),
+    Column("value_sum", Numeric, nullable=False),
+    Column("value_min", Numeric, nullable=False),
+    Column("value_max", Numeric, nullable=False),
+)
+
+# The columns of habit_data_integrations the backfill reads
+habit_data_integrations = Table(
+    "habit_data_integrations", MetaData(),
+    Column("user_id", UUID(as_uuid=True)),
+    Column("metric_name", String),
+    Column("value", Numeric),
+    Column("timestamp", DateTime(timezone=True)),
+)
+
+_INSERT_CHUNK = 1000
+
+
+def _bucket_start(timestamp, resolution):
+    # UTC hour or day; naive timestamps are taken as UTC
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    timestamp = timestamp.astimezone(timezone.utc)
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def upgrade(connection):
+    create_table(connection, habit_data_rollups)
+
+    # [count, sum, min, max] per (user, metric, resolution, bucket) over every sample
+    buckets = {}
+    raw = habit_data_integrations.c
+    result = connection.execution_options(yield_per=10000).execute(
+        select(raw.user_id, raw.metric_name, raw.value, raw.timestamp).where(raw.user_id.isnot(None))
+    )
+    for user_id, metric_name, value, timestamp in result:
+        value = Decimal(str(value))
+        for resolution in ("hour", "day"):
+            key = (user_id, metric_name, resolution, _bucket_start(timestamp, resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, value, value, value]
+            else:
+                bucket[0] += 1
+                bucket[1] += value
+                bucket[2] = min(bucket[2], value)
+                bucket[3] = max(bucket[3], value)
+
+    rows = [
+        {
+            "user_id": user_id,
+            "metric_name": metric_name,
+            "resolution": resolution,
+            "bucket_start": start,
+            "sample_count": count,
+            "value_sum": total,
+            "value_min": low,
+            "value_max": high,
+        }
+        for (user_id, metric_name, resolution, start), (count, total, low, high) in buckets.items()
+    ]
+    connection.execute(delete(habit_data_rollups))
+    for start in range(0, len(rows), _INSERT_CHUNK):
+        connection.execute(habit_data_rollups.insert(), rows[start:start + _INSERT_CHUNK])
@@ -0,0 +1,33 @@
+"""
+import_jobs table for resumable wearable export imports
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles")
+
+import_jobs = Table(
+    "import_jobs", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), index=True),
+    Column("source", String, nullable=False),
+    Column("file_path", String, nullable=False),
+    Column("options", Text),
+    Column("status", String, nullable=False),
+    Column("records_processed", BigInteger, nullable=False),
+    Column("samples_imported", BigInteger, nullable=False),
+    Column("logs_imported", Integer, nullable=False),
+    Column("bytes_total", BigInteger),
+    Column("bytes_processed", BigInteger, nullable=False),
+    Column("error", Text),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def upgrade(connection):
+    create_table(connection, import_jobs)
@@ -0,0 +1,44 @@
+"""
+change_log table, seeded with an upsert for every existing habit and habit log
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, func, literal, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles")
+
+change_log = Table(
+    "change_log", metadata,
+    Column("seq", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False),
+    Column("entity", String(16), nullable=False),
+    Column("entity_id", UUID(as_uuid=True), nullable=False),
+    Column("op", String(8), nullable=False),
+    Column("changed_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_change_log_user_id_seq", "user_id", "seq"),
+    Index("ix_change_log_entity_entity_id", "entity", "entity_id"),
+)
+
+# The columns of the synced tables the seed reads
+_synced = MetaData()
+SYNCED = (
+    (Table("habits", _synced, Column("id", UUID(as_uuid=True)), Column("user_id", UUID(as_uuid=True)), Column("created_at", DateTime(timezone=True))), "habit"),
+    (Table("habit_logs", _synced, Column("id", UUID(as_uuid=True)), Column("user_id", UUID(as_uuid=True)), Column("created_at", DateTime(timezone=True))), "habit_log"),
+)
+
+
+def upgrade(connection):
+    create_table(connection, change_log)
+    # A client syncing from the start then receives everything that already exists
+    for table, entity in SYNCED:
+        connection.execute(
+            change_log.insert().from_select(
+                ["user_id", "entity", "entity_id", "op"],
+                select(table.c.user_id, literal(entity), table.c.id, literal("upsert"))
+                .where(table.c.user_id.isnot(None))
+                .order_by(table.c.created_at),
+            )
+        )
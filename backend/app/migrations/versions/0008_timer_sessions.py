@@ -0,0 +1,33 @@
+"""
+timer_sessions table for server-side timers
+"""
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles", "habits", "habit_logs")
+
+timer_sessions = Table(
+    "timer_sessions", metadata,
+    Column("id", UUID(as_uuid=True), primary_key=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False),
+    Column("habit_id", UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), nullable=False),
+    Column("status", String(16), nullable=False),
+    Column("started_at", DateTime(timezone=True), nullable=False),
+    Column("segment_started_at", DateTime(timezone=True)),
+    Column("accumulated_seconds", Integer, nullable=False),
+    Column("last_heartbeat_at", DateTime(timezone=True)),
+    Column("ended_at", DateTime(timezone=True)),
+    Column("habit_log_id", UUID(as_uuid=True), ForeignKey("habit_logs.id", ondelete="SET NULL")),
+    Column("notes", String),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_timer_sessions_user_id_status", "user_id", "status"),
+)
+
+
+def upgrade(connection):
+    create_table(connection, timer_sessions)
@@ -0,0 +1,19 @@
+"""
+scope_versions table: shared version counters for per-worker caches
+"""
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table
+
+from app.migrations import create_table
+
+metadata = MetaData()
+
+scope_versions = Table(
+    "scope_versions", metadata,
+    Column("scope", String(128), primary_key=True),
+    Column("version", BigInteger, nullable=False),
+)
+
+
+def upgrade(connection):
+    create_table(connection, scope_versions)
@@ -0,0 +1,60 @@
+"""
+Rebuild change_log on SQLite with AUTOINCREMENT, so a seq is never handed out twice
+
+record_changes replaces a row's change with a delete and an insert. A plain
+INTEGER PRIMARY KEY gives the insert max(rowid) + 1, which is the deleted
+row's seq when that row was the newest, so a client already synced to it
+skipped the change. PostgreSQL sequences never go back; nothing to do there.
+"""
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.migrations import create_table, drop_index, referenced_tables
+
+metadata = MetaData()
+referenced_tables(metadata, "profiles")
+
+COLUMNS = ("seq", "user_id", "entity", "entity_id", "op", "changed_at")
+INDEXES = ("ix_change_log_user_id_seq", "ix_change_log_entity_entity_id")
+
+change_log = Table(
+    "change_log", metadata,
+    Column("seq", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("user_id", UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False),
+    Column("entity", String(16), nullable=False),
+    Column("entity_id", UUID(as_uuid=True), nullable=False),
+    Column("op", String(8), nullable=False),
+    Column("changed_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_change_log_user_id_seq", "user_id", "seq"),
+    Index("ix_change_log_entity_entity_id", "entity", "entity_id"),
+    sqlite_autoincrement=True,
+)
+
+# The table as 0007 created it, renamed while its rows are copied
+_previous = MetaData()
+previous_change_log = Table(
+    "change_log_previous", _previous,
+    *(Column(name) for name in COLUMNS),
+)
+
+
+def upgrade(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    ddl = connection.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'change_log'")
+    ).scalar()
+    if ddl is None or "AUTOINCREMENT" in ddl.upper():
+        return
+
+    # SQLite cannot add AUTOINCREMENT to an existing table: rename, recreate, copy
+    connection.execute(text(f"ALTER TABLE change_log RENAME TO {previous_change_log.name}"))
+    for index_name in INDEXES:
+        drop_index(connection, previous_change_log.name, index_name)
+    create_table(connection, change_log)
+    # Copying the seqs also starts the AUTOINCREMENT counter after the highest one
+    connection.execute(
+        change_log.insert().from_select(list(COLUMNS), select(*(previous_change_log.c[name] for name in COLUMNS)))
+    )
+    previous_change_log.drop(connection)
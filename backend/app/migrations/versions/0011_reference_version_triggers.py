@@ -0,0 +1,52 @@
+"""
+Triggers bumping scope_versions on every write to habit_units and predefined_habits
+
+Both tables are reference data maintained outside the API (seeds, the Supabase
+dashboard), so no route could bump their listing's version. A trigger bumps it
+in the writing transaction, whoever the writer is.
+"""
+
+from sqlalchemy import text
+
+TABLES = ("habit_units", "predefined_habits")
+
+_POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_scope_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO scope_versions (scope, version) VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (scope) DO UPDATE SET version = scope_versions.version + 1;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _postgres(connection, table):
+    connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_scope_version ON {table}"))
+    connection.execute(text(
+        f"CREATE TRIGGER {table}_scope_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION bump_scope_version('{table}')"
+    ))
+
+
+def _sqlite(connection, table):
+    # SQLite has row triggers only, one per event
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        name = f"{table}_scope_version_{event.lower()}"
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        connection.execute(text(
+            f"CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN "
+            f"INSERT OR IGNORE INTO scope_versions (scope, version) VALUES ('{table}', 0); "
+            f"UPDATE scope_versions SET version = version + 1 WHERE scope = '{table}'; "
+            f"END"
+        ))
+
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text(_POSTGRES_FUNCTION))
+        for table in TABLES:
+            _postgres(connection, table)
+    elif connection.dialect.name == "sqlite":
+        for table in TABLES:
+            _sqlite(connection, table)
@@ -8,4 +8,10 @@ from .habit_log import *
 from .habit_unit import *
 from .predefined_habit import *
 from .subscription import *
-from .habit_data_integration import * 
\ No newline at end of file
+from .habit_data_integration import *
+from .habit_daily_rollup import *
+from .habit_data_rollup import *
+from .import_job import *
+from .change_log import *
+from .timer_session import *
+from .scope_version import *
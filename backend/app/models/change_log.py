@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, BigInteger, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from .db import Base
+
+class ChangeLog(Base):
+    """Latest change per synced row; seq orders a user's change feed"""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        # GET /sync: a user's changes after a given seq
+        Index("ix_change_log_user_id_seq", "user_id", "seq"),
+        Index("ix_change_log_entity_entity_id", "entity", "entity_id"),
+        # Without AUTOINCREMENT SQLite hands the seq of a deleted newest row to the next insert,
+        # and a client whose cursor is at that seq never sees the change
+        {"sqlite_autoincrement": True},
+    )
+
+    # INTEGER PRIMARY KEY is what gives SQLite an auto-incrementing rowid
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(16), nullable=False)  # habit | habit_log
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    op = Column(String(8), nullable=False)  # upsert | delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
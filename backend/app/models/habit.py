@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Boolean, Enum, ForeignKey, DateTime, Integer
+from sqlalchemy import Column, String, Boolean, Enum, ForeignKey, DateTime, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from .db import Base
 
 class Habit(Base):
     __tablename__ = "habits"
+    __table_args__ = (
+        Index("ix_habits_user_id", "user_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"))
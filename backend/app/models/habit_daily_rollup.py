@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, Numeric, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from .db import Base
+
+class HabitDailyRollup(Base):
+    """Per-day totals of habit_logs, maintained alongside every log write"""
+    __tablename__ = "habit_daily_rollups"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True)
+    habit_id = Column(UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    log_count = Column(Integer, nullable=False, default=0)  # All logs, for completion rate
+    completed_count = Column(Integer, nullable=False, default=0)
+    total_duration = Column(Integer, nullable=False, default=0)  # Seconds, completed logs only
+    total_amount = Column(Numeric, nullable=False, default=0)  # Completed logs only
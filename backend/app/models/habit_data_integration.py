@@ -1,9 +1,12 @@
-from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, func, Text
+from sqlalchemy import Column, String, Numeric, DateTime, ForeignKey, func, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from .db import Base
 
 class HabitDataIntegration(Base):
     __tablename__ = "habit_data_integrations"
+    __table_args__ = (
+        Index("ix_habit_data_integrations_user_id_timestamp", "user_id", "timestamp"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     habit_id = Column(UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"))
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Integer, Numeric, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from .db import Base
+
+class HabitDataRollup(Base):
+    """Hourly and daily (UTC) aggregates of habit_data_integrations samples per metric"""
+    __tablename__ = "habit_data_rollups"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), primary_key=True)
+    metric_name = Column(String, primary_key=True)
+    resolution = Column(String(8), primary_key=True)  # "hour" | "day"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    sample_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Numeric, nullable=False, default=0)
+    value_min = Column(Numeric, nullable=False)
+    value_max = Column(Numeric, nullable=False)
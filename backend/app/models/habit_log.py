@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, Integer, Numeric, Enum, Date, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Numeric, Enum, Date, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from .db import Base
 
 class HabitLog(Base):
     __tablename__ = "habit_logs"
+    __table_args__ = (
+        # GET /habit-logs: user_id [+ habit_id] + date range, newest first
+        Index("ix_habit_logs_user_id_date", "user_id", "date"),
+        Index("ix_habit_logs_habit_id_date", "habit_id", "date"),
+        # POST /habit-logs/bulk: a retried item with the same key is not inserted twice
+        Index("ux_habit_logs_user_id_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True)
     habit_id = Column(UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"))
@@ -15,4 +22,5 @@ class HabitLog(Base):
     unit = Column(String)
     status = Column(Enum("completed", "skipped", "missed", name="habit_status"), default="completed")
     notes = Column(String)
+    idempotency_key = Column(String(64))  # Client-supplied, unique per user
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Text, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from .db import Base
+
+class ImportJob(Base):
+    """A wearable export being loaded; records_processed is the resume checkpoint"""
+    __tablename__ = "import_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), index=True)
+    source = Column(String, nullable=False)  # apple_health | fitbit | oura
+    file_path = Column(String, nullable=False)
+    options = Column(Text)  # JSON: habit_id, workout_habit_id
+    status = Column(String, nullable=False, default="pending")  # pending | running | completed | failed
+    records_processed = Column(BigInteger, nullable=False, default=0)
+    samples_imported = Column(BigInteger, nullable=False, default=0)
+    logs_imported = Column(Integer, nullable=False, default=0)
+    bytes_total = Column(BigInteger)
+    bytes_processed = Column(BigInteger, nullable=False, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, BigInteger
+from .db import Base
+
+class ScopeVersion(Base):
+    """Version counter per cache scope, bumped in the same transaction as the writes it covers"""
+    __tablename__ = "scope_versions"
+
+    scope = Column(String(128), primary_key=True)  # e.g. streak:<habit id>
+    version = Column(BigInteger, nullable=False, default=0)
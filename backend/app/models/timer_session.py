@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from .db import Base
+
+class TimerSession(Base):
+    """
+    A timer running against a habit. Elapsed time is accumulated_seconds plus, while
+    running, the time since segment_started_at; stopping turns it into a habit log.
+    """
+    __tablename__ = "timer_sessions"
+    __table_args__ = (
+        # GET /timer-sessions: the user's unfinished sessions
+        Index("ix_timer_sessions_user_id_status", "user_id", "status"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("profiles.id", ondelete="CASCADE"), nullable=False)
+    habit_id = Column(UUID(as_uuid=True), ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(16), nullable=False, default="running")  # running | paused | stopped
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    segment_started_at = Column(DateTime(timezone=True))  # None unless running
+    accumulated_seconds = Column(Integer, nullable=False, default=0)
+    last_heartbeat_at = Column(DateTime(timezone=True))  # Written in batches, may lag by the flush interval
+    ended_at = Column(DateTime(timezone=True))
+    habit_log_id = Column(UUID(as_uuid=True), ForeignKey("habit_logs.id", ondelete="SET NULL"))
+    notes = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
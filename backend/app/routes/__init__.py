@@ -10,6 +10,11 @@ from .habit_data_integration import router as habit_data_router
 from .subscription import router as subscription_router
 from .predefined_habit import router as predefined_habit_router
 from .habit_unit import router as habit_unit_router
+from .imports import router as imports_router
+from .sync import router as sync_router
+from .events import router as events_router
+from .timer_session import router as timer_session_router
+from .palette import router as palette_router
 
 all_routers = [
     (auth_router, "/auth"),
@@ -20,4 +25,9 @@ all_routers = [
     (subscription_router, "/subscriptions"),
     (predefined_habit_router, "/predefined-habits"),
     (habit_unit_router, "/habit-units"),
+    (imports_router, "/imports"),
+    (sync_router, "/sync"),
+    (events_router, "/events"),
+    (timer_session_router, "/timer-sessions"),
+    (palette_router, "/palette"),
 ]
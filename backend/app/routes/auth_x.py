@@ -8,6 +8,9 @@ import httpx
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import RedirectResponse, Response, JSONResponse
 from starlette.requests import Request
+from app.utils.log import get_logger
+
+logger = get_logger("auth")
 
 # Load environment variables
 # Ensure your .env file has X_OAUTH2_CLIENT_ID and X_CALLBACK_URL
@@ -130,10 +133,10 @@ async def x_oauth_callback(request: Request, code: str | None = None, error: str
         except httpx.HTTPStatusError as e:
             # Log the actual error from X for debugging
             error_detail = e.response.json() if e.response else str(e)
-            print(f"Error exchanging code for token: {error_detail}")
+            logger.error("Error exchanging code for token: %s", error_detail)
             raise HTTPException(status_code=500, detail=f"Could not exchange code for token: {error_detail}")
         except Exception as e:
-            print(f"Unexpected error during token exchange: {e}")
+            logger.exception("Unexpected error during token exchange")
             raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
     access_token = token_data.get("access_token")
@@ -160,11 +163,11 @@ async def x_oauth_callback(request: Request, code: str | None = None, error: str
             x_user_profile_data = profile_response.json().get("data")
         except httpx.HTTPStatusError as e:
             error_detail = e.response.json() if e.response else str(e)
-            print(f"Error fetching X user profile: {error_detail}")
+            logger.error("Error fetching X user profile: %s", error_detail)
             # Decide if this is fatal. For login, it likely is.
             raise HTTPException(status_code=500, detail=f"Could not fetch X user profile: {error_detail}")
         except Exception as e:
-            print(f"Unexpected error fetching X user profile: {e}")
+            logger.exception("Unexpected error fetching X user profile")
             raise HTTPException(status_code=500, detail=f"An unexpected error occurred while fetching X profile: {str(e)}")
 
     if not x_user_profile_data:
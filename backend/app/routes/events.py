@@ -0,0 +1,53 @@
+# app/routes/events.py
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import get_stream_user_id
+from app.utils.events import EVENTS_HEARTBEAT_SECONDS, TooManyStreams, event_broker
+
+router = APIRouter(tags=["Events"])
+
+# Client reconnect delay (ms) advertised to EventSource
+RECONNECT_MS = 5000
+
+
+def _format_event(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+@router.get("/")
+async def stream_events(request: Request, user_id: str = Depends(get_stream_user_id)):
+    """
+    Server-sent events announcing changes to the user's habits and habit logs.
+
+    Each `change` event names the entity, op and (for small batches) the ids; a
+    `resync` event means events were dropped. Either way the client catches up
+    with GET /sync. A comment line is sent every EVENTS_HEARTBEAT_SECONDS so
+    proxies keep the connection open and dead clients are noticed.
+    """
+    try:
+        subscription = event_broker.subscribe(user_id)
+    except TooManyStreams as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RECONNECT_MS // 1000)})
+
+    async def stream():
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n"
+            while True:
+                event = await subscription.next(EVENTS_HEARTBEAT_SECONDS)
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                else:
+                    yield _format_event(event)
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
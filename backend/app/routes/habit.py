@@ -1,79 +1,213 @@
 # app/routes/habit.py
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
 import uuid
 
+from app.models.change_log import ChangeLog
 from app.models.habit import Habit
-from app.schemas.habit import HabitCreate, HabitResponse, HabitUpdate
-from app.dependencies import get_db, get_current_user
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.schemas.habit import HabitCreate, HabitResponse, HabitUpdate, HabitMetricsResponse, HabitStreakResponse
+from app.dependencies import get_async_db, get_current_user
 from app.models.user import Profile
+from app.utils.changes import record_change
+from app.utils.etags import cache_headers, etag_matches, habits_scope, listing_versions, not_modified, weak_etag
+from app.utils.events import event_broker
+from app.utils.streaks import DayBitmap, streak_index, streak_scope
+from app.utils.versions import read_version
+from app.utils.query_stats import query_budget
+from app.utils.log import get_logger
+
+logger = get_logger("habits")
 
 router = APIRouter(
     tags=["Habits"]
 )
 
+async def _get_user_habit(db: AsyncSession, habit_id: uuid.UUID, user_id) -> Habit:
+    result = await db.execute(select(Habit).where(Habit.id == habit_id, Habit.user_id == user_id))
+    return result.scalars().first()
+
+async def _load_streak_bitmap(db: AsyncSession, habit_id, user_id) -> DayBitmap:
+    """Completed-day bitmap for a habit, rebuilt from the daily rollups when the cached one is stale"""
+    version = await read_version(db, streak_scope(habit_id))
+    bitmap = streak_index.get(habit_id, version)
+    if bitmap is None:
+        result = await db.execute(
+            select(HabitDailyRollup.day).where(
+                HabitDailyRollup.user_id == user_id,
+                HabitDailyRollup.habit_id == habit_id,
+                HabitDailyRollup.completed_count > 0,
+            )
+        )
+        bitmap = streak_index.put(habit_id, version, DayBitmap.from_days(result.scalars().all()))
+    return bitmap
+
 # Test endpoint without authentication (for testing only)
 @router.post("/test", response_model=dict, status_code=status.HTTP_201_CREATED)
-def create_test_habit(habit: HabitCreate, db: Session = Depends(get_db)):
+async def create_test_habit(habit: HabitCreate, db: AsyncSession = Depends(get_async_db)):
     """Test endpoint to create a habit without authentication - for testing only"""
     # Use a dummy user ID for testing
     test_user_id = "test-user-123"
     db_habit = Habit(**habit.dict(), id=uuid.uuid4(), user_id=test_user_id)
     db.add(db_habit)
-    db.commit()
-    db.refresh(db_habit)
+    await db.commit()
+    await db.refresh(db_habit)
     return {"message": "Test habit created successfully", "habit": db_habit}
 
 # Test delete endpoint without authentication (for testing only)
 @router.delete("/test/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_test_habit(habit_id: str, db: Session = Depends(get_db)):
+async def delete_test_habit(habit_id: str, db: AsyncSession = Depends(get_async_db)):
     """Test endpoint to delete a habit without authentication - for testing only"""
     # Use the same dummy user ID for testing
     test_user_id = "test-user-123"
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.user_id == test_user_id).first()
+    result = await db.execute(select(Habit).where(Habit.id == habit_id, Habit.user_id == test_user_id))
+    habit = result.scalars().first()
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
-    db.delete(habit)
-    db.commit()
+    await db.delete(habit)
+    await db.commit()
     return None
 
 # Test get endpoint without authentication (for testing only)
 @router.get("/test", response_model=List[HabitResponse])
-def get_test_habits(db: Session = Depends(get_db)):
+async def get_test_habits(db: AsyncSession = Depends(get_async_db)):
     """Test endpoint to get habits without authentication - for testing only"""
     # Use the same dummy user ID for testing
     test_user_id = "test-user-123"
-    return db.query(Habit).filter(Habit.user_id == test_user_id).all()
+    result = await db.execute(select(Habit).where(Habit.user_id == test_user_id))
+    return result.scalars().all()
+
+async def habits_version(db: AsyncSession, user_id) -> int:
+    # Every habit write appends to the change feed, so its head seq versions the list
+    result = await db.execute(
+        select(func.max(ChangeLog.seq)).where(ChangeLog.user_id == user_id, ChangeLog.entity == "habit")
+    )
+    return result.scalar() or 0
+
+
+def habits_query(user_id):
+    """
+    The GET /habits listing; `python -m app.migrations explain` checks its plan
+    """
+    return select(Habit).where(Habit.user_id == user_id)
+
 
 @router.get("/", response_model=List[HabitResponse])
-def get_habits(current_user: Profile = Depends(get_current_user), db: Session = Depends(get_db)):
+@query_budget(3)
+async def get_habits(request: Request, response: Response, current_user: Profile = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Get all habits for the authenticated user"""
-    print(f"🎯 [ROUTE DEBUG] get_habits called for user: {current_user.id if current_user else 'None'}")
-    habits = db.query(Habit).filter(Habit.user_id == current_user.id).all()
-    return habits
+    logger.debug("get_habits for %s", current_user.id)
+    scope = habits_scope(current_user.id)
+    etag = weak_etag(scope, await listing_versions.tracked(scope, lambda: habits_version(db, current_user.id)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    result = await db.execute(habits_query(current_user.id))
+    return result.scalars().all()
+
+
+@router.get("/metrics", response_model=List[HabitMetricsResponse])
+@query_budget(2)
+async def get_habit_metrics(
+    today: Optional[date] = Query(None, description="Client's local date, used for streaks"),
+    current_user: Profile = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Summary metrics for every habit of the authenticated user"""
+    today = today or date.today()
+
+    # One query for all habits over the daily rollups: a row per (habit, day) rather than per log
+    query = (
+        select(
+            Habit.id,
+            HabitDailyRollup.day,
+            HabitDailyRollup.log_count,
+            HabitDailyRollup.completed_count,
+            HabitDailyRollup.total_duration,
+        )
+        .outerjoin(
+            HabitDailyRollup,
+            (HabitDailyRollup.habit_id == Habit.id) & (HabitDailyRollup.user_id == Habit.user_id),
+        )
+        .where(Habit.user_id == current_user.id)
+        .order_by(Habit.id, HabitDailyRollup.day.desc())
+    )
+    result = await db.execute(query)
+
+    metrics = {}
+    completed_days = {}
+    for habit_id, day, log_count, completed_count, duration in result:
+        entry = metrics.setdefault(habit_id, {"logs": 0, "sessions": 0, "duration": 0, "last": None})
+        completed_days.setdefault(habit_id, [])
+        if day is None:
+            continue
+        entry["logs"] += log_count
+        entry["sessions"] += completed_count or 0
+        entry["duration"] += duration or 0
+        if completed_count:
+            completed_days[habit_id].append(day)
+            entry["last"] = entry["last"] or day
+
+    response = []
+    for habit_id, entry in metrics.items():
+        bitmap = DayBitmap.from_days(completed_days[habit_id])
+        response.append(HabitMetricsResponse(
+            habit_id=habit_id,
+            total_sessions=entry["sessions"],
+            total_duration=entry["duration"],
+            current_streak=bitmap.current_streak(today),
+            longest_streak=bitmap.longest_streak(),
+            completion_rate=(entry["sessions"] / entry["logs"] * 100) if entry["logs"] else 0.0,
+            last_completed=entry["last"],
+        ))
+    return response
 
 
 @router.post("/", response_model=HabitResponse, status_code=status.HTTP_201_CREATED)
-def create_habit(habit: HabitCreate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
+async def create_habit(habit: HabitCreate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
     db_habit = Habit(**habit.dict(), id=uuid.uuid4(), user_id=current_user.id)
     db.add(db_habit)
-    db.commit()
-    db.refresh(db_habit)
+    await record_change(db, current_user.id, "habit", db_habit.id, "upsert")
+    await db.commit()
+    listing_versions.invalidate(habits_scope(current_user.id))
+    await event_broker.publish(current_user.id, "habit", "upsert", [db_habit.id])
+    await db.refresh(db_habit)
     return db_habit
 
 
 @router.get("/{habit_id}", response_model=HabitResponse)
-def get_habit(habit_id: str, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.user_id == current_user.id).first()
+async def get_habit(habit_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    habit = await _get_user_habit(db, habit_id, current_user.id)
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
     return habit
 
 
+@router.get("/{habit_id}/streak", response_model=HabitStreakResponse)
+async def get_habit_streak(
+    habit_id: uuid.UUID,
+    today: Optional[date] = Query(None, description="Client's local date, used for streaks"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    habit = await _get_user_habit(db, habit_id, current_user.id)
+    if not habit:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    bitmap = await _load_streak_bitmap(db, habit.id, current_user.id)
+    return HabitStreakResponse(
+        habit_id=habit.id,
+        current_streak=bitmap.current_streak(today or date.today()),
+        longest_streak=bitmap.longest_streak(),
+        last_completed=bitmap.last_day(),
+    )
+
+
 @router.put("/{habit_id}", response_model=HabitResponse)
-def update_habit(habit_id: str, habit_update: HabitUpdate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.user_id == current_user.id).first()
+async def update_habit(habit_id: uuid.UUID, habit_update: HabitUpdate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    habit = await _get_user_habit(db, habit_id, current_user.id)
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
     
@@ -81,36 +215,44 @@ def update_habit(habit_id: str, habit_update: HabitUpdate, db: Session = Depends
     for field, value in update_data.items():
         setattr(habit, field, value)
     
-    db.commit()
-    db.refresh(habit)
+    await record_change(db, current_user.id, "habit", habit.id, "upsert")
+    await db.commit()
+    listing_versions.invalidate(habits_scope(current_user.id))
+    await event_broker.publish(current_user.id, "habit", "upsert", [habit.id])
+    await db.refresh(habit)
     return habit
 
 
 @router.delete("/{habit_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_habit(habit_id: str, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    habit = db.query(Habit).filter(Habit.id == habit_id, Habit.user_id == current_user.id).first()
+async def delete_habit(habit_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    habit = await _get_user_habit(db, habit_id, current_user.id)
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
-    db.delete(habit)
-    db.commit()
+    # The habit's logs go with it (ON DELETE CASCADE); clients drop them on this tombstone
+    await record_change(db, current_user.id, "habit", habit.id, "delete")
+    await db.delete(habit)
+    await db.commit()
+    listing_versions.invalidate(habits_scope(current_user.id))
+    await event_broker.publish(current_user.id, "habit", "delete", [habit.id])
     return None
 
 # Test endpoint to check if frontend can reach backend
 @router.get("/debug/test")
-def test_connection():
+async def test_connection():
     """Test endpoint that doesn't require authentication"""
     return {"message": "✅ Backend connection working!", "timestamp": "now"}
 
 # Test endpoint to see what headers we're receiving
 @router.get("/debug/headers")
-def test_headers(request: Request):
+async def test_headers(request: Request):
     """Test endpoint to see what headers the frontend is sending"""
     headers = dict(request.headers)
-    print(f"🔍 [DEBUG] Received headers: {headers}")
+    # Names only: values include the bearer token
+    logger.debug("Received headers: %s", list(headers))
     return {"headers": headers}
 
 # Super simple auth test endpoint
 @router.get("/debug/auth-test")
-def test_auth(current_user: Profile = Depends(get_current_user)):
+async def test_auth(current_user: Profile = Depends(get_current_user)):
     """Simple test that requires authentication"""
     return {"message": f"✅ Authenticated as user: {current_user.id}", "email": getattr(current_user, 'email', 'unknown')}
@@ -1,24 +1,266 @@
 # app/routes/habit_data_integration.py
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import ValidationError
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+import math
 import uuid
 
+from app.models.habit import Habit
 from app.models.habit_data_integration import HabitDataIntegration
-from app.schemas.habit_data_integration import HabitDataIntegrationCreate, HabitDataIntegrationResponse
-from app.dependencies import get_db, get_current_user
+from app.models.habit_data_rollup import HabitDataRollup
+from app.schemas.habit_data_integration import (
+    HabitDataIntegrationCreate,
+    HabitDataIntegrationResponse,
+    HabitDataIntegrationPage,
+    HabitDataColumnarBatch,
+    HabitDataIngestResponse,
+    HabitDataSeriesResponse,
+)
+from app.dependencies import get_async_db, get_current_user
 from app.models.user import Profile
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor
+from app.utils.ingest import IngestBackpressure, IngestTicket, ingest_buffer, ingest_row
+from app.utils.series import RESOLUTIONS, record_samples
 
 router = APIRouter(tags=["Habit Data Integrations"])
 
-@router.get("/", response_model=List[HabitDataIntegrationResponse])
-def get_data(db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    return db.query(HabitDataIntegration).filter(HabitDataIntegration.user_id == current_user.id).all()
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+# Rows validated before being handed to the buffer while a request streams in
+INGEST_REQUEST_CHUNK = 5000
+# Per-row errors echoed back; the rejected count covers the rest
+MAX_REPORTED_ERRORS = 100
+
+
+class _IngestBatch:
+    """Rows of one ingest request on their way into the buffer"""
+
+    def __init__(self, db: AsyncSession, user_id, ticket: Optional[IngestTicket] = None):
+        self.db = db
+        self.user_id = user_id
+        self.ticket = ticket
+        self.owned_habits = set()
+        self.pending = []  # (line, HabitDataIntegrationCreate-like fields)
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    async def add(self, line: int, fields: dict) -> None:
+        self.pending.append((line, fields))
+        if len(self.pending) >= INGEST_REQUEST_CHUNK:
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self.pending = self.pending, []
+        habit_ids = {}
+        for line, fields in pending:
+            try:
+                habit_ids[fields["habit_id"]] = uuid.UUID(str(fields["habit_id"]))
+            except ValueError:
+                habit_ids[fields["habit_id"]] = None
+
+        # One ownership query per chunk, only for habits not seen earlier in the request
+        unknown = {h for h in habit_ids.values() if h is not None and h not in self.owned_habits}
+        if unknown:
+            result = await self.db.execute(select(Habit.id).where(Habit.user_id == self.user_id, Habit.id.in_(unknown)))
+            self.owned_habits.update(result.scalars().all())
+
+        rows = []
+        for line, fields in pending:
+            habit_id = habit_ids[fields["habit_id"]]
+            if habit_id not in self.owned_habits:
+                self.reject(line, "Habit not found")
+                continue
+            rows.append(ingest_row(
+                self.user_id, habit_id, fields["source"], fields["metric_name"], fields["value"],
+                fields.get("unit"), fields["timestamp"], fields.get("extra_data"),
+            ))
+        self.accepted += await ingest_buffer.add(self.user_id, rows, self.ticket)
+
+def data_page_query(user_id, after=None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One GET /habit-data page, newest first; `python -m app.migrations explain` checks its plan
+    """
+    query = select(HabitDataIntegration).where(HabitDataIntegration.user_id == user_id)
+    if after is not None:
+        query = query.where(tuple_(HabitDataIntegration.timestamp, HabitDataIntegration.id) < after)
+    return query.order_by(HabitDataIntegration.timestamp.desc(), HabitDataIntegration.id.desc()).limit(limit + 1)
+
+@router.get("/", response_model=HabitDataIntegrationPage)
+async def get_data(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    after = None
+    if cursor:
+        try:
+            cursor_timestamp, cursor_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(cursor_timestamp), uuid.UUID(cursor_id))
+        except (InvalidCursor, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    result = await db.execute(data_page_query(current_user.id, after, limit))
+    entries = result.scalars().all()
+
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1].timestamp.isoformat(), entries[-1].id)
+    return {"items": entries, "next_cursor": next_cursor}
 
 @router.post("/", response_model=HabitDataIntegrationResponse)
-def create_data(entry: HabitDataIntegrationCreate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    db_entry = HabitDataIntegration(**entry.dict(), id=uuid.uuid4(), user_id=current_user.id)
+async def create_data(entry: HabitDataIntegrationCreate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    try:
+        habit_id = uuid.UUID(entry.habit_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    db_entry = HabitDataIntegration(**{**entry.dict(), "habit_id": habit_id}, id=uuid.uuid4(), user_id=current_user.id)
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
-    return db_entry
\ No newline at end of file
+    await record_samples(db, [{
+        "user_id": current_user.id,
+        "metric_name": entry.metric_name,
+        "value": entry.value,
+        "timestamp": entry.timestamp,
+    }])
+    await db.commit()
+    await db.refresh(db_entry)
+    return db_entry
+
+@router.get("/series", response_model=HabitDataSeriesResponse)
+async def get_series(
+    metric: str = Query(..., description="metric_name to chart"),
+    start: datetime = Query(..., alias="from", description="Start of the range (inclusive)"),
+    end: datetime = Query(..., alias="to", description="End of the range (exclusive)"),
+    resolution: str = Query("hour", description="Bucket size: hour or day"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """Count, sum, min, max and mean per bucket, read from the precomputed rollups"""
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"resolution must be one of: {', '.join(RESOLUTIONS)}")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+
+    result = await db.execute(
+        select(
+            HabitDataRollup.bucket_start,
+            HabitDataRollup.sample_count,
+            HabitDataRollup.value_sum,
+            HabitDataRollup.value_min,
+            HabitDataRollup.value_max,
+        )
+        .where(
+            HabitDataRollup.user_id == current_user.id,
+            HabitDataRollup.metric_name == metric,
+            HabitDataRollup.resolution == resolution,
+            HabitDataRollup.bucket_start >= start,
+            HabitDataRollup.bucket_start < end,
+        )
+        .order_by(HabitDataRollup.bucket_start)
+    )
+    rows = result.all()
+    bucket_starts, counts, sums, mins, maxes = (list(column) for column in zip(*rows)) if rows else ([], [], [], [], [])
+    return {
+        "metric": metric,
+        "resolution": resolution,
+        "bucket_starts": bucket_starts,
+        "count": counts,
+        "sum": [float(v) for v in sums],
+        "min": [float(v) for v in mins],
+        "max": [float(v) for v in maxes],
+        "mean": [float(total) / count for total, count in zip(sums, counts)],
+    }
+
+
+@router.post("/ingest", response_model=HabitDataIngestResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_data(
+    request: Request,
+    sync: bool = Query(False, description="Flush before responding so accepted rows are durable"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """
+    Bulk ingest of samples, buffered and written in batches.
+
+    Send NDJSON (one HabitDataIntegrationCreate object per line, streamed) or a
+    JSON columnar batch (HabitDataColumnarBatch).
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    batch = _IngestBatch(db, current_user.id, IngestTicket() if sync else None)
+    try:
+        if content_type in NDJSON_CONTENT_TYPES:
+            await _read_ndjson(request, batch)
+        elif content_type == "application/json":
+            await _read_columnar(request, batch)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Send application/x-ndjson or a columnar application/json batch",
+            )
+        await batch.flush()
+    except IngestBackpressure as e:
+        # Earlier chunks of this request may already be buffered; tell the client how far we got
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE if e.flushes_failing else status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"message": str(e), "accepted": batch.accepted},
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    durable = False
+    if sync:
+        await ingest_buffer.flush_user(current_user.id)
+        # Some rows may be in a periodic flush that started first; wait for that one too
+        durable = await batch.ticket.durable()
+    return {"accepted": batch.accepted, "rejected": batch.rejected, "durable": durable, "errors": batch.errors}
+
+
+async def _read_ndjson(request: Request, batch: _IngestBatch) -> None:
+    line_number = 0
+    remainder = b""
+    async for chunk in request.stream():
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            line_number += 1
+            await _add_ndjson_line(batch, line_number, line)
+    if remainder:
+        await _add_ndjson_line(batch, line_number + 1, remainder)
+
+
+async def _add_ndjson_line(batch: _IngestBatch, line_number: int, line: bytes) -> None:
+    if not line.strip():
+        return
+    try:
+        sample = HabitDataIntegrationCreate.model_validate_json(line)
+    except ValidationError as e:
+        batch.reject(line_number, e.errors()[0]["msg"] if e.errors() else str(e))
+        return
+    await batch.add(line_number, sample.dict())
+
+
+async def _read_columnar(request: Request, batch: _IngestBatch) -> None:
+    try:
+        series = HabitDataColumnarBatch.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[{"loc": err["loc"], "msg": err["msg"]} for err in e.errors()],
+        )
+    for index, (timestamp, value) in enumerate(zip(series.timestamps, series.values)):
+        await batch.add(index, {
+            "habit_id": series.habit_id,
+            "source": series.source,
+            "metric_name": series.metric_name,
+            "unit": series.unit,
+            "value": value,
+            "timestamp": timestamp,
+        })
@@ -1,33 +1,63 @@
 # app/routes/habit_log.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
 import uuid
 
 from app.models.habit_log import HabitLog
 from app.models.habit import Habit
-from app.schemas.habit_log import HabitLogCreate, HabitLogResponse, HabitLogUpdate
-from app.dependencies import get_db, get_current_user
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.schemas.habit_log import (
+    HabitLogCreate,
+    HabitLogResponse,
+    HabitLogUpdate,
+    HabitLogPage,
+    HabitHeatmapResponse,
+    HabitLogBulkCreate,
+    HabitLogBulkResponse,
+)
+from app.dependencies import get_async_db, get_current_user
 from app.models.user import Profile
+from app.utils.changes import record_change, record_changes
+from app.utils.database import dialect_insert
+from app.utils.etags import cache_headers, etag_matches, not_modified
+from app.utils.events import event_broker
+from app.utils.rollups import log_snapshot, record_log_change, record_log_inserts
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor
+from app.utils.heatmap import ENCODINGS, build_grid, days_in_year, encode_grid, grid_etag
+from app.utils.query_stats import query_budget
+from app.utils.log import get_logger
+
+logger = get_logger("habit_logs")
 
 router = APIRouter(tags=["Habit Logs"])
 
+# Rows per INSERT statement; keeps bind parameters under the asyncpg/SQLite limits
+BULK_INSERT_CHUNK = 1000
+
+async def _get_user_log(db: AsyncSession, log_id: uuid.UUID, user_id) -> HabitLog:
+    result = await db.execute(select(HabitLog).where(HabitLog.id == log_id, HabitLog.user_id == user_id))
+    return result.scalars().first()
+
 # Test endpoint without authentication (for testing only)
 @router.post("/test", response_model=dict, status_code=status.HTTP_201_CREATED)
-def create_test_log(log: HabitLogCreate, db: Session = Depends(get_db)):
+async def create_test_log(log: HabitLogCreate, db: AsyncSession = Depends(get_async_db)):
     """Test endpoint to create a habit log without authentication - for testing only"""
     try:
-        print(f"🧪 [TEST] Creating test habit log: {log.dict()}")
+        logger.debug("Creating test habit log: %s", log)
         
         # Use a fixed test user ID to avoid foreign key issues
         test_user_id = "12345678-1234-1234-1234-123456789012"
-        print(f"🧪 [TEST] Using fixed test user ID: {test_user_id}")
+        logger.debug("Using fixed test user ID: %s", test_user_id)
         
         # Check if test profile exists, if not create it
-        test_profile = db.query(Profile).filter(Profile.id == test_user_id).first()
+        result = await db.execute(select(Profile).where(Profile.id == test_user_id))
+        test_profile = result.scalars().first()
         if not test_profile:
-            print(f"🧪 [TEST] Creating dummy profile with ID: {test_user_id}")
+            logger.debug("Creating dummy profile with ID: %s", test_user_id)
             dummy_profile = Profile(
                 id=test_user_id,
                 email="test@ritual.com",
@@ -37,8 +67,8 @@ def create_test_log(log: HabitLogCreate, db: Session = Depends(get_db)):
                 country="US"
             )
             db.add(dummy_profile)
-            db.commit()
-            print(f"🧪 [TEST] Dummy profile created successfully")
+            await db.commit()
+            logger.debug("Dummy profile created")
         
         # Convert habit_id to proper UUID if it's a string
         habit_id = log.habit_id
@@ -49,12 +79,13 @@ def create_test_log(log: HabitLogCreate, db: Session = Depends(get_db)):
             # Create a proper UUID from the test habit ID
             habit_uuid = str(uuid.uuid4())
         
-        print(f"🧪 [TEST] Using habit UUID: {habit_uuid}")
+        logger.debug("Using habit UUID: %s", habit_uuid)
         
         # Check if habit exists, if not create a dummy one
-        habit = db.query(Habit).filter(Habit.id == habit_uuid).first()
+        result = await db.execute(select(Habit).where(Habit.id == habit_uuid))
+        habit = result.scalars().first()
         if not habit:
-            print(f"🧪 [TEST] Creating dummy habit with ID: {habit_uuid}")
+            logger.debug("Creating dummy habit with ID: %s", habit_uuid)
             # Create a dummy habit for testing
             dummy_habit = Habit(
                 id=habit_uuid,
@@ -65,8 +96,8 @@ def create_test_log(log: HabitLogCreate, db: Session = Depends(get_db)):
                 unit_type="duration"
             )
             db.add(dummy_habit)
-            db.commit()
-            print(f"🧪 [TEST] Dummy habit created successfully")
+            await db.commit()
+            logger.debug("Dummy habit created")
         
         # Create the log with proper UUIDs
         log_data = log.dict()
@@ -74,75 +105,247 @@ def create_test_log(log: HabitLogCreate, db: Session = Depends(get_db)):
         
         db_log = HabitLog(**log_data, id=str(uuid.uuid4()), user_id=test_user_id)
         db.add(db_log)
-        db.commit()
-        db.refresh(db_log)
+        await record_log_change(db, None, log_snapshot(db_log))
+        await db.commit()
+        await db.refresh(db_log)
         
-        print(f"🧪 [TEST] Habit log created successfully: {db_log.id}")
+        logger.debug("Test habit log created: %s", db_log.id)
         return {"message": "Test habit log created successfully", "log_id": str(db_log.id), "habit_id": habit_uuid}
         
     except Exception as e:
-        print(f"🧪 [TEST] Error creating test log: {str(e)}")
-        db.rollback()
+        logger.exception("Error creating test log")
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Test endpoint error: {str(e)}")
 
-@router.get("/", response_model=List[HabitLogResponse])
-def get_logs(
-    habit_id: Optional[str] = Query(None, description="Filter by habit ID"),
+def logs_page_query(user_id, habit_id=None, start_date=None, end_date=None, after=None, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    One GET /habit-logs page; `python -m app.migrations explain` checks its plan
+    """
+    query = select(HabitLog).where(HabitLog.user_id == user_id)
+    if habit_id:
+        query = query.where(HabitLog.habit_id == habit_id)
+    if start_date:
+        query = query.where(HabitLog.date >= start_date)
+    if end_date:
+        query = query.where(HabitLog.date <= end_date)
+    if after is not None:
+        # Seek past the last (date, id) of the previous page instead of using OFFSET
+        query = query.where(tuple_(HabitLog.date, HabitLog.id) < after)
+    # Fetch one extra row to know whether another page exists
+    return query.order_by(HabitLog.date.desc(), HabitLog.id.desc()).limit(limit + 1)
+
+@router.get("/", response_model=HabitLogPage)
+@query_budget(2)
+async def get_logs(
+    habit_id: Optional[uuid.UUID] = Query(None, description="Filter by habit ID"),
     start_date: Optional[date] = Query(None, description="Start date for filtering"),
     end_date: Optional[date] = Query(None, description="End date for filtering"),
-    db: Session = Depends(get_db), 
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+    db: AsyncSession = Depends(get_async_db), 
     current_user: Profile = Depends(get_current_user)
 ):
-    query = db.query(HabitLog).filter(HabitLog.user_id == current_user.id)
+    after = None
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor, 2)
+            after = (date.fromisoformat(cursor_date), uuid.UUID(cursor_id))
+        except (InvalidCursor, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    if habit_id:
-        query = query.filter(HabitLog.habit_id == habit_id)
-    if start_date:
-        query = query.filter(HabitLog.date >= start_date)
-    if end_date:
-        query = query.filter(HabitLog.date <= end_date)
+    result = await db.execute(logs_page_query(current_user.id, habit_id, start_date, end_date, after, limit))
+    logs = result.scalars().all()
     
-    return query.order_by(HabitLog.date.desc()).all()
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1].date.isoformat(), logs[-1].id)
+    return {"items": logs, "next_cursor": next_cursor}
+
+@router.get("/heatmap", response_model=HabitHeatmapResponse)
+@query_budget(3)
+async def get_heatmap(
+    request: Request,
+    year: int = Query(..., ge=1970, le=9999, description="Calendar year"),
+    habit_id: Optional[uuid.UUID] = Query(None, description="Limit to one habit; all habits when omitted"),
+    encoding: str = Query("rle", description="Grid encoding: rle or raw"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """Per-day completion counts (capped at 255) for a year, packed one byte per day"""
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=400, detail=f"encoding must be one of: {', '.join(ENCODINGS)}")
+
+    habits_query = select(Habit.id).where(Habit.user_id == current_user.id).order_by(Habit.id)
+    if habit_id:
+        habits_query = habits_query.where(Habit.id == habit_id)
+    habit_ids = (await db.execute(habits_query)).scalars().all()
+    if habit_id and not habit_ids:
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    # Daily rollups give one row per logged day instead of one per log
+    rollup_query = select(HabitDailyRollup.habit_id, HabitDailyRollup.day, HabitDailyRollup.completed_count).where(
+        HabitDailyRollup.user_id == current_user.id,
+        HabitDailyRollup.day >= date(year, 1, 1),
+        HabitDailyRollup.day <= date(year, 12, 31),
+        HabitDailyRollup.completed_count > 0,
+    )
+    if habit_id:
+        rollup_query = rollup_query.where(HabitDailyRollup.habit_id == habit_ids[0])
+    per_habit = {}
+    for row_habit_id, day, completed_count in await db.execute(rollup_query):
+        per_habit.setdefault(row_habit_id, []).append((day, completed_count))
+
+    rows = [
+        {"habit_id": str(h), "data": encode_grid(build_grid(year, per_habit.get(h, ())), encoding)}
+        for h in habit_ids
+    ]
+    etag = grid_etag(year, encoding, *(part for row in rows for part in (row["habit_id"], row["data"])))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    payload = HabitHeatmapResponse(year=year, days=days_in_year(year), encoding=encoding, habits=rows)
+    return JSONResponse(content=payload.dict(), headers=cache_headers(etag))
 
 @router.post("/", response_model=HabitLogResponse)
-def create_log(log: HabitLogCreate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
+@query_budget(8)
+async def create_log(log: HabitLogCreate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
     # Verify habit belongs to user
-    habit = db.query(Habit).filter(Habit.id == log.habit_id, Habit.user_id == current_user.id).first()
+    try:
+        habit_id = uuid.UUID(log.habit_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    result = await db.execute(select(Habit.id).where(Habit.id == habit_id, Habit.user_id == current_user.id))
+    habit = result.first()
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
     
-    db_log = HabitLog(**log.dict(), id=uuid.uuid4(), user_id=current_user.id)
+    db_log = HabitLog(**{**log.dict(), "habit_id": habit_id}, id=uuid.uuid4(), user_id=current_user.id)
     db.add(db_log)
-    db.commit()
-    db.refresh(db_log)
+    # Rollups are updated in the same transaction as the log itself
+    await record_log_change(db, None, log_snapshot(db_log))
+    await record_change(db, current_user.id, "habit_log", db_log.id, "upsert")
+    await db.commit()
+    await event_broker.publish(current_user.id, "habit_log", "upsert", [db_log.id])
+    await db.refresh(db_log)
     return db_log
 
+@router.post("/bulk", response_model=HabitLogBulkResponse)
+async def create_logs_bulk(payload: HabitLogBulkCreate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    """Insert many logs in one transaction, reporting a result per item"""
+    results = [{"index": i, "status": "error"} for i in range(len(payload.logs))]
+
+    # Ownership of every referenced habit in one query
+    habit_ids = set()
+    for i, item in enumerate(payload.logs):
+        try:
+            habit_ids.add(uuid.UUID(item.habit_id))
+        except ValueError:
+            results[i]["error"] = "Invalid habit_id"
+    owned = set((await db.execute(
+        select(Habit.id).where(Habit.user_id == current_user.id, Habit.id.in_(habit_ids))
+    )).scalars().all()) if habit_ids else set()
+
+    rows, first_by_key = [], {}
+    for i, item in enumerate(payload.logs):
+        if results[i].get("error"):
+            continue
+        if uuid.UUID(item.habit_id) not in owned:
+            results[i]["error"] = "Habit not found"
+            continue
+        key = item.idempotency_key
+        if key is not None and key in first_by_key:
+            # Repeated within this request: resolve to the first item once it is stored
+            results[i]["status"] = "duplicate"
+            results[i]["duplicate_of"] = first_by_key[key]
+            continue
+        if key is not None:
+            first_by_key[key] = i
+        row = item.dict()
+        row.update(id=uuid.uuid4(), user_id=current_user.id, habit_id=uuid.UUID(item.habit_id))
+        rows.append((i, row))
+
+    # Multi-row INSERT ... ON CONFLICT DO NOTHING; keys that already exist come back missing from RETURNING
+    insert = dialect_insert(db.bind.dialect.name)
+    table = HabitLog.__table__
+    inserted_ids = set()
+    for start in range(0, len(rows), BULK_INSERT_CHUNK):
+        chunk = [row for _, row in rows[start:start + BULK_INSERT_CHUNK]]
+        stmt = (
+            insert(table)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=[table.c.user_id, table.c.idempotency_key])
+            .returning(table.c.id)
+        )
+        inserted_ids.update((await db.execute(stmt)).scalars().all())
+
+    snapshots, existing_keys = [], []
+    for i, row in rows:
+        if row["id"] in inserted_ids:
+            results[i].update(status="created", id=row["id"])
+            snapshots.append(row)
+        else:
+            existing_keys.append(row["idempotency_key"])
+    if existing_keys:
+        existing = dict((await db.execute(
+            select(HabitLog.idempotency_key, HabitLog.id).where(
+                HabitLog.user_id == current_user.id, HabitLog.idempotency_key.in_(existing_keys)
+            )
+        )).all())
+        for i, row in rows:
+            if row["id"] not in inserted_ids:
+                results[i].update(status="duplicate", id=existing.get(row["idempotency_key"]))
+    for result in results:
+        if "duplicate_of" in result:
+            result["id"] = results[result.pop("duplicate_of")].get("id")
+
+    # One rollup upsert for the whole batch, in the same transaction
+    await record_log_inserts(db, snapshots)
+    await record_changes(db, current_user.id, "habit_log", [row["id"] for row in snapshots], "upsert")
+    await db.commit()
+    await event_broker.publish(current_user.id, "habit_log", "upsert", [row["id"] for row in snapshots])
+
+    statuses = [result["status"] for result in results]
+    return {
+        "created": statuses.count("created"),
+        "duplicates": statuses.count("duplicate"),
+        "failed": statuses.count("error"),
+        "results": results,
+    }
+
 @router.get("/{log_id}", response_model=HabitLogResponse)
-def get_log(log_id: str, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    log = db.query(HabitLog).filter(HabitLog.id == log_id, HabitLog.user_id == current_user.id).first()
+async def get_log(log_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    log = await _get_user_log(db, log_id, current_user.id)
     if not log:
         raise HTTPException(status_code=404, detail="Habit log not found")
     return log
 
 @router.put("/{log_id}", response_model=HabitLogResponse)
-def update_log(log_id: str, log_update: HabitLogUpdate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    log = db.query(HabitLog).filter(HabitLog.id == log_id, HabitLog.user_id == current_user.id).first()
+async def update_log(log_id: uuid.UUID, log_update: HabitLogUpdate, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    log = await _get_user_log(db, log_id, current_user.id)
     if not log:
         raise HTTPException(status_code=404, detail="Habit log not found")
     
+    before = log_snapshot(log)
     update_data = log_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(log, field, value)
     
-    db.commit()
-    db.refresh(log)
+    await record_log_change(db, before, log_snapshot(log))
+    await record_change(db, current_user.id, "habit_log", log.id, "upsert")
+    await db.commit()
+    await event_broker.publish(current_user.id, "habit_log", "upsert", [log.id])
+    await db.refresh(log)
     return log
 
 @router.delete("/{log_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_log(log_id: str, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
-    log = db.query(HabitLog).filter(HabitLog.id == log_id, HabitLog.user_id == current_user.id).first()
+async def delete_log(log_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    log = await _get_user_log(db, log_id, current_user.id)
     if not log:
         raise HTTPException(status_code=404, detail="Habit log not found")
-    db.delete(log)
-    db.commit()
+    await record_log_change(db, log_snapshot(log), None)
+    await record_change(db, current_user.id, "habit_log", log.id, "delete")
+    await db.delete(log)
+    await db.commit()
+    await event_broker.publish(current_user.id, "habit_log", "delete", [log.id])
     return None
\ No newline at end of file
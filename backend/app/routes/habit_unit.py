@@ -1,14 +1,21 @@
 # app/routes/habit_unit.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.models.habit_unit import HabitUnit
 from app.schemas.habit_unit import HabitUnitResponse
 from app.dependencies import get_db
+from app.utils.etags import HABIT_UNITS_SCOPE, cache_headers, etag_matches, listing_versions, not_modified, weak_etag
+from app.utils.versions import read_version_sync
 
 router = APIRouter(tags=["Habit Units"])
 
 @router.get("/", response_model=List[HabitUnitResponse])
-def get_units(db: Session = Depends(get_db)):
-    return db.query(HabitUnit).all()
\ No newline at end of file
+def get_units(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Bumped by a trigger on habit_units, which is edited outside the API
+    etag = weak_etag(HABIT_UNITS_SCOPE, listing_versions.tracked_sync(HABIT_UNITS_SCOPE, lambda: read_version_sync(db, HABIT_UNITS_SCOPE)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return db.query(HabitUnit).all()
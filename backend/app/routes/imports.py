@@ -0,0 +1,105 @@
+# app/routes/imports.py
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import shutil
+import uuid
+
+from app.models.habit import Habit
+from app.models.import_job import ImportJob
+from app.schemas.import_job import ImportJobResponse
+from app.dependencies import get_async_db, get_current_user
+from app.models.user import Profile
+from app.utils.health_import import IMPORT_UPLOAD_DIR, SOURCES, active_jobs, run_import
+
+router = APIRouter(tags=["Imports"])
+
+# A "running" job whose checkpoint has not moved for this long is assumed to have lost its worker
+STALE_JOB_AFTER = timedelta(minutes=5)
+
+async def _get_user_job(db: AsyncSession, job_id: uuid.UUID, user_id) -> ImportJob:
+    result = await db.execute(select(ImportJob).where(ImportJob.id == job_id, ImportJob.user_id == user_id))
+    return result.scalars().first()
+
+def _save_upload(upload: UploadFile, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload.file, out, 1024 * 1024)
+
+@router.post("/", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_import(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="export.xml / export.zip, or a Fitbit/Oura JSON export"),
+    source: str = Form("apple_health"),
+    habit_id: Optional[str] = Form(None, description="Habit to attach samples to"),
+    workout_habit_id: Optional[str] = Form(None, description="Habit to log Apple Health workouts against"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """Upload a wearable export and import it in the background"""
+    if source not in SOURCES:
+        raise HTTPException(status_code=400, detail=f"source must be one of: {', '.join(SOURCES)}")
+    referenced = {h for h in (habit_id, workout_habit_id) if h}
+    if referenced:
+        try:
+            referenced = {uuid.UUID(h) for h in referenced}
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Habit not found")
+        result = await db.execute(select(Habit.id).where(Habit.user_id == current_user.id, Habit.id.in_(referenced)))
+        if len(result.all()) != len(referenced):
+            raise HTTPException(status_code=404, detail="Habit not found")
+
+    job_id = uuid.uuid4()
+    path = os.path.abspath(os.path.join(IMPORT_UPLOAD_DIR, str(job_id), os.path.basename(file.filename or "export")))
+    await run_in_threadpool(_save_upload, file, path)
+
+    job = ImportJob(
+        id=job_id,
+        user_id=current_user.id,
+        source=source,
+        file_path=path,
+        options=json.dumps({"habit_id": habit_id, "workout_habit_id": workout_habit_id}),
+        status="pending",
+        records_processed=0,
+        samples_imported=0,
+        logs_imported=0,
+        bytes_processed=0,
+    )
+    db.add(job)
+    await db.commit()
+    background_tasks.add_task(run_import, job_id)
+    return job
+
+@router.get("/{job_id}", response_model=ImportJobResponse)
+async def get_import(job_id: uuid.UUID, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    job = await _get_user_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+@router.post("/{job_id}/resume", response_model=ImportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def resume_import(
+    job_id: uuid.UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """Continue an interrupted or failed import from its last checkpoint"""
+    job = await _get_user_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.status == "completed":
+        raise HTTPException(status_code=409, detail="Import job already completed")
+    updated_at = job.updated_at
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    recently_active = updated_at is not None and datetime.now(timezone.utc) - updated_at < STALE_JOB_AFTER
+    if job.id in active_jobs or (job.status == "running" and recently_active):
+        raise HTTPException(status_code=409, detail="Import job is already running")
+    background_tasks.add_task(run_import, job.id)
+    return job
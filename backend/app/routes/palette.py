@@ -0,0 +1,95 @@
+# app/routes/palette.py
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from datetime import datetime, time, timezone
+
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.models.user import Profile
+from app.dependencies import get_async_db, get_current_user
+from app.routes.habit import habits_query, habits_version
+from app.schemas.palette import PaletteItem, PaletteResponse, PaletteSearchResult
+from app.utils.etags import cache_headers, etag_matches, habits_scope, listing_versions, not_modified, palette_scope, weak_etag
+from app.utils.palette_search import PaletteEntry, PaletteIndex, palette_indexes, palette_snapshots
+from app.utils.query_stats import query_budget
+
+router = APIRouter(tags=["Command Palette"])
+
+
+def _day_timestamp(day) -> float:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc).timestamp()
+
+
+async def _habits_token(db: AsyncSession, user_id) -> str:
+    # Moves on with every habit write, on any worker; see routes/habit.py
+    return await listing_versions.tracked(habits_scope(user_id), lambda: habits_version(db, user_id))
+
+
+async def _build_index(db: AsyncSession, user_id) -> PaletteIndex:
+    """The user's habits, with completed days as usage and the last one as recency"""
+    habits = (await db.execute(habits_query(user_id))).scalars().all()
+    usage = {
+        habit_id: (days, last_day)
+        for habit_id, days, last_day in (await db.execute(
+            select(HabitDailyRollup.habit_id, func.count(), func.max(HabitDailyRollup.day))
+            .where(HabitDailyRollup.user_id == user_id, HabitDailyRollup.completed_count > 0)
+            .group_by(HabitDailyRollup.habit_id)
+        )).all()
+    }
+    entries = []
+    for habit in habits:
+        days, last_day = usage.get(habit.id, (0, None))
+        item = PaletteSearchResult(
+            id=str(habit.id),
+            name=habit.name,
+            category=habit.category,
+            icon=habit.icon,
+            unit_type=habit.unit_type,
+            usage_count=days,
+        )
+        entries.append(PaletteEntry(
+            item.id,
+            habit.name,
+            usage_count=days,
+            last_used=_day_timestamp(last_day) if last_day else None,
+            item=item,
+        ))
+    return PaletteIndex(entries)
+
+
+@router.get("/search", response_model=List[PaletteSearchResult])
+@query_budget(4)
+async def search_palette(
+    q: str = Query("", max_length=200, description="Search text; empty ranks by usage and recency"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Profile = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Best matches among the authenticated user's habits for the command palette"""
+    # The index is rebuilt only once the habits list's version moves on
+    token = await _habits_token(db, current_user.id)
+    index = palette_indexes.get(current_user.id, token)
+    if index is None:
+        index = palette_indexes.put(current_user.id, token, await _build_index(db, current_user.id))
+    return [entry.item for _, entry in index.search(q, limit)]
+
+
+@router.get("/", response_model=PaletteResponse)
+@query_budget(3)
+async def get_palette(request: Request, current_user: Profile = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Everything the command palette lists when it opens, serialized once per version"""
+    etag = weak_etag(palette_scope(current_user.id), await _habits_token(db, current_user.id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    snapshot = palette_snapshots.get(str(current_user.id))
+    if snapshot is None or snapshot[0] != etag:
+        habits = (await db.execute(habits_query(current_user.id))).scalars().all()
+        grouped = {}
+        for habit in sorted(habits, key=lambda habit: (habit.name.lower(), str(habit.id))):
+            grouped.setdefault(habit.category, []).append(PaletteItem(
+                id=str(habit.id), name=habit.name, category=habit.category, icon=habit.icon, unit_type=habit.unit_type,
+            ))
+        snapshot = (etag, PaletteResponse(habits=grouped).model_dump_json().encode())
+        palette_snapshots.set(str(current_user.id), snapshot)
+    return Response(content=snapshot[1], media_type="application/json", headers=cache_headers(etag))
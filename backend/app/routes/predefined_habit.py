@@ -1,14 +1,21 @@
 # app/routes/predefined_habit.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.models.predefined_habit import PredefinedHabit
 from app.schemas.predefined_habit import PredefinedHabitResponse
 from app.dependencies import get_db
+from app.utils.etags import PREDEFINED_HABITS_SCOPE, cache_headers, etag_matches, listing_versions, not_modified, weak_etag
+from app.utils.versions import read_version_sync
 
 router = APIRouter(tags=["Predefined Habits"])
 
 @router.get("/", response_model=List[PredefinedHabitResponse])
-def get_predefined_habits(db: Session = Depends(get_db)):
-    return db.query(PredefinedHabit).all()
\ No newline at end of file
+def get_predefined_habits(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Bumped by a trigger on predefined_habits, which is edited outside the API
+    etag = weak_etag(PREDEFINED_HABITS_SCOPE, listing_versions.tracked_sync(PREDEFINED_HABITS_SCOPE, lambda: read_version_sync(db, PREDEFINED_HABITS_SCOPE)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return db.query(PredefinedHabit).all()
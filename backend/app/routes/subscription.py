@@ -1,5 +1,5 @@
 # app/routes/subscription.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
@@ -8,17 +8,27 @@ from app.models.subscription import Subscription
 from app.schemas.subscription import SubscriptionCreate, SubscriptionResponse
 from app.dependencies import get_db, get_current_user
 from app.models.user import Profile
+from app.utils.etags import cache_headers, etag_matches, listing_versions, not_modified, subscriptions_scope, weak_etag
+from app.utils.versions import bump_versions_sync, read_version_sync
 
 router = APIRouter(tags=["Subscriptions"])
 
 @router.get("/", response_model=List[SubscriptionResponse])
-def get_subscriptions(db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
+def get_subscriptions(request: Request, response: Response, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
+    scope = subscriptions_scope(current_user.id)
+    etag = weak_etag(scope, listing_versions.tracked_sync(scope, lambda: read_version_sync(db, scope)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
     return db.query(Subscription).filter(Subscription.user_id == current_user.id).all()
 
 @router.post("/", response_model=SubscriptionResponse)
 def create_subscription(sub: SubscriptionCreate, db: Session = Depends(get_db), current_user: Profile = Depends(get_current_user)):
     db_sub = Subscription(**sub.dict(), id=uuid.uuid4(), user_id=current_user.id)
     db.add(db_sub)
+    # Every worker's ETag for the list changes with this commit
+    bump_versions_sync(db, [subscriptions_scope(current_user.id)])
     db.commit()
+    listing_versions.invalidate(subscriptions_scope(current_user.id))
     db.refresh(db_sub)
-    return db_sub
\ No newline at end of file
+    return db_sub
@@ -0,0 +1,81 @@
+# app/routes/sync.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.models.change_log import ChangeLog
+from app.models.habit import Habit
+from app.models.habit_log import HabitLog
+from app.schemas.sync import SyncResponse
+from app.dependencies import get_async_db, get_current_user
+from app.models.user import Profile
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.query_stats import query_budget
+
+router = APIRouter(tags=["Sync"])
+
+DEFAULT_SYNC_LIMIT = 1000
+MAX_SYNC_LIMIT = 5000
+
+def changes_query(user_id, after: int, limit: int):
+    """
+    A user's changes after seq `after`; `python -m app.migrations explain` checks its plan
+    """
+    return (
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .where(ChangeLog.user_id == user_id, ChangeLog.seq > after)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    )
+
+@router.get("/", response_model=SyncResponse)
+@query_budget(4)
+async def get_changes(
+    since: Optional[str] = Query(None, description="next_cursor from the previous sync; omit for a full sync"),
+    limit: int = Query(DEFAULT_SYNC_LIMIT, ge=1, le=MAX_SYNC_LIMIT, description="Maximum changes to return"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """Habits and habit logs changed since the cursor, plus tombstones for deleted ones"""
+    after = 0
+    if since:
+        try:
+            (cursor_seq,) = decode_cursor(since, 1)
+            after = int(cursor_seq)
+        except (InvalidCursor, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    result = await db.execute(changes_query(current_user.id, after, limit))
+    changes = result.all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    upserted = {"habit": set(), "habit_log": set()}
+    deleted = {"habit": set(), "habit_log": set()}
+    for _, entity, entity_id, op in changes:
+        (upserted if op == "upsert" else deleted)[entity].add(entity_id)
+
+    # Current state of everything upserted, one query per entity
+    habits, logs = [], []
+    if upserted["habit"]:
+        habits = (await db.execute(
+            select(Habit).where(Habit.user_id == current_user.id, Habit.id.in_(upserted["habit"]))
+        )).scalars().all()
+    if upserted["habit_log"]:
+        logs = (await db.execute(
+            select(HabitLog).where(HabitLog.user_id == current_user.id, HabitLog.id.in_(upserted["habit_log"]))
+        )).scalars().all()
+
+    # Rows that vanished without their own tombstone (logs removed with their habit) are deletions too
+    deleted["habit"] |= upserted["habit"] - {habit.id for habit in habits}
+    deleted["habit_log"] |= upserted["habit_log"] - {log.id for log in logs}
+
+    return {
+        "habits": habits,
+        "habit_logs": logs,
+        "deleted_habits": [str(entity_id) for entity_id in deleted["habit"]],
+        "deleted_habit_logs": [str(entity_id) for entity_id in deleted["habit_log"]],
+        "next_cursor": encode_cursor(changes[-1][0] if changes else after),
+        "has_more": has_more,
+    }
@@ -0,0 +1,203 @@
+# app/routes/timer_session.py
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import uuid
+
+from app.models.habit import Habit
+from app.models.habit_log import HabitLog
+from app.models.timer_session import TimerSession
+from app.schemas.timer_session import TimerSessionResponse, TimerSessionStart, TimerSessionStop
+from app.dependencies import get_async_db, get_current_user
+from app.models.user import Profile
+from app.utils.changes import record_change
+from app.utils.events import event_broker
+from app.utils.rollups import log_snapshot, record_log_change
+from app.utils.timers import effective_end, elapsed_seconds, heartbeat_buffer, utcnow
+from app.utils.query_stats import query_budget
+
+router = APIRouter(tags=["Timer Sessions"])
+
+async def _get_user_session(db: AsyncSession, session_id: str, user_id, for_update: bool = False) -> TimerSession:
+    try:
+        session_id = uuid.UUID(session_id)
+    except ValueError:
+        return None
+    query = select(TimerSession).where(TimerSession.id == session_id, TimerSession.user_id == user_id)
+    if for_update:
+        # Serializes concurrent transitions of the same session (no-op on SQLite)
+        query = query.with_for_update()
+    result = await db.execute(query)
+    return result.scalars().first()
+
+def _session_response(session: TimerSession, until=None) -> dict:
+    return {
+        "id": session.id,
+        "habit_id": session.habit_id,
+        "status": session.status,
+        "started_at": session.started_at,
+        "elapsed_seconds": elapsed_seconds(session, until or utcnow()),
+        "last_heartbeat_at": heartbeat_buffer.last_seen(session.id) or session.last_heartbeat_at,
+        "ended_at": session.ended_at,
+        "habit_log_id": session.habit_log_id,
+        "notes": session.notes,
+    }
+
+def _pause(session: TimerSession, until) -> None:
+    session.accumulated_seconds = elapsed_seconds(session, until)
+    session.segment_started_at = None
+
+@router.get("/", response_model=List[TimerSessionResponse])
+async def get_active_sessions(db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    """Running and paused sessions, so a client can restore its timers after a restart"""
+    result = await db.execute(
+        select(TimerSession)
+        .where(TimerSession.user_id == current_user.id, TimerSession.status.in_(("running", "paused")))
+        .order_by(TimerSession.started_at)
+    )
+    return [_session_response(session) for session in result.scalars().all()]
+
+@router.post("/", response_model=TimerSessionResponse, status_code=status.HTTP_201_CREATED)
+async def start_session(payload: TimerSessionStart, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    try:
+        habit_id = uuid.UUID(payload.habit_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    result = await db.execute(select(Habit.id).where(Habit.id == habit_id, Habit.user_id == current_user.id))
+    if not result.first():
+        raise HTTPException(status_code=404, detail="Habit not found")
+
+    result = await db.execute(select(TimerSession.id).where(
+        TimerSession.user_id == current_user.id,
+        TimerSession.habit_id == habit_id,
+        TimerSession.status.in_(("running", "paused")),
+    ))
+    existing = result.first()
+    if existing:
+        raise HTTPException(status_code=409, detail=f"A timer is already active for this habit: {existing.id}")
+
+    now = utcnow()
+    session = TimerSession(
+        id=uuid.uuid4(),
+        user_id=current_user.id,
+        habit_id=habit_id,
+        status="running",
+        started_at=now,
+        segment_started_at=now,
+        accumulated_seconds=0,
+        last_heartbeat_at=now,
+        notes=payload.notes,
+    )
+    db.add(session)
+    await db.commit()
+    heartbeat_buffer.remember(session)
+    return _session_response(session, now)
+
+@router.get("/{session_id}", response_model=TimerSessionResponse)
+async def get_session(session_id: str, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    session = await _get_user_session(db, session_id, current_user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Timer session not found")
+    return _session_response(session)
+
+@router.post("/{session_id}/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(2)
+async def heartbeat(session_id: str, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    """Mark a running timer as alive; buffered in memory and written in batches"""
+    if heartbeat_buffer.touch(session_id, current_user.id):
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    # Not cached in this worker (restart, another worker served start): check once
+    session = await _get_user_session(db, session_id, current_user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Timer session not found")
+    if session.status != "running":
+        raise HTTPException(status_code=409, detail=f"Timer session is {session.status}")
+    heartbeat_buffer.remember(session)
+    heartbeat_buffer.touch(session.id, current_user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/{session_id}/pause", response_model=TimerSessionResponse)
+async def pause_session(session_id: str, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    session = await _get_user_session(db, session_id, current_user.id, for_update=True)
+    if not session:
+        raise HTTPException(status_code=404, detail="Timer session not found")
+    if session.status != "running":
+        raise HTTPException(status_code=409, detail=f"Timer session is {session.status}")
+
+    now = utcnow()
+    last_seen = heartbeat_buffer.last_seen(session.id)
+    _pause(session, effective_end(session, last_seen, now))
+    session.status = "paused"
+    session.last_heartbeat_at = last_seen or session.last_heartbeat_at
+    await db.commit()
+    heartbeat_buffer.forget(session.id)
+    return _session_response(session, now)
+
+@router.post("/{session_id}/resume", response_model=TimerSessionResponse)
+async def resume_session(session_id: str, db: AsyncSession = Depends(get_async_db), current_user: Profile = Depends(get_current_user)):
+    session = await _get_user_session(db, session_id, current_user.id, for_update=True)
+    if not session:
+        raise HTTPException(status_code=404, detail="Timer session not found")
+    if session.status != "paused":
+        raise HTTPException(status_code=409, detail=f"Timer session is {session.status}")
+
+    now = utcnow()
+    session.status = "running"
+    session.segment_started_at = now
+    session.last_heartbeat_at = now
+    await db.commit()
+    heartbeat_buffer.remember(session)
+    return _session_response(session, now)
+
+@router.post("/{session_id}/stop", response_model=TimerSessionResponse)
+async def stop_session(
+    session_id: str,
+    payload: Optional[TimerSessionStop] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Profile = Depends(get_current_user)
+):
+    """End the session and record it as a completed habit log with its duration in seconds"""
+    payload = payload or TimerSessionStop()
+    session = await _get_user_session(db, session_id, current_user.id, for_update=True)
+    if not session:
+        raise HTTPException(status_code=404, detail="Timer session not found")
+    if session.status == "stopped":
+        # A retried stop returns the already finalized session
+        return _session_response(session)
+
+    now = utcnow()
+    last_seen = heartbeat_buffer.last_seen(session.id)
+    if session.status == "running":
+        _pause(session, effective_end(session, last_seen, now))
+    session.status = "stopped"
+    session.ended_at = now
+    session.last_heartbeat_at = last_seen or session.last_heartbeat_at
+    if payload.notes is not None:
+        session.notes = payload.notes
+
+    db_log = None
+    if not payload.discard and session.accumulated_seconds > 0:
+        db_log = HabitLog(
+            id=uuid.uuid4(),
+            habit_id=session.habit_id,
+            user_id=current_user.id,
+            date=payload.date or session.started_at.date(),
+            duration=session.accumulated_seconds,
+            status="completed",
+            notes=session.notes,
+            # One log per session, even if the stop is retried concurrently
+            idempotency_key=f"timer:{session.id}",
+        )
+        db.add(db_log)
+        await db.flush()
+        session.habit_log_id = db_log.id
+        await record_log_change(db, None, log_snapshot(db_log))
+        await record_change(db, current_user.id, "habit_log", db_log.id, "upsert")
+    await db.commit()
+    heartbeat_buffer.forget(session.id)
+
+    if db_log is not None:
+        await event_broker.publish(current_user.id, "habit_log", "upsert", [db_log.id])
+    return _session_response(session, now)
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.models.user import Profile
 from app.dependencies import get_db, get_current_user  # assuming you have these
+from app.utils.cache import profile_cache
 import uuid
 
 router = APIRouter(
@@ -22,11 +23,16 @@ def update_my_profile(
     db: Session = Depends(get_db),
     current_user: Profile = Depends(get_current_user)
 ):
+    # current_user is a detached copy from the profile cache; update the live row
+    profile = db.query(Profile).filter(Profile.id == current_user.id).first()
+    if not profile:
+        profile_cache.invalidate(current_user.id)
+        raise HTTPException(status_code=404, detail="User not found")
     for key, value in user_update.dict(exclude_unset=True).items():
-        setattr(current_user, key, value)
+        setattr(profile, key, value)
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(profile)
+    return profile_cache.put(profile)
 
 
 @router.post("/register", response_model=UserResponse)
@@ -42,4 +48,4 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_user
+    return profile_cache.put(db_user)
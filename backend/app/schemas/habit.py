@@ -1,5 +1,5 @@
 # app/schemas/habit.py
-from datetime import datetime
+from datetime import datetime, date
 from typing import Optional, List
 from pydantic import BaseModel, field_validator
 from uuid import UUID
@@ -41,4 +41,35 @@ class HabitResponse(HabitBase):
         return value
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class HabitMetricsResponse(BaseModel):
+    habit_id: str
+    total_sessions: int
+    total_duration: int  # Seconds across completed logs
+    current_streak: int
+    longest_streak: int
+    completion_rate: float  # Percentage of logs that are completed
+    last_completed: Optional[date] = None
+
+    @field_validator('habit_id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+class HabitStreakResponse(BaseModel):
+    habit_id: str
+    current_streak: int
+    longest_streak: int
+    last_completed: Optional[date] = None
+
+    @field_validator('habit_id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
@@ -1,7 +1,7 @@
 # app/schemas/habit_data_integration.py
 from datetime import datetime
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, field_validator
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, field_validator, model_validator
 from uuid import UUID
 
 class HabitDataIntegrationBase(BaseModel):
@@ -29,4 +29,45 @@ class HabitDataIntegrationResponse(HabitDataIntegrationBase):
         return value
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class HabitDataIntegrationPage(BaseModel):
+    items: List[HabitDataIntegrationResponse]
+    next_cursor: Optional[str] = None
+
+class HabitDataColumnarBatch(BaseModel):
+    """One metric series sent as parallel arrays instead of one object per sample"""
+    habit_id: str
+    source: str
+    metric_name: str
+    unit: Optional[str] = None
+    timestamps: List[datetime]  # ISO 8601 strings or Unix seconds
+    values: List[float]
+
+    @model_validator(mode='after')
+    def check_lengths(self):
+        """timestamps and values must pair up"""
+        if len(self.timestamps) != len(self.values):
+            raise ValueError("timestamps and values must have the same length")
+        return self
+
+class HabitDataIngestError(BaseModel):
+    line: int  # 1-based NDJSON line, or index in a columnar batch
+    error: str
+
+class HabitDataIngestResponse(BaseModel):
+    accepted: int
+    rejected: int
+    durable: bool  # True once the accepted rows are committed, not just buffered
+    errors: List[HabitDataIngestError]
+
+class HabitDataSeriesResponse(BaseModel):
+    """Bucketed series as parallel arrays, one entry per non-empty bucket (UTC)"""
+    metric: str
+    resolution: str
+    bucket_starts: List[datetime]
+    count: List[int]
+    sum: List[float]
+    min: List[float]
+    max: List[float]
+    mean: List[float]
@@ -1,7 +1,7 @@
 # app/schemas/habit_log.py
 from datetime import datetime, date
-from typing import Optional
-from pydantic import BaseModel, field_validator
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
 from uuid import UUID
 
 class HabitLogBase(BaseModel):
@@ -38,4 +38,55 @@ class HabitLogResponse(HabitLogBase):
         return value
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+MAX_BULK_LOGS = 10000
+
+class HabitLogBulkItem(HabitLogCreate):
+    # Retrying an item with the same key returns the original log instead of a duplicate
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+class HabitLogBulkCreate(BaseModel):
+    logs: List[HabitLogBulkItem] = Field(..., min_length=1, max_length=MAX_BULK_LOGS)
+
+class HabitLogBulkResult(BaseModel):
+    index: int  # Position in the request's logs list
+    status: str  # "created", "duplicate" or "error"
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+    @field_validator('id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+class HabitLogBulkResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[HabitLogBulkResult]
+
+class HabitLogPage(BaseModel):
+    items: List[HabitLogResponse]
+    next_cursor: Optional[str] = None
+
+class HabitHeatmapRow(BaseModel):
+    habit_id: str
+    data: str  # base64 of the encoded day grid
+
+    @field_validator('habit_id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+class HabitHeatmapResponse(BaseModel):
+    year: int
+    days: int  # Grid length; index 0 is January 1st
+    encoding: str  # "rle": (run length, value) byte pairs, "raw": one byte per day
+    habits: List[HabitHeatmapRow]
@@ -0,0 +1,29 @@
+# app/schemas/import_job.py
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, field_validator
+from uuid import UUID
+
+class ImportJobResponse(BaseModel):
+    id: str
+    source: str
+    status: str
+    records_processed: int
+    samples_imported: int
+    logs_imported: int
+    bytes_total: Optional[int] = None
+    bytes_processed: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator('id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,17 @@
+# app/schemas/palette.py
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+class PaletteItem(BaseModel):
+    id: str
+    name: str
+    type: str = "habit"
+    category: Optional[str] = None
+    icon: Optional[str] = None
+    unit_type: Optional[str] = None
+
+class PaletteSearchResult(PaletteItem):
+    usage_count: int = 0  # Days the habit was completed
+
+class PaletteResponse(BaseModel):
+    habits: Dict[str, List[PaletteItem]]  # By category, sorted by name
@@ -0,0 +1,14 @@
+# app/schemas/sync.py
+from typing import List
+from pydantic import BaseModel
+
+from app.schemas.habit import HabitResponse
+from app.schemas.habit_log import HabitLogResponse
+
+class SyncResponse(BaseModel):
+    habits: List[HabitResponse]  # Created or updated since the cursor, current state
+    habit_logs: List[HabitLogResponse]
+    deleted_habits: List[str]  # Tombstones; a deleted habit's logs are deleted too
+    deleted_habit_logs: List[str]
+    next_cursor: str  # Pass as `since` on the next call
+    has_more: bool  # More changes are waiting; call again right away
@@ -0,0 +1,36 @@
+# app/schemas/timer_session.py
+from datetime import datetime, date
+from typing import Optional
+from pydantic import BaseModel, field_validator
+from uuid import UUID
+
+class TimerSessionStart(BaseModel):
+    habit_id: str
+    notes: Optional[str] = None
+
+class TimerSessionStop(BaseModel):
+    date: Optional[date] = None  # Day to log the session on; defaults to the day it started (UTC)
+    notes: Optional[str] = None
+    discard: bool = False  # End the session without creating a habit log
+
+class TimerSessionResponse(BaseModel):
+    id: str
+    habit_id: str
+    status: str
+    started_at: datetime
+    elapsed_seconds: int
+    last_heartbeat_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    habit_log_id: Optional[str] = None
+    notes: Optional[str] = None
+
+    @field_validator('id', 'habit_id', 'habit_log_id', mode='before')
+    @classmethod
+    def convert_uuid_to_str(cls, value):
+        """Convert UUID objects to strings"""
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+    class Config:
+        from_attributes = True
@@ -5,6 +5,9 @@ from supabase import Client
 from app.utils.supabase import get_supabase_client
 from app.models.user import UserResponse # Assuming UserResponse is the Pydantic model for a user
 from app.services.user_service import get_user_by_id # To fetch full profile if needed
+from app.utils.log import get_logger
+
+logger = get_logger("auth")
 
 # This should point to your token generation endpoint (e.g., /api/auth/token or /auth/token)
 # Adjust if your token URL is different. If you handle token generation client-side via Supabase SDK
@@ -37,6 +40,5 @@ async def get_current_active_user(token: str = Depends(oauth2_scheme), supabase:
             )
         return db_user
     except Exception as e: # Catch Supabase errors or other issues
-        # Log the exception e if you have logging setup
-        print(f"Error in get_current_active_user: {e}") # Basic logging
+        logger.warning("get_current_active_user failed: %s", e)
         raise credentials_exception 
\ No newline at end of file
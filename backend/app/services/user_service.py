@@ -5,8 +5,12 @@ User service for handling user operations
 from typing import Dict, Optional, List, Any
 from fastapi import HTTPException, status
 
-from app.models.user import UserCreate, UserUpdate, UserResponse
+from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.utils.cache import profile_cache
 from app.utils.supabase import get_supabase_client, get_supabase_admin_client
+from app.utils.log import get_logger
+
+logger = get_logger("users")
 
 
 async def get_user_by_id(user_id: str) -> UserResponse:
@@ -128,12 +132,14 @@ async def delete_user(user_id: str) -> Dict[str, Any]:
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete user profile"
         )
+    # Otherwise get_current_user keeps accepting the user's tokens until the entry expires
+    profile_cache.invalidate(user_id)
     
     # Then delete from auth
     try:
         supabase.auth.admin.delete_user(user_id)
     except Exception as e:
         # If auth deletion fails, we should log this, but the profile is already deleted
-        print(f"Failed to delete user from auth: {str(e)}")
+        logger.error("Failed to delete user %s from auth: %s", user_id, e)
     
     return {"message": "User deleted successfully", "id": user_id} 
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+In-process caches
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+from app.models.user import Profile
+
+# Load environment variables
+load_dotenv()
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe mapping with per-entry expiry and LRU eviction
+
+    A ttl of None (or inf) keeps entries until they are evicted or invalidated.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float]):
+        self.maxsize = maxsize
+        self.ttl = math.inf if ttl is None else ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                # JSON has no Infinity: no expiry is reported as null
+                "ttl_seconds": self.ttl if math.isfinite(self.ttl) else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ProfileCache:
+    """
+    Per-process cache of `profiles` rows keyed by user id.
+
+    Entries are detached copies, so a cached profile never refers to a closed
+    session. Routes that modify a profile must re-load it in their own session and then
+    call `put()` (write-through) or `invalidate()`.
+    """
+
+    def __init__(self, maxsize: int = PROFILE_CACHE_SIZE, ttl: float = PROFILE_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, user_id: Any) -> Optional[Profile]:
+        return self._cache.get(str(user_id))
+
+    def put(self, profile: Profile) -> Profile:
+        snapshot = _detached_copy(profile)
+        self._cache.set(str(profile.id), snapshot)
+        return snapshot
+
+    def invalidate(self, user_id: Any) -> None:
+        self._cache.invalidate(str(user_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+def _detached_copy(profile: Profile) -> Profile:
+    return Profile(**{column.key: getattr(profile, column.key) for column in Profile.__table__.columns})
+
+
+profile_cache = ProfileCache()
@@ -0,0 +1,56 @@
+"""
+Per-user change feed for delta sync
+
+Every mutation of a habit or habit log records (entity, id, op) in change_log
+in the same transaction. Only the latest change per row is kept, so the table
+grows with the number of rows, not the number of edits, and a client catching
+up reads O(changes since its cursor).
+"""
+
+import uuid
+from typing import Any, Iterable
+
+from sqlalchemy import delete, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.change_log import ChangeLog
+
+ENTITIES = ("habit", "habit_log")
+OPS = ("upsert", "delete")
+
+# Ids per statement, to stay under bind-parameter limits
+_CHUNK = 1000
+
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+async def record_changes(db: AsyncSession, user_id: Any, entity: str, entity_ids: Iterable[Any], op: str) -> None:
+    """
+    Append changes for `entity_ids`; call before the mutation is committed
+    """
+    if entity not in ENTITIES or op not in OPS:
+        raise ValueError(f"Unknown change {entity}/{op}")
+    entity_ids = [_as_uuid(entity_id) for entity_id in entity_ids]
+    if not entity_ids:
+        return
+    user_id = _as_uuid(user_id)
+
+    if db.bind.dialect.name == "postgresql":
+        # Hold this user's feed until commit, so seq order matches commit order and a
+        # client never skips a lower seq that commits after it synced a higher one
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"change_log:{user_id}"})
+
+    table = ChangeLog.__table__
+    for start in range(0, len(entity_ids), _CHUNK):
+        chunk = entity_ids[start:start + _CHUNK]
+        # A syncing client only needs the latest state of each row
+        await db.execute(delete(table).where(table.c.entity == entity, table.c.entity_id.in_(chunk)))
+        await db.execute(insert(table).values([
+            {"user_id": user_id, "entity": entity, "entity_id": entity_id, "op": op} for entity_id in chunk
+        ]))
+
+
+async def record_change(db: AsyncSession, user_id: Any, entity: str, entity_id: Any, op: str) -> None:
+    await record_changes(db, user_id, entity, [entity_id], op)
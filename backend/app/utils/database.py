@@ -3,9 +3,15 @@ Database configuration for connecting to Supabase PostgreSQL
 """
 
 import os
+import threading
+import time
+from typing import Any, Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from databases import Database
 from dotenv import load_dotenv
 
@@ -15,7 +21,7 @@ load_dotenv()
 # Get connection details from environment variables
 # Use SQLite for local development if no DATABASE_URL is provided
 DATABASE_URL = os.getenv(
-    "DATABASE_URL", 
+    "DATABASE_URL",
     "sqlite:///./ritual.db"  # Local SQLite database for development
 )
 
@@ -23,14 +29,187 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://")
 
+# Connection pool profile: dev | prod | pgbouncer
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "dev").lower()
+
+# Every uvicorn worker owns its own pool, so the server-side connection budget
+# is split evenly between workers. run.py exports the count it starts as
+# WEB_CONCURRENCY; other launchers get run.py's defaults (one worker in DEBUG,
+# otherwise UVICORN_WORKERS or 2), so the pools are never sized for fewer
+# workers than are running.
+DEFAULT_WORKER_COUNT = 2
+DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
+WORKER_COUNT = max(1, int(
+    os.getenv("WEB_CONCURRENCY")
+    or ("1" if DEBUG else os.getenv("UVICORN_WORKERS") or str(DEFAULT_WORKER_COUNT))
+))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+# Each worker has a sync and an async engine; the profile's pool is split between
+# them rather than given to both. The async engine serves the hot routes.
+DB_SYNC_POOL_SHARE = float(os.getenv("DB_SYNC_POOL_SHARE", "0.34"))
+
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    "dev": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 0,
+    },
+    "prod": {
+        # 2/3 of the per-worker budget is kept open, the rest is burst overflow
+        "pool_size": max(1, (DB_MAX_CONNECTIONS // WORKER_COUNT) * 2 // 3),
+        "max_overflow": max(0, (DB_MAX_CONNECTIONS // WORKER_COUNT) // 3),
+        "pool_timeout": 10,
+        # Supabase drops idle connections; recycle well before that happens
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+        "statement_timeout_ms": 15000,
+    },
+    "pgbouncer": {
+        # PgBouncer already pools server connections; holding client-side
+        # connections open would just pin PgBouncer slots. Startup options are
+        # rejected in transaction mode, so set statement_timeout on the role.
+        "poolclass": NullPool,
+        "pool_pre_ping": False,
+        "statement_timeout_ms": 0,
+    },
+}
+
+
+def _pool_settings(profile: str) -> Dict[str, Any]:
+    if profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown DB_POOL_PROFILE '{profile}'. Expected one of: {', '.join(POOL_PROFILES)}")
+
+    settings = dict(POOL_PROFILES[profile])
+    # Individual env vars override the chosen profile
+    overrides = {
+        "pool_size": ("DB_POOL_SIZE", int),
+        "max_overflow": ("DB_MAX_OVERFLOW", int),
+        "pool_timeout": ("DB_POOL_TIMEOUT", float),
+        "pool_recycle": ("DB_POOL_RECYCLE", int),
+        "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v.lower() in ("true", "1", "t")),
+        "statement_timeout_ms": ("DB_STATEMENT_TIMEOUT_MS", int),
+    }
+    for key, (env_name, cast) in overrides.items():
+        value = os.getenv(env_name)
+        if value is not None:
+            settings[key] = cast(value)
+    return settings
+
+
+def _split_pool(settings: Dict[str, Any], sync: bool) -> Dict[str, Any]:
+    """
+    One engine's part of the worker's pool: DB_SYNC_POOL_SHARE for the sync engine, the rest for the async one
+    """
+    for key, minimum in (("pool_size", 1), ("max_overflow", 0)):
+        if key in settings:
+            sync_part = max(minimum, int(settings[key] * DB_SYNC_POOL_SHARE))
+            settings[key] = sync_part if sync else max(minimum, settings[key] - sync_part)
+    return settings
+
+
+class _CheckoutTimer:
+    """
+    Pool mixin that records how long callers wait to check out a connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._wait_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+class TimedQueuePool(_CheckoutTimer, QueuePool):
+    """
+    QueuePool for the sync engine, with checkout wait times
+    """
+
+
+class TimedAsyncQueuePool(_CheckoutTimer, AsyncAdaptedQueuePool):
+    """
+    The async engine's queue pool, with checkout wait times
+    """
+
+
+def _engine_kwargs(url: str) -> Dict[str, Any]:
+    if url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False}}
+
+    settings = _split_pool(_pool_settings(DB_POOL_PROFILE), sync=True)
+    statement_timeout_ms = settings.pop("statement_timeout_ms", 0)
+    kwargs: Dict[str, Any] = {"pool_pre_ping": settings.pop("pool_pre_ping")}
+    if settings.get("poolclass") is NullPool:
+        # Sizing knobs do not apply without a client-side pool
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs["poolclass"] = TimedQueuePool
+        kwargs.update(settings)
+    if statement_timeout_ms:
+        kwargs["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    return kwargs
+
+
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    return url
+
+
+def _async_engine_kwargs(url: str) -> Dict[str, Any]:
+    if url.startswith("sqlite"):
+        return {}
+
+    settings = _split_pool(_pool_settings(DB_POOL_PROFILE), sync=False)
+    statement_timeout_ms = settings.pop("statement_timeout_ms", 0)
+    kwargs: Dict[str, Any] = {"pool_pre_ping": settings.pop("pool_pre_ping")}
+    connect_args: Dict[str, Any] = {}
+    if settings.get("poolclass") is NullPool:
+        kwargs["poolclass"] = NullPool
+        # PgBouncer in transaction mode cannot keep asyncpg's prepared statements
+        connect_args.update({"statement_cache_size": 0, "prepared_statement_cache_size": 0})
+    else:
+        # Async engines need the asyncio-aware queue pool
+        kwargs["poolclass"] = TimedAsyncQueuePool
+        kwargs.update(settings)
+    if statement_timeout_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+    if connect_args:
+        kwargs["connect_args"] = connect_args
+    return kwargs
+
+
 # Create engine and session
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine (asyncpg / aiosqlite) for handlers that should not occupy a threadpool thread
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_async_engine_kwargs(ASYNC_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Async database instance for raw queries (SQLite doesn't need async for simple cases)
 database = Database(DATABASE_URL) if not DATABASE_URL.startswith("sqlite") else None
 
@@ -40,4 +219,55 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
+        db.close()
+
+# Async dependency to get DB session - used in async FastAPI endpoints
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def dialect_insert(dialect_name: str):
+    """
+    The dialect's insert() construct, which supports ON CONFLICT clauses
+    """
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not implemented for {dialect_name}")
+    return insert
+
+def _queue_pool_stats(pool) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, _CheckoutTimer):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.timeouts,
+            "avg_wait_ms": (pool.total_wait / pool.checkouts * 1000) if pool.checkouts else 0.0,
+            "max_wait_ms": pool.max_wait * 1000,
+        })
+    return stats
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Snapshot of the connection pools for this worker; "async" is the async engine's
+    """
+    pool = engine.pool
+    stats: Dict[str, Any] = {
+        "profile": DB_POOL_PROFILE if not DATABASE_URL.startswith("sqlite") else "sqlite",
+        "pool_class": type(pool).__name__,
+        "workers": WORKER_COUNT,
+    }
+    stats.update(_queue_pool_stats(pool))
+    async_pool = async_engine.sync_engine.pool
+    stats["async"] = {"pool_class": type(async_pool).__name__, **_queue_pool_stats(async_pool)}
+    return stats
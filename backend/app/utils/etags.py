@@ -0,0 +1,150 @@
+"""
+Conditional GET support for list endpoints
+
+Listings carry a weak ETag built from a version token for their scope
+("habits:<user id>", "habit_units", ...). The token is looked up in memory
+before the listing query runs, so a matching If-None-Match is answered with a
+304 without touching the database. Writes invalidate the scope's token after
+they commit.
+
+Scopes come in two kinds:
+- tracked: the token is loaded from the database, so every worker agrees on
+  it: the user's change_log head for habits, and the scope's scope_versions
+  row (app.utils.versions) for the other listings, bumped in the writing
+  transaction (by trigger for habit_units and predefined_habits, which are
+  edited outside the API). Loaded tokens are cached for
+  ETAG_VERSION_TTL_SECONDS: by default 60 s with a single worker, where local
+  invalidation sees every API write and the TTL bounds how long a write made
+  outside the API goes unseen, and not at all with several, where the
+  loader's one-row query still replaces the full listing query.
+- local: the token is minted in process, for data that only lives in this
+  process's memory. Tokens expire after ETAG_LOCAL_MAX_AGE_SECONDS.
+"""
+
+import hashlib
+import itertools
+import os
+import secrets
+from typing import Any, Awaitable, Callable, Dict
+
+from dotenv import load_dotenv
+from fastapi import Request, Response, status
+
+from app.utils.cache import TTLCache
+from app.utils.database import WORKER_COUNT
+
+# Load environment variables
+load_dotenv()
+
+ETAG_VERSION_TTL_SECONDS = float(os.getenv("ETAG_VERSION_TTL_SECONDS", "60" if WORKER_COUNT == 1 else "0"))
+ETAG_LOCAL_MAX_AGE_SECONDS = float(os.getenv("ETAG_LOCAL_MAX_AGE_SECONDS", "60"))
+ETAG_VERSION_CACHE_SIZE = int(os.getenv("ETAG_VERSION_CACHE_SIZE", "100000"))
+
+CACHE_CONTROL = "private, no-cache"
+
+
+class VersionRegistry:
+    """
+    Current version token per listing scope
+    """
+
+    def __init__(
+        self,
+        tracked_ttl: float = ETAG_VERSION_TTL_SECONDS,
+        local_max_age: float = ETAG_LOCAL_MAX_AGE_SECONDS,
+        maxsize: int = ETAG_VERSION_CACHE_SIZE,
+    ):
+        self._tracked = TTLCache(maxsize, tracked_ttl)
+        self._local = TTLCache(maxsize, local_max_age)
+        # Distinguishes this process's local tokens from another worker's
+        self._epoch = secrets.token_hex(4)
+        self._counter = itertools.count(1)
+        self._invalidations = 0
+
+    async def tracked(self, scope: str, loader: Callable[[], Awaitable[Any]]) -> str:
+        token = self._tracked.get(scope)
+        if token is None:
+            invalidations = self._invalidations
+            token = str(await loader())
+            self._remember(scope, token, invalidations)
+        return token
+
+    def tracked_sync(self, scope: str, loader: Callable[[], Any]) -> str:
+        """
+        tracked() for routes on the sync engine
+        """
+        token = self._tracked.get(scope)
+        if token is None:
+            invalidations = self._invalidations
+            token = str(loader())
+            self._remember(scope, token, invalidations)
+        return token
+
+    def _remember(self, scope: str, token: str, invalidations: int) -> None:
+        # A write that committed while we were loading may not be in the loaded value
+        if invalidations == self._invalidations:
+            self._tracked.set(scope, token)
+
+    def local(self, scope: str) -> str:
+        token = self._local.get(scope)
+        if token is None:
+            token = f"{self._epoch}.{next(self._counter)}"
+            self._local.set(scope, token)
+        return token
+
+    def invalidate(self, scope: str) -> None:
+        """
+        Call after a write to the scope commits
+        """
+        self._invalidations += 1
+        self._tracked.invalidate(scope)
+        self._local.invalidate(scope)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"tracked": self._tracked.stats(), "local": self._local.stats()}
+
+
+def weak_etag(scope: str, token: str) -> str:
+    # The scope digest keeps equal tokens of different users or tables from matching
+    digest = hashlib.blake2b(scope.encode(), digest_size=4).hexdigest()
+    return f'W/"{digest}-{token}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Whether If-None-Match names this ETag (weak comparison, as RFC 9110 requires for GET)
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+
+
+def habits_scope(user_id: Any) -> str:
+    return f"habits:{user_id}"
+
+
+def subscriptions_scope(user_id: Any) -> str:
+    return f"subscriptions:{user_id}"
+
+
+HABIT_UNITS_SCOPE = "habit_units"
+PREDEFINED_HABITS_SCOPE = "predefined_habits"
+
+
+def palette_scope(user_id: Any) -> str:
+    return f"palette:{user_id}"
+
+
+listing_versions = VersionRegistry()
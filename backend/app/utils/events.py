@@ -0,0 +1,322 @@
+"""
+Per-user event streams for server push
+
+Routes publish a small hint after every committed habit or habit log mutation
+and each open `GET /events` connection receives the hints for its user. Events
+carry what changed, not the rows themselves: clients react by pulling
+`GET /sync` from their cursor, so a dropped or coalesced event never loses data.
+
+Two brokers are available (EVENTS_BROKER):
+- "local": in-process fan-out. Only correct with a single worker, since a
+  mutation handled by one worker is invisible to streams held by another.
+- "changelog": every worker polls change_log for the users it has streams
+  for, so the database is the shared bus. Delivery latency is bounded by
+  EVENTS_POLL_INTERVAL_SECONDS; one query per worker per tick (per
+  EVENTS_POLL_USERS_PER_QUERY users), regardless of the number of connections.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from dotenv import load_dotenv
+from sqlalchemy import and_, func, or_, select
+
+from app.models.change_log import ChangeLog
+from app.utils.database import AsyncSessionLocal, WORKER_COUNT
+from app.utils.log import get_logger
+
+logger = get_logger("events")
+
+# Load environment variables
+load_dotenv()
+
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "local" if WORKER_COUNT == 1 else "changelog").lower()
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "64"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_POLL_INTERVAL_SECONDS = float(os.getenv("EVENTS_POLL_INTERVAL_SECONDS", "1"))
+EVENTS_MAX_CONNECTIONS = int(os.getenv("EVENTS_MAX_CONNECTIONS", "10000"))
+EVENTS_MAX_CONNECTIONS_PER_USER = int(os.getenv("EVENTS_MAX_CONNECTIONS_PER_USER", "10"))
+# Users whose (user_id, seq > cursor) predicates share one poll statement
+EVENTS_POLL_USERS_PER_QUERY = int(os.getenv("EVENTS_POLL_USERS_PER_QUERY", "500"))
+
+# Events listing more ids than this only carry the count
+MAX_EVENT_IDS = 100
+
+
+class TooManyStreams(Exception):
+    """Raised when a new stream would exceed the per-user or per-worker limit"""
+
+
+def change_event(entity: str, op: str, entity_ids: List[Any]) -> Dict[str, Any]:
+    event: Dict[str, Any] = {"type": "change", "entity": entity, "op": op, "count": len(entity_ids)}
+    if len(entity_ids) <= MAX_EVENT_IDS:
+        event["ids"] = [str(entity_id) for entity_id in entity_ids]
+    return event
+
+
+class Subscription:
+    """
+    One open stream: a bounded queue the broker fills and the response drains.
+
+    A slow client never makes the publisher wait. When its queue is full the
+    pending events are replaced by a single "resync" event, which tells the
+    client to pull /sync instead of replaying individual changes.
+    """
+
+    def __init__(self, user_id: str, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=maxsize)
+        self.opened_at = time.monotonic()
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> bool:
+        """
+        Queue an event without blocking; returns False if the queue overflowed
+        """
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.dropped += 1
+        self.queue.put_nowait({"type": "resync"})
+        return False
+
+    async def next(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        The next event, or None if nothing arrived within `timeout` seconds
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """
+    In-process pub/sub keyed by user id
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        max_connections: int = EVENTS_MAX_CONNECTIONS,
+        max_per_user: int = EVENTS_MAX_CONNECTIONS_PER_USER,
+        queue_size: int = EVENTS_QUEUE_SIZE,
+    ):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._connections = 0
+        self._stats = {
+            "streams_opened": 0,
+            "streams_rejected": 0,
+            "events_published": 0,
+            "events_delivered": 0,
+            "events_dropped": 0,
+            "overflows": 0,
+        }
+
+    def subscribe(self, user_id: Any) -> Subscription:
+        user_id = str(user_id)
+        subscribers = self._subscribers.get(user_id, set())
+        if self._connections >= self.max_connections or len(subscribers) >= self.max_per_user:
+            self._stats["streams_rejected"] += 1
+            raise TooManyStreams("Too many open event streams")
+
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, subscribers).add(subscription)
+        self._connections += 1
+        self._stats["streams_opened"] += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if not subscribers or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self._connections -= 1
+        self._stats["events_dropped"] += subscription.dropped
+
+    def deliver(self, user_id: Any, event: Dict[str, Any]) -> None:
+        """
+        Hand an event to this worker's streams for the user
+        """
+        for subscription in self._subscribers.get(str(user_id), ()):
+            if subscription.offer(event):
+                self._stats["events_delivered"] += 1
+            else:
+                self._stats["overflows"] += 1
+
+    async def publish(self, user_id: Any, entity: str, op: str, entity_ids: Iterable[Any]) -> None:
+        """
+        Announce a committed change; call after db.commit()
+        """
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return
+        self._stats["events_published"] += 1
+        self.deliver(user_id, change_event(entity, op, entity_ids))
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["events_dropped"] += sum(
+            subscription.dropped for subscribers in self._subscribers.values() for subscription in subscribers
+        )
+        stats.update({
+            "broker": self.name,
+            "connections": self._connections,
+            "users": len(self._subscribers),
+            "max_connections": self.max_connections,
+            "queue_size": self.queue_size,
+        })
+        return stats
+
+
+def poll_query(cursors: Dict[Any, int]):
+    """
+    Changes after each user's own cursor; `python -m app.migrations explain` checks its plan
+
+    One (user_id, seq > cursor) range of ix_change_log_user_id_seq per user,
+    so a user far behind does not make the poll re-read everyone's recent changes.
+    """
+    return (
+        select(ChangeLog.user_id, ChangeLog.seq, ChangeLog.entity, ChangeLog.op, ChangeLog.entity_id)
+        .where(or_(*[
+            and_(ChangeLog.user_id == uuid.UUID(str(user_id)), ChangeLog.seq > cursor)
+            for user_id, cursor in cursors.items()
+        ]))
+        .order_by(ChangeLog.seq)
+    )
+
+
+class ChangeLogBroker(LocalBroker):
+    """
+    Broker for multiple workers that reads events back from change_log.
+
+    publish() does not deliver anything itself: the change is already in
+    change_log (recorded in the route's transaction), and the poller picks it up
+    on every worker, including this one.
+    """
+
+    name = "changelog"
+
+    def __init__(self, poll_interval: float = EVENTS_POLL_INTERVAL_SECONDS, session_factory=AsyncSessionLocal, **kwargs):
+        super().__init__(**kwargs)
+        self.poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        # Highest change_log seq already delivered, per subscribed user
+        self._cursors: Dict[str, int] = {}
+        self._stats.update({"polls": 0, "poll_errors": 0})
+
+    def subscribe(self, user_id: Any) -> Subscription:
+        subscription = super().subscribe(user_id)
+        # None until the poller has read the user's current position
+        self._cursors.setdefault(subscription.user_id, None)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        super().unsubscribe(subscription)
+        if subscription.user_id not in self._subscribers:
+            self._cursors.pop(subscription.user_id, None)
+
+    async def publish(self, user_id: Any, entity: str, op: str, entity_ids: Iterable[Any]) -> None:
+        self._stats["events_published"] += 1
+
+    async def poll(self) -> None:
+        user_ids = list(self._cursors)
+        if not user_ids:
+            return
+        self._stats["polls"] += 1
+
+        async with self._session_factory() as db:
+            new_users = [user_id for user_id in user_ids if self._cursors.get(user_id) is None]
+            if new_users:
+                # Streams start at the current end of the feed; earlier changes come from /sync
+                result = await db.execute(
+                    select(ChangeLog.user_id, func.max(ChangeLog.seq))
+                    .where(ChangeLog.user_id.in_([uuid.UUID(user_id) for user_id in new_users]))
+                    .group_by(ChangeLog.user_id)
+                )
+                heads = {str(user_id): seq for user_id, seq in result.all()}
+                for user_id in new_users:
+                    if user_id in self._cursors:
+                        self._cursors[user_id] = heads.get(user_id, 0)
+
+            known = [user_id for user_id in user_ids if user_id not in new_users]
+            rows = []
+            for start in range(0, len(known), EVENTS_POLL_USERS_PER_QUERY):
+                users = known[start:start + EVENTS_POLL_USERS_PER_QUERY]
+                result = await db.execute(poll_query({user_id: self._cursors.get(user_id) or 0 for user_id in users}))
+                rows.extend(result.all())
+
+        # One event per (user, entity, op) per tick
+        grouped: Dict[tuple, List[Any]] = {}
+        for user_id, seq, entity, op, entity_id in rows:
+            user_id = str(user_id)
+            cursor = self._cursors.get(user_id)
+            if cursor is None or seq <= cursor:
+                continue
+            grouped.setdefault((user_id, entity, op), []).append(entity_id)
+            self._cursors[user_id] = seq
+        for (user_id, entity, op), entity_ids in grouped.items():
+            self.deliver(user_id, change_event(entity, op, entity_ids))
+
+    async def run(self) -> None:
+        """
+        Background loop reading new change_log rows for subscribed users
+        """
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                self._stats["poll_errors"] += 1
+                logger.error("change_log poll failed: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["poll_interval_seconds"] = self.poll_interval
+        return stats
+
+
+BROKERS = {"local": LocalBroker, "changelog": ChangeLogBroker}
+
+
+def _create_broker(name: str) -> LocalBroker:
+    if name not in BROKERS:
+        raise ValueError(f"Unknown EVENTS_BROKER '{name}'. Expected one of: {', '.join(BROKERS)}")
+    return BROKERS[name]()
+
+
+event_broker = _create_broker(EVENTS_BROKER)
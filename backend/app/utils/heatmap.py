@@ -0,0 +1,75 @@
+"""
+Compact encodings for per-day calendar grids
+
+A grid is one uint8 intensity per day of the year. It is sent either as the raw
+bytes ("raw") or as (run length, value) byte pairs ("rle"), base64 encoded.
+Habits are logged on a minority of days, so RLE usually shrinks a year to a
+few dozen bytes.
+"""
+
+import base64
+import hashlib
+from datetime import date
+from typing import Iterable, Tuple
+
+ENCODINGS = ("rle", "raw")
+
+
+def days_in_year(year: int) -> int:
+    return (date(year + 1, 1, 1) - date(year, 1, 1)).days
+
+
+def build_grid(year: int, day_values: Iterable[Tuple[date, int]]) -> bytearray:
+    """
+    One byte per day of `year`; values are clamped to 0..255
+    """
+    grid = bytearray(days_in_year(year))
+    start = date(year, 1, 1).toordinal()
+    for day, value in day_values:
+        index = day.toordinal() - start
+        if 0 <= index < len(grid):
+            grid[index] = max(0, min(255, value))
+    return grid
+
+
+def rle_encode(grid: bytes) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(grid):
+        value = grid[i]
+        run = 1
+        while i + run < len(grid) and grid[i + run] == value and run < 255:
+            run += 1
+        out += bytes((run, value))
+        i += run
+    return bytes(out)
+
+
+def rle_decode(data: bytes) -> bytes:
+    out = bytearray()
+    for i in range(0, len(data), 2):
+        out += bytes((data[i + 1],)) * data[i]
+    return bytes(out)
+
+
+def encode_grid(grid: bytes, encoding: str) -> str:
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding '{encoding}'. Expected one of: {', '.join(ENCODINGS)}")
+    payload = rle_encode(grid) if encoding == "rle" else bytes(grid)
+    return base64.b64encode(payload).decode("ascii")
+
+
+def decode_grid(data: str, encoding: str) -> bytes:
+    payload = base64.b64decode(data)
+    return rle_decode(payload) if encoding == "rle" else payload
+
+
+def grid_etag(*parts) -> str:
+    """
+    Strong ETag over everything that shapes the response body
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
@@ -0,0 +1,403 @@
+"""
+Buffered ingestion of habit_data_integrations samples
+
+Wearable sources send minute-level samples, far too many for a commit per
+sample. Accepted rows are buffered per user in this worker and written in bulk
+(COPY on PostgreSQL, multi-row INSERT elsewhere) when a user's buffer reaches
+INGEST_FLUSH_ROWS or every INGEST_FLUSH_INTERVAL_SECONDS, whichever is first.
+When INGEST_MAX_BUFFERED_ROWS rows are waiting, new batches are refused until
+flushes catch up. A flush that violates a constraint (e.g. the habit was
+deleted meanwhile) drops only the offending rows and writes the rest.
+
+Rows in the buffer are not durable until flushed. A caller that needs a
+durable acknowledgement buffers its rows with an IngestTicket, flushes, and
+awaits ticket.durable(): it settles once the flush that took those rows (the
+caller's own, or a concurrent periodic one) has written or dropped them.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models.habit import Habit
+from app.models.habit_data_integration import HabitDataIntegration
+from app.models.user import Profile
+from app.utils.database import AsyncSessionLocal
+from app.utils.series import record_samples
+from app.utils.log import get_logger
+
+logger = get_logger("ingest")
+
+# Load environment variables
+load_dotenv()
+
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "5000"))
+INGEST_FLUSH_INTERVAL_SECONDS = float(os.getenv("INGEST_FLUSH_INTERVAL_SECONDS", "1.0"))
+INGEST_MAX_BUFFERED_ROWS = int(os.getenv("INGEST_MAX_BUFFERED_ROWS", "200000"))
+INGEST_USE_COPY = os.getenv("INGEST_USE_COPY", "True").lower() in ("true", "1", "t")
+
+# Rows per INSERT statement when COPY is not available
+_INSERT_CHUNK = 1000
+# Window for the rows/second rates reported in stats()
+_RATE_WINDOW_SECONDS = 60.0
+
+COLUMNS = ("id", "habit_id", "user_id", "source", "metric_name", "value", "unit", "timestamp", "extra_data")
+
+
+class IngestBackpressure(Exception):
+    """Raised when the buffer is full; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, message: str, retry_after: float, flushes_failing: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.flushes_failing = flushes_failing
+
+
+class IngestTicket:
+    """
+    Outcome of the rows one caller buffered
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.written = 0
+        self.dropped = 0
+        # A failed flush put some of the rows back in the buffer
+        self.requeued = False
+        self._settled = asyncio.Event()
+
+    def track(self, count: int) -> None:
+        self.rows += count
+
+    def settle(self, written: bool) -> None:
+        if written:
+            self.written += 1
+        else:
+            self.dropped += 1
+        if self.written + self.dropped == self.rows:
+            self._settled.set()
+
+    def requeue(self) -> None:
+        self.requeued = True
+        self._settled.set()
+
+    async def durable(self) -> bool:
+        """
+        Wait until every row is written or dropped, or a flush failed; True if all were written
+        """
+        if self.written + self.dropped < self.rows:
+            await self._settled.wait()
+        return not self.requeued and self.written == self.rows
+
+
+class _RateWindow:
+    """
+    Rows per second over a sliding window
+    """
+
+    def __init__(self, seconds: float = _RATE_WINDOW_SECONDS):
+        self.seconds = seconds
+        self._events: deque = deque()
+        self._total = 0
+
+    def add(self, count: int) -> None:
+        now = time.monotonic()
+        self._events.append((now, count))
+        self._total += count
+        self._prune(now)
+
+    def rate(self) -> float:
+        self._prune(time.monotonic())
+        return self._total / self.seconds
+
+    def _prune(self, now: float) -> None:
+        while self._events and self._events[0][0] < now - self.seconds:
+            self._total -= self._events.popleft()[1]
+
+
+def ingest_row(user_id, habit_id, source: str, metric_name: str, value, unit: Optional[str], timestamp, extra_data=None) -> Dict[str, Any]:
+    """
+    A habit_data_integrations row ready for the buffer
+    """
+    return {
+        "id": uuid.uuid4(),
+        "habit_id": habit_id,
+        "user_id": user_id,
+        "source": source,
+        "metric_name": metric_name,
+        "value": Decimal(str(value)),
+        "unit": unit,
+        "timestamp": timestamp,
+        "extra_data": json.dumps(extra_data) if extra_data is not None else None,
+    }
+
+
+def _is_integrity_error(error: Exception) -> bool:
+    # COPY goes through the raw asyncpg connection, whose errors carry a SQLSTATE
+    # instead of being wrapped in SQLAlchemy's IntegrityError (class 23)
+    return isinstance(error, IntegrityError) or str(getattr(error, "sqlstate", "")).startswith("23")
+
+
+class IngestBuffer:
+    """
+    Per-user write buffer with size/time flushing and a global row limit
+    """
+
+    def __init__(
+        self,
+        flush_rows: int = INGEST_FLUSH_ROWS,
+        flush_interval: float = INGEST_FLUSH_INTERVAL_SECONDS,
+        max_rows: int = INGEST_MAX_BUFFERED_ROWS,
+        use_copy: bool = INGEST_USE_COPY,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.use_copy = use_copy
+        self._session_factory = session_factory
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        # Row id -> ticket, for rows whose caller waits on their outcome
+        self._tickets: Dict[Any, IngestTicket] = {}
+        self._oldest: Dict[str, float] = {}
+        # Buffered plus in-flight rows, the quantity backpressure applies to
+        self._pending = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._accepted = _RateWindow()
+        self._flushed = _RateWindow()
+        self._last_flush_failed = False
+        self._stats = {
+            "rows_accepted": 0,
+            "rows_rejected": 0,
+            "rows_flushed": 0,
+            "rows_dropped": 0,
+            "flushes": 0,
+            "flush_failures": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "max_buffer_delay_ms": 0.0,
+        }
+
+    async def add(self, user_id, rows: List[Dict[str, Any]], ticket: Optional[IngestTicket] = None) -> int:
+        """
+        Buffer `rows` for `user_id`, flushing that user if the size threshold is hit
+        """
+        if not rows:
+            return 0
+        key = str(user_id)
+        async with self._lock:
+            if self._pending + len(rows) > self.max_rows:
+                self._stats["rows_rejected"] += len(rows)
+                raise IngestBackpressure(
+                    "Ingest buffer is full",
+                    retry_after=max(1.0, self.flush_interval),
+                    flushes_failing=self._last_flush_failed,
+                )
+            buffer = self._buffers.setdefault(key, [])
+            self._oldest.setdefault(key, time.monotonic())
+            buffer.extend(rows)
+            self._pending += len(rows)
+            if ticket is not None:
+                ticket.track(len(rows))
+                self._tickets.update((row["id"], ticket) for row in rows)
+            self._stats["rows_accepted"] += len(rows)
+            self._accepted.add(len(rows))
+            full = len(buffer) >= self.flush_rows
+        if full:
+            await self.flush_user(user_id)
+        return len(rows)
+
+    async def flush_user(self, user_id) -> int:
+        key = str(user_id)
+        async with self._lock:
+            rows = self._buffers.pop(key, None)
+            oldest = self._oldest.pop(key, None)
+        if not rows:
+            return 0
+        return await self._flush(key, rows, oldest)
+
+    async def flush_all(self) -> int:
+        async with self._lock:
+            batches = [(key, rows, self._oldest.pop(key, None)) for key, rows in self._buffers.items()]
+            self._buffers = {}
+        flushed = 0
+        for key, rows, oldest in batches:
+            flushed += await self._flush(key, rows, oldest)
+        return flushed
+
+    async def _flush(self, key: str, rows: List[Dict[str, Any]], oldest: Optional[float]) -> int:
+        started = time.monotonic()
+        written = dropped = 0
+        checked_orphans = False
+        # Batches still to write, last one first; a batch that violates a constraint
+        # is narrowed down instead of dropped, so only the offending rows are lost
+        batches = [rows]
+        while batches:
+            batch = batches.pop()
+            try:
+                await self._write(batch)
+            except Exception as e:
+                if not _is_integrity_error(e):
+                    unwritten = batch + [row for rest in reversed(batches) for row in rest]
+                    self._requeue_tickets(unwritten)
+                    # Put the unwritten rows back in front of anything buffered since; they stay
+                    # counted in _pending, so a failing database turns into backpressure
+                    async with self._lock:
+                        self._settle(written, dropped)
+                        self._buffers[key] = unwritten + self._buffers.get(key, [])
+                        self._oldest[key] = min(oldest or started, self._oldest.get(key, started))
+                        self._stats["flush_failures"] += 1
+                        self._last_flush_failed = True
+                    logger.error("Flush of %d rows failed: %s", len(unwritten), e)
+                    return written
+                if not checked_orphans:
+                    # Usually a habit or user deleted while its rows were buffered: one lookup drops them all
+                    checked_orphans = True
+                    kept = await self._without_orphans(batch)
+                    if len(kept) < len(batch):
+                        logger.warning("Dropped %d rows whose habit or user no longer exists", len(batch) - len(kept))
+                        kept_ids = {row["id"] for row in kept}
+                        self._settle_tickets([row for row in batch if row["id"] not in kept_ids], written=False)
+                    dropped += len(batch) - len(kept)
+                    if kept:
+                        batches.append(kept)
+                elif len(batch) > 1:
+                    middle = len(batch) // 2
+                    batches += [batch[middle:], batch[:middle]]
+                else:
+                    dropped += 1
+                    self._settle_tickets(batch, written=False)
+                    logger.error("Dropped a row violating a constraint: %s", e)
+                continue
+            written += len(batch)
+            self._settle_tickets(batch, written=True)
+
+        finished = time.monotonic()
+        elapsed_ms = (finished - started) * 1000
+        async with self._lock:
+            self._settle(written, dropped)
+            self._last_flush_failed = False
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = elapsed_ms
+            self._stats["total_flush_ms"] += elapsed_ms
+            self._stats["max_flush_ms"] = max(self._stats["max_flush_ms"], elapsed_ms)
+            if oldest is not None:
+                self._stats["max_buffer_delay_ms"] = max(self._stats["max_buffer_delay_ms"], (finished - oldest) * 1000)
+        return written
+
+    def _settle(self, written: int, dropped: int) -> None:
+        # Call holding the lock: rows that are written or dropped leave the buffer's count
+        self._pending -= written + dropped
+        self._flushed.add(written)
+        self._stats["rows_flushed"] += written
+        self._stats["rows_dropped"] += dropped
+
+    def _settle_tickets(self, rows: List[Dict[str, Any]], written: bool) -> None:
+        if not self._tickets:
+            return
+        for row in rows:
+            ticket = self._tickets.pop(row["id"], None)
+            if ticket is not None:
+                ticket.settle(written)
+
+    def _requeue_tickets(self, rows: List[Dict[str, Any]]) -> None:
+        # The rows stay tracked: a later flush still settles them
+        if not self._tickets:
+            return
+        for row in rows:
+            ticket = self._tickets.get(row["id"])
+            if ticket is not None:
+                ticket.requeue()
+
+    async def _without_orphans(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        `rows` minus those whose habit or user no longer exists
+        """
+        habit_ids = {row["habit_id"] for row in rows if row["habit_id"] is not None}
+        user_ids = {row["user_id"] for row in rows if row["user_id"] is not None}
+        try:
+            async with self._session_factory() as db:
+                habits = set((await db.execute(select(Habit.id).where(Habit.id.in_(habit_ids)))).scalars().all())
+                users = set((await db.execute(select(Profile.id).where(Profile.id.in_(user_ids)))).scalars().all())
+        except Exception as e:
+            # Narrowing the batch down still isolates the bad rows, just with more writes
+            logger.error("Orphan check failed: %s", e)
+            return rows
+        return [
+            row for row in rows
+            if (row["habit_id"] is None or row["habit_id"] in habits) and (row["user_id"] is None or row["user_id"] in users)
+        ]
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        table = HabitDataIntegration.__table__
+        async with self._session_factory() as db:
+            # Rollups first: on PostgreSQL this opens the transaction that the COPY below joins
+            await record_samples(db, rows)
+            connection = await db.connection()
+            if self.use_copy and connection.dialect.name == "postgresql":
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    table.name,
+                    records=[tuple(row[column] for column in COLUMNS) for row in rows],
+                    columns=COLUMNS,
+                )
+            else:
+                for start in range(0, len(rows), _INSERT_CHUNK):
+                    await db.execute(insert(table).values(rows[start:start + _INSERT_CHUNK]))
+            await db.commit()
+
+    async def run(self) -> None:
+        """
+        Background loop flushing every buffer on the time threshold
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush_all()
+            except Exception as e:
+                logger.error("Periodic flush failed: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stop the background loop and write out whatever is still buffered
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        total_flush_ms = stats.pop("total_flush_ms")
+        stats.update({
+            "buffered_rows": self._pending,
+            "buffered_users": len(self._buffers),
+            "max_buffered_rows": self.max_rows,
+            "avg_flush_ms": total_flush_ms / stats["flushes"] if stats["flushes"] else 0.0,
+            "accepted_rows_per_second": self._accepted.rate(),
+            "flushed_rows_per_second": self._flushed.rate(),
+            "flushes_failing": self._last_flush_failed,
+        })
+        return stats
+
+
+ingest_buffer = IngestBuffer()
@@ -0,0 +1,165 @@
+"""
+Local verification of Supabase access tokens
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import jwt
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+from app.utils.supabase import get_supabase_registry
+from app.utils.log import get_logger
+
+logger = get_logger("auth")
+
+# Load environment variables
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+
+# Legacy projects sign access tokens with the shared HS256 secret; newer projects
+# publish asymmetric signing keys on the JWKS endpoint. Either (or both) may be set.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_REFRESH_SECONDS = int(os.getenv("SUPABASE_JWKS_REFRESH_SECONDS", "600"))
+JWT_LEEWAY_SECONDS = int(os.getenv("SUPABASE_JWT_LEEWAY_SECONDS", "10"))
+
+# Only ask Supabase to validate a token when no local signing key is available
+SUPABASE_AUTH_REMOTE_FALLBACK = os.getenv("SUPABASE_AUTH_REMOTE_FALLBACK", "True").lower() in ("true", "1", "t")
+
+HMAC_ALGORITHMS = ("HS256",)
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+# Minimum gap between JWKS refreshes triggered by an unknown key id
+_UNKNOWN_KID_REFRESH_SECONDS = 30
+
+
+class TokenVerificationError(Exception):
+    """Raised when a token is malformed, expired or carries a bad signature"""
+
+
+class SigningKeyUnavailable(TokenVerificationError):
+    """Raised when no local key can be used to check the token's signature"""
+
+
+def _fetch_jwks(url: str) -> Dict[str, Any]:
+    response = get_supabase_registry().http().get(url)
+    response.raise_for_status()
+    return response.json()
+
+
+class SupabaseJWTVerifier:
+    """
+    Verifies Supabase JWTs (signature, expiry, audience) without a network call.
+
+    Asymmetric signing keys are fetched from the JWKS endpoint and cached; the
+    cache is refreshed every `refresh_seconds`, or sooner when a token names a
+    key id we have not seen yet (key rotation). Refreshes run in the threadpool
+    and concurrent requests wait on an asyncio lock, so the event loop keeps
+    serving other requests while the keys are fetched.
+    """
+
+    def __init__(
+        self,
+        secret: Optional[str] = SUPABASE_JWT_SECRET,
+        jwks_url: Optional[str] = SUPABASE_JWKS_URL,
+        audience: Optional[str] = SUPABASE_JWT_AUDIENCE,
+        refresh_seconds: int = JWKS_REFRESH_SECONDS,
+        leeway: int = JWT_LEEWAY_SECONDS,
+        fetch_jwks: Callable[[str], Dict[str, Any]] = _fetch_jwks,
+    ):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.refresh_seconds = refresh_seconds
+        self.leeway = leeway
+        self._fetch_jwks = fetch_jwks
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Return the token's claims, raising TokenVerificationError if it is invalid
+        """
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(f"Malformed token: {e}") from e
+
+        algorithm = header.get("alg")
+        if algorithm in HMAC_ALGORITHMS:
+            if not self.secret:
+                raise SigningKeyUnavailable("SUPABASE_JWT_SECRET is not configured")
+            key = self.secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self._get_signing_key(header.get("kid"))
+        else:
+            raise TokenVerificationError(f"Unsupported signing algorithm: {algorithm}")
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                leeway=self.leeway,
+                options={"require": ["exp", "sub"], "verify_aud": bool(self.audience)},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenVerificationError(str(e)) from e
+
+    async def _get_signing_key(self, kid: Optional[str]) -> Any:
+        if not self.jwks_url:
+            raise SigningKeyUnavailable("No JWKS URL configured")
+
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None and now - self._fetched_at < self.refresh_seconds:
+            return key
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            key = self._keys.get(kid)
+            stale = now - self._fetched_at >= self.refresh_seconds
+            unknown_kid = key is None and now - self._fetched_at >= _UNKNOWN_KID_REFRESH_SECONDS
+            if stale or unknown_kid:
+                await self._refresh_keys()
+                key = self._keys.get(kid)
+
+        if key is None:
+            raise SigningKeyUnavailable(f"No signing key found for kid {kid!r}")
+        return key
+
+    async def _refresh_keys(self) -> None:
+        try:
+            jwks = await run_in_threadpool(self._fetch_jwks, self.jwks_url)
+            key_set = jwt.PyJWKSet.from_dict(jwks)
+        except Exception as e:
+            # Back off until the next refresh window instead of retrying per request,
+            # and keep serving the previous keys if the endpoint is briefly unreachable
+            self._fetched_at = time.monotonic()
+            if self._keys:
+                logger.warning("JWKS refresh failed, keeping cached keys: %s", e)
+                return
+            raise SigningKeyUnavailable(f"Could not fetch JWKS: {e}") from e
+
+        self._keys = {k.key_id: k.key for k in key_set.keys}
+        self._fetched_at = time.monotonic()
+
+
+_verifier = SupabaseJWTVerifier()
+
+
+def get_jwt_verifier() -> SupabaseJWTVerifier:
+    """
+    Return the process-wide token verifier
+    """
+    return _verifier
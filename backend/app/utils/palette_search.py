@@ -0,0 +1,243 @@
+"""
+Fuzzy search over a user's command palette items
+
+Items are indexed by the trigrams and short word prefixes of their normalized
+name and description, so a query only scores items sharing a trigram (or, for
+one- and two-character queries, a word prefix) with it instead of every item.
+A candidate's score is how well its text matches - exact name, name prefix,
+word prefix, substring, then trigram overlap - multiplied by a boost for
+usage count and recent use.
+
+An index is built once per user and kept with the version token of the data
+it was built from (app.utils.etags), so it is rebuilt after the user's habits
+change, on whichever worker the change was made. Usage counts are not part of
+that version; PALETTE_INDEX_TTL_SECONDS bounds how stale they can get.
+
+The full palette served when it opens is cached separately, serialized, in
+palette_snapshots: (etag, JSON bytes) per user, replaced when the ETag it was
+built for is no longer the current one.
+"""
+
+import heapq
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from app.utils.cache import TTLCache
+
+# Load environment variables
+load_dotenv()
+
+PALETTE_INDEX_CACHE_SIZE = int(os.getenv("PALETTE_INDEX_CACHE_SIZE", "10000"))
+PALETTE_INDEX_TTL_SECONDS = float(os.getenv("PALETTE_INDEX_TTL_SECONDS", "300"))
+PALETTE_SNAPSHOT_CACHE_SIZE = int(os.getenv("PALETTE_SNAPSHOT_CACHE_SIZE", "10000"))
+
+# Share of the query's trigrams a candidate must contain to be scored
+MIN_TRIGRAM_SIMILARITY = 0.3
+# Ranking boosts: log-scaled usage, recency decaying with this half-life
+USAGE_WEIGHT = 0.15
+RECENCY_WEIGHT = 0.5
+RECENCY_HALF_LIFE_SECONDS = 3 * 24 * 3600
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Lowercase, strip accents and collapse everything but letters and digits to single spaces
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    # Words are padded so that word starts get their own trigrams ("  r", " re")
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _is_subsequence(query: str, text: str) -> bool:
+    remaining = iter(text)
+    return all(ch in remaining for ch in query)
+
+
+class PaletteEntry:
+    """
+    One searchable palette item; `item` is what search results return
+    """
+
+    __slots__ = ("id", "name", "description", "words", "grams", "usage_count", "last_used", "item")
+
+    def __init__(
+        self,
+        item_id: str,
+        name: str,
+        description: Optional[str] = None,
+        usage_count: int = 0,
+        last_used: Optional[float] = None,
+        item: Any = None,
+    ):
+        self.id = item_id
+        self.name = normalize(name)
+        self.description = normalize(description)
+        self.words = self.name.split() + self.description.split()
+        self.grams = trigrams(f"{self.name} {self.description}")
+        self.usage_count = usage_count
+        self.last_used = last_used
+        self.item = item
+
+    def text_score(self, query: str, similarity: float) -> float:
+        if self.name == query:
+            return 1.0
+        if self.name.startswith(query):
+            return 0.9
+        if any(word.startswith(query) for word in self.words):
+            return 0.8
+        if " " in query and all(any(word.startswith(part) for word in self.words) for part in query.split()):
+            # "sta foc" -> "Start focus session"
+            return 0.75
+        if query in self.name:
+            return 0.7
+        if query in self.description:
+            return 0.5
+        score = 0.6 * similarity
+        if _is_subsequence(query.replace(" ", ""), self.name):
+            score = max(score, 0.4)
+        return score
+
+    def boost(self, now: float) -> float:
+        boost = 1.0 + USAGE_WEIGHT * math.log1p(self.usage_count)
+        if self.last_used is not None:
+            boost += RECENCY_WEIGHT * 0.5 ** (max(0.0, now - self.last_used) / RECENCY_HALF_LIFE_SECONDS)
+        return boost
+
+
+class PaletteIndex:
+    """
+    Trigram and word-prefix index over one user's palette entries
+    """
+
+    def __init__(self, entries: Iterable[PaletteEntry] = ()):
+        self._entries: Dict[str, PaletteEntry] = {}
+        self._grams: Dict[str, Set[str]] = defaultdict(set)
+        self._prefixes: Dict[str, Set[str]] = defaultdict(set)
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._entries
+
+    def get(self, item_id: str) -> Optional[PaletteEntry]:
+        return self._entries.get(item_id)
+
+    def add(self, entry: PaletteEntry) -> None:
+        """
+        Add an entry, replacing any with the same id
+        """
+        self.remove(entry.id)
+        self._entries[entry.id] = entry
+        for gram in entry.grams:
+            self._grams[gram].add(entry.id)
+        for word in entry.words:
+            for length in (1, 2):
+                self._prefixes[word[:length]].add(entry.id)
+
+    def remove(self, item_id: str) -> None:
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        for gram in entry.grams:
+            self._discard(self._grams, gram, item_id)
+        for word in entry.words:
+            for length in (1, 2):
+                self._discard(self._prefixes, word[:length], item_id)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[str]], key: str, item_id: str) -> None:
+        ids = postings.get(key)
+        if ids is not None:
+            ids.discard(item_id)
+            if not ids:
+                del postings[key]
+
+    def _candidates(self, query: str) -> Dict[str, float]:
+        """
+        Ids worth scoring, with the share of the query's trigrams each contains
+        """
+        if len(query) < 3:
+            # Too short for trigrams: items with a word starting with the query
+            return {item_id: 0.0 for item_id in self._prefixes.get(query, ())}
+
+        query_grams = trigrams(query)
+        hits = Counter(chain.from_iterable(self._grams.get(gram, ()) for gram in query_grams))
+        minimum = MIN_TRIGRAM_SIMILARITY * len(query_grams)
+        return {item_id: count / len(query_grams) for item_id, count in hits.items() if count >= minimum}
+
+    def search(self, query: str, limit: int = 10, now: Optional[float] = None) -> List[Tuple[float, PaletteEntry]]:
+        """
+        Best `limit` (score, entry) pairs for the query; an empty query ranks by boost alone
+        """
+        now = time.time() if now is None else now
+        query = normalize(query)
+        if not query:
+            scored = [(entry.boost(now), entry) for entry in self._entries.values()]
+        else:
+            scored = []
+            for item_id, similarity in self._candidates(query).items():
+                entry = self._entries[item_id]
+                score = entry.text_score(query, similarity)
+                if score > 0:
+                    scored.append((score * entry.boost(now), entry))
+        return heapq.nlargest(limit, scored, key=lambda pair: pair[0])
+
+
+class PaletteIndexCache:
+    """
+    Per-process palette indexes keyed by user id, each valid for one version token
+    """
+
+    def __init__(self, maxsize: int = PALETTE_INDEX_CACHE_SIZE, ttl: float = PALETTE_INDEX_TTL_SECONDS):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, user_id: Any, token: str) -> Optional[PaletteIndex]:
+        """
+        The user's index if it was built at `token`
+        """
+        cached = self._cache.get(str(user_id))
+        if cached is None or cached[0] != token:
+            return None
+        return cached[1]
+
+    def put(self, user_id: Any, token: str, index: PaletteIndex) -> PaletteIndex:
+        self._cache.set(str(user_id), (token, index))
+        return index
+
+    def invalidate(self, user_id: Any) -> None:
+        self._cache.invalidate(str(user_id))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+palette_indexes = PaletteIndexCache()
+# Validated against the current ETag on every read, so entries never need to expire
+palette_snapshots = TTLCache(PALETTE_SNAPSHOT_CACHE_SIZE, None)
@@ -0,0 +1,195 @@
+"""
+Per-request SQL instrumentation
+
+SQLAlchemy cursor events count every statement and its time against the
+request that issued it (tracked in a context variable, which SQLAlchemy
+carries into the greenlet that runs async-engine statements). At the end of a
+request the middleware:
+
+- adds a Server-Timing header (`db;dur=<ms>;desc="<n> queries", app;dur=<ms>`)
+- logs statements slower than SLOW_QUERY_MS with the shape, not the values, of
+  their bound parameters
+- warns when one statement repeats N_PLUS_ONE_THRESHOLD times (an N+1 loop)
+- checks the route's declared `@query_budget`; with QUERY_BUDGET_ENFORCE set
+  (tests, CI) exceeding it raises instead of logging
+
+Counts exclude pool pings and transaction control (BEGIN/COMMIT), which do
+not go through the cursor events.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.log import get_logger
+
+logger = get_logger("sql")
+
+# Load environment variables
+load_dotenv()
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+QUERY_BUDGET_ENFORCE = os.getenv("QUERY_BUDGET_ENFORCE", "False").lower() in ("true", "1", "t")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "True").lower() in ("true", "1", "t")
+
+# Characters of SQL shown in log lines
+_SQL_PREVIEW = 300
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in enforce mode when a route issues more statements than it declared"""
+
+
+class RequestQueries:
+    """
+    Statements issued while handling one request
+    """
+
+    __slots__ = ("count", "total_ms", "per_statement", "started")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.per_statement: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+_stats = {
+    "requests": 0,
+    "queries": 0,
+    "slow_queries": 0,
+    "n_plus_one_warnings": 0,
+    "budget_violations": 0,
+}
+
+
+def query_budget(max_queries: int) -> Callable:
+    """
+    Declare the most statements a route may issue, authentication included:
+
+        @router.get("/")
+        @query_budget(3)
+        async def get_habits(...):
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorate
+
+
+def param_shape(parameters: Any, executemany: bool = False) -> str:
+    """
+    Types of the bound parameters, e.g. "{habit_id_1: UUID, param_1: int}" or "500 x {...}"
+    """
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = param_shape(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _preview(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= _SQL_PREVIEW else statement[:_SQL_PREVIEW] + "..."
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # A connection runs one statement at a time, so a single slot is enough
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info.pop("query_started", time.perf_counter())) * 1000
+    _stats["queries"] += 1
+
+    queries = _current.get()
+    if queries is not None:
+        queries.count += 1
+        queries.total_ms += elapsed_ms
+        queries.per_statement[statement] = queries.per_statement.get(statement, 0) + 1
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        _stats["slow_queries"] += 1
+        logger.warning("Slow query (%.1f ms): %s params=%s", elapsed_ms, _preview(statement), param_shape(parameters, executemany))
+
+
+def instrument(*engines: Engine) -> None:
+    """
+    Attach the cursor listeners to sync engines (pass async_engine.sync_engine for async ones)
+    """
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_label(scope) -> str:
+    route = scope.get("route")
+    return f"{scope.get('method')} {getattr(route, 'path', scope.get('path'))}"
+
+
+def _check(scope, queries: RequestQueries) -> None:
+    _stats["requests"] += 1
+
+    repeated = [(statement, n) for statement, n in queries.per_statement.items() if n >= N_PLUS_ONE_THRESHOLD]
+    for statement, n in repeated:
+        _stats["n_plus_one_warnings"] += 1
+        logger.warning("%s ran the same statement %d times (N+1?): %s", _route_label(scope), n, _preview(statement))
+
+    budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+    if budget is not None and queries.count > budget:
+        _stats["budget_violations"] += 1
+        message = f"{_route_label(scope)} issued {queries.count} SQL statements, budget is {budget}"
+        if QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware scoping query counts to each HTTP request
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and SERVER_TIMING_ENABLED:
+                app_ms = (time.perf_counter() - queries.started) * 1000
+                timing = f'db;dur={queries.total_ms:.1f};desc="{queries.count} queries", app;dur={app_ms:.1f}'
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+        _check(scope, queries)
+
+
+def get_query_stats() -> Dict[str, Any]:
+    stats = dict(_stats)
+    stats.update({
+        "slow_query_ms": SLOW_QUERY_MS,
+        "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+        "budget_enforced": QUERY_BUDGET_ENFORCE,
+    })
+    return stats
@@ -0,0 +1,269 @@
+"""
+Maintenance of the habit_daily_rollups table
+
+Every write to habit_logs turns into per-(user, habit, day) deltas that are
+upserted in the same transaction, so reads that only need daily totals can
+scan O(days) rollup rows instead of O(logs).
+
+    python -m app.utils.rollups backfill [--user-id ID]
+    python -m app.utils.rollups check [--user-id ID]
+"""
+
+import argparse
+import sys
+import uuid
+from decimal import Decimal
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, or_, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.models.habit_log import HabitLog
+from app.utils.database import dialect_insert, engine
+from app.utils.streaks import streak_index, streak_scope
+from app.utils.versions import bump_versions
+
+VALUE_COLUMNS = ("log_count", "completed_count", "total_duration", "total_amount")
+
+RollupKey = Tuple[uuid.UUID, uuid.UUID, Any]
+RollupDeltas = Dict[RollupKey, Dict[str, Any]]
+# New completed days per habit, or None when the habit's days changed otherwise
+StreakChanges = Dict[uuid.UUID, Optional[Set[date]]]
+
+# Session.info key of streak updates waiting for the transaction to commit
+_PENDING_STREAKS = "pending_streaks"
+
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def log_snapshot(log: HabitLog) -> Dict[str, Any]:
+    """
+    The fields of a log that contribute to its rollup row
+    """
+    return {
+        "user_id": log.user_id,
+        "habit_id": log.habit_id,
+        "date": log.date,
+        "status": log.status,
+        "duration": log.duration,
+        "amount": log.amount,
+    }
+
+
+def add_log_delta(deltas: RollupDeltas, snapshot: Dict[str, Any], sign: int) -> None:
+    """
+    Accumulate +1 (insert) or -1 (delete) of a log into `deltas`
+    """
+    key = (_as_uuid(snapshot["user_id"]), _as_uuid(snapshot["habit_id"]), snapshot["date"])
+    completed = snapshot["status"] == "completed"
+    delta = deltas.setdefault(key, {column: 0 for column in VALUE_COLUMNS})
+    delta["log_count"] += sign
+    if completed:
+        delta["completed_count"] += sign
+        delta["total_duration"] += sign * (snapshot["duration"] or 0)
+        delta["total_amount"] += sign * Decimal(str(snapshot["amount"] or 0))
+
+
+def _upsert(dialect_name: str, rows):
+    table = HabitDailyRollup.__table__
+    stmt = dialect_insert(dialect_name)(table).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.habit_id, table.c.day],
+        set_={column: table.c[column] + stmt.excluded[column] for column in VALUE_COLUMNS},
+    )
+
+
+async def apply_rollup_deltas(db: AsyncSession, deltas: RollupDeltas) -> None:
+    """
+    Upsert accumulated deltas; call before the log write is committed
+    """
+    rows = [
+        {"user_id": user_id, "habit_id": habit_id, "day": day, **delta}
+        for (user_id, habit_id, day), delta in deltas.items()
+        if any(delta.values())
+    ]
+    if not rows:
+        return
+
+    await db.execute(_upsert(db.bind.dialect.name, rows))
+
+    # Days whose last log went away should not linger as empty rows
+    shrunk = [row for row in rows if row["log_count"] < 0]
+    if shrunk:
+        table = HabitDailyRollup.__table__
+        await db.execute(
+            delete(table).where(
+                table.c.log_count <= 0,
+                or_(*[
+                    and_(table.c.user_id == row["user_id"], table.c.habit_id == row["habit_id"], table.c.day == row["day"])
+                    for row in shrunk
+                ]),
+            )
+        )
+
+
+async def record_log_change(db: AsyncSession, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+    """
+    Reflect one log insert (old=None), update, or delete (new=None) in the rollups
+    """
+    deltas: RollupDeltas = {}
+    if old is not None:
+        add_log_delta(deltas, old, -1)
+    if new is not None:
+        add_log_delta(deltas, new, +1)
+    await apply_rollup_deltas(db, deltas)
+
+    changes: StreakChanges = {}
+    _add_streak_change(changes, old, new)
+    await _record_streak_changes(db, changes)
+
+
+async def record_log_inserts(db: AsyncSession, snapshots: List[Dict[str, Any]]) -> None:
+    """
+    Reflect a batch of inserted logs in the rollups with one upsert
+    """
+    deltas: RollupDeltas = {}
+    changes: StreakChanges = {}
+    for snapshot in snapshots:
+        add_log_delta(deltas, snapshot, +1)
+        _add_streak_change(changes, None, snapshot)
+    await apply_rollup_deltas(db, deltas)
+    await _record_streak_changes(db, changes)
+
+
+def _add_streak_change(changes: StreakChanges, old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> None:
+    # A new completion is a single bit in a cached bitmap; anything else
+    # (un-completing, moving a log to another day/habit) reloads the habit on next read
+    if old is None and new is not None and new["status"] == "completed":
+        days = changes.setdefault(_as_uuid(new["habit_id"]), set())
+        if days is not None:
+            days.add(new["date"])
+    else:
+        for snapshot in (old, new):
+            if snapshot is not None:
+                changes[_as_uuid(snapshot["habit_id"])] = None
+
+
+async def _record_streak_changes(db: AsyncSession, changes: StreakChanges) -> None:
+    """
+    Bump the habits' streak versions in this transaction; cached bitmaps are
+    only updated once it commits (see _apply_pending_streaks)
+    """
+    if not changes:
+        return
+    versions = await bump_versions(db, [streak_scope(habit_id) for habit_id in changes])
+    pending = db.sync_session.info.setdefault(_PENDING_STREAKS, {})
+    for habit_id, days in changes.items():
+        version = versions[streak_scope(habit_id)]
+        if habit_id not in pending:
+            pending[habit_id] = (version - 1, version, days)
+            continue
+        # Several writes to the habit in one transaction: one step from the first base
+        base, _, pending_days = pending[habit_id]
+        merged = None if pending_days is None or days is None else pending_days | days
+        pending[habit_id] = (base, version, merged)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_streaks(session: Session) -> None:
+    for habit_id, (base, version, days) in session.info.pop(_PENDING_STREAKS, {}).items():
+        streak_index.advance(habit_id, base, version, days)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_streaks(session: Session) -> None:
+    session.info.pop(_PENDING_STREAKS, None)
+
+
+def _amount(value) -> Decimal:
+    # SQLite stores Numeric as float, so compare amounts at a fixed precision
+    return Decimal(str(value or 0)).quantize(Decimal("0.000001"))
+
+
+def _raw_aggregate(user_id=None):
+    completed = HabitLog.status == "completed"
+    query = select(
+        HabitLog.user_id,
+        HabitLog.habit_id,
+        HabitLog.date,
+        func.count(HabitLog.id),
+        func.sum(case((completed, 1), else_=0)),
+        func.sum(case((completed, func.coalesce(HabitLog.duration, 0)), else_=0)),
+        func.sum(case((completed, func.coalesce(HabitLog.amount, 0)), else_=0)),
+    ).group_by(HabitLog.user_id, HabitLog.habit_id, HabitLog.date)
+    if user_id is not None:
+        query = query.where(HabitLog.user_id == user_id)
+    return query
+
+
+def backfill(connection: Connection, user_id=None) -> int:
+    """
+    Rebuild rollups from habit_logs (for one user, or everyone)
+    """
+    table = HabitDailyRollup.__table__
+    clear = delete(table)
+    if user_id is not None:
+        clear = clear.where(table.c.user_id == user_id)
+    connection.execute(clear)
+    result = connection.execute(
+        table.insert().from_select(["user_id", "habit_id", "day", *VALUE_COLUMNS], _raw_aggregate(user_id))
+    )
+    return result.rowcount
+
+
+def check_consistency(connection: Connection, user_id=None, limit: int = 20) -> list:
+    """
+    Return up to `limit` (key, expected, actual) mismatches between rollups and raw logs
+    """
+    expected = {}
+    for user, habit, day, logs, completed, duration, amount in connection.execute(_raw_aggregate(user_id)):
+        expected[(str(user), str(habit), day)] = (logs, completed or 0, duration or 0, _amount(amount))
+
+    actual = {}
+    query = select(HabitDailyRollup)
+    if user_id is not None:
+        query = query.where(HabitDailyRollup.user_id == user_id)
+    for row in connection.execute(query).mappings():
+        key = (str(row["user_id"]), str(row["habit_id"]), row["day"])
+        actual[key] = (row["log_count"], row["completed_count"], row["total_duration"], _amount(row["total_amount"]))
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key)
+        got = actual.get(key)
+        if want != got:
+            mismatches.append((key, want, got))
+            if len(mismatches) >= limit:
+                break
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.rollups", description="Habit daily rollup maintenance")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--user-id", default=None, help="Limit to one user")
+    args = parser.parse_args(argv)
+    user_id = uuid.UUID(args.user_id) if args.user_id else None
+
+    if args.command == "backfill":
+        with engine.begin() as connection:
+            count = backfill(connection, user_id)
+        print(f"Rebuilt {count} rollup rows")
+        return 0
+
+    with engine.connect() as connection:
+        mismatches = check_consistency(connection, user_id)
+    for key, want, got in mismatches:
+        print(f"MISMATCH {key}: expected {want}, found {got}")
+    print("Rollups are consistent" if not mismatches else f"{len(mismatches)} mismatching day(s) shown")
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Hourly and daily rollups of habit_data_integrations samples
+
+Charts only need per-bucket count, sum, min and max per metric, so every write
+of raw samples also upserts the buckets it touches. Raw samples older than
+HABIT_DATA_RAW_RETENTION_DAYS can then be compacted away without losing the
+series. Buckets are in UTC.
+
+    python -m app.utils.series compact [--retention-days N]
+    python -m app.utils.series rebuild [--since YYYY-MM-DD]
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.habit_data_integration import HabitDataIntegration
+from app.models.habit_data_rollup import HabitDataRollup
+from app.utils.database import dialect_insert, engine
+
+# Load environment variables
+load_dotenv()
+
+# Raw samples older than this are deleted by `compact`; 0 keeps them forever
+HABIT_DATA_RAW_RETENTION_DAYS = int(os.getenv("HABIT_DATA_RAW_RETENTION_DAYS", "90"))
+
+RESOLUTIONS = ("hour", "day")
+
+# Rows per upsert statement, to stay under bind-parameter limits
+_UPSERT_CHUNK = 1000
+
+BucketKey = Tuple[Any, str, str, datetime]
+
+
+def bucket_start(timestamp: datetime, resolution: str) -> datetime:
+    """
+    Start of the UTC hour/day containing `timestamp` (naive timestamps are taken as UTC)
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    timestamp = timestamp.astimezone(timezone.utc)
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown resolution '{resolution}'. Expected one of: {', '.join(RESOLUTIONS)}")
+
+
+def aggregate_samples(samples: Iterable[Tuple[Any, str, Any, datetime]], buckets: Dict[BucketKey, List] = None) -> Dict[BucketKey, List]:
+    """
+    Fold (user_id, metric_name, value, timestamp) samples into [count, sum, min, max] per bucket
+    """
+    buckets = {} if buckets is None else buckets
+    for user_id, metric_name, value, timestamp in samples:
+        value = Decimal(str(value))
+        for resolution in RESOLUTIONS:
+            key = (user_id, metric_name, resolution, bucket_start(timestamp, resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, value, value, value]
+            else:
+                bucket[0] += 1
+                bucket[1] += value
+                if value < bucket[2]:
+                    bucket[2] = value
+                if value > bucket[3]:
+                    bucket[3] = value
+    return buckets
+
+
+def _bucket_rows(buckets: Dict[BucketKey, List]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "user_id": user_id,
+            "metric_name": metric_name,
+            "resolution": resolution,
+            "bucket_start": start,
+            "sample_count": count,
+            "value_sum": total,
+            "value_min": low,
+            "value_max": high,
+        }
+        for (user_id, metric_name, resolution, start), (count, total, low, high) in buckets.items()
+    ]
+
+
+def _upsert(dialect_name: str, rows):
+    table = HabitDataRollup.__table__
+    stmt = dialect_insert(dialect_name)(table).values(rows)
+    # SQLite's two-argument min()/max() are scalar, like LEAST/GREATEST on PostgreSQL
+    least, greatest = (func.least, func.greatest) if dialect_name == "postgresql" else (func.min, func.max)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.metric_name, table.c.resolution, table.c.bucket_start],
+        set_={
+            "sample_count": table.c.sample_count + stmt.excluded.sample_count,
+            "value_sum": table.c.value_sum + stmt.excluded.value_sum,
+            "value_min": least(table.c.value_min, stmt.excluded.value_min),
+            "value_max": greatest(table.c.value_max, stmt.excluded.value_max),
+        },
+    )
+
+
+async def record_samples(db: AsyncSession, rows: List[Dict[str, Any]]) -> None:
+    """
+    Upsert the buckets touched by new habit_data_integrations rows; call before their commit
+    """
+    buckets = aggregate_samples((row["user_id"], row["metric_name"], row["value"], row["timestamp"]) for row in rows)
+    bucket_rows = _bucket_rows(buckets)
+    dialect_name = db.bind.dialect.name
+    for start in range(0, len(bucket_rows), _UPSERT_CHUNK):
+        await db.execute(_upsert(dialect_name, bucket_rows[start:start + _UPSERT_CHUNK]))
+
+
+def rebuild(connection: Connection, since: datetime) -> int:
+    """
+    Recompute rollups from raw samples at or after `since` (a UTC day boundary).
+
+    Older buckets are left alone: their raw samples may already be compacted away.
+    """
+    since = bucket_start(since, "day")
+    table = HabitDataRollup.__table__
+    connection.execute(delete(table).where(table.c.bucket_start >= since))
+
+    raw = HabitDataIntegration.__table__
+    result = connection.execution_options(yield_per=10000).execute(
+        select(raw.c.user_id, raw.c.metric_name, raw.c.value, raw.c.timestamp).where(raw.c.timestamp >= since)
+    )
+    buckets: Dict[BucketKey, List] = {}
+    for partition in result.partitions():
+        aggregate_samples(partition, buckets)
+    return upsert_buckets(connection, buckets)
+
+
+def upsert_buckets(connection: Connection, buckets: Dict[BucketKey, List]) -> int:
+    """
+    Add aggregated buckets to the stored rollups (sync counterpart of record_samples)
+    """
+    rows = _bucket_rows(buckets)
+    for start in range(0, len(rows), _UPSERT_CHUNK):
+        connection.execute(_upsert(connection.dialect.name, rows[start:start + _UPSERT_CHUNK]))
+    return len(rows)
+
+
+def compact(connection: Connection, retention_days: int = HABIT_DATA_RAW_RETENTION_DAYS) -> int:
+    """
+    Delete raw samples older than the retention window; their rollups stay
+    """
+    if retention_days <= 0:
+        return 0
+    raw = HabitDataIntegration.__table__
+    return connection.execute(delete(raw).where(raw.c.timestamp < _retention_cutoff(retention_days))).rowcount
+
+
+def _retention_cutoff(retention_days: int) -> datetime:
+    # Cut on a day boundary so no hourly or daily bucket is left half-backed by raw rows
+    if retention_days <= 0:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return bucket_start(datetime.now(timezone.utc) - timedelta(days=retention_days), "day")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.utils.series", description="Wearable metric rollup maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subcommands.add_parser("compact", help="Delete raw samples past the retention window")
+    compact_parser.add_argument("--retention-days", type=int, default=HABIT_DATA_RAW_RETENTION_DAYS)
+    rebuild_parser = subcommands.add_parser("rebuild", help="Recompute rollups from raw samples")
+    rebuild_parser.add_argument("--since", type=date.fromisoformat, default=None,
+                                help="UTC day to rebuild from (default: start of the retention window)")
+    args = parser.parse_args(argv)
+
+    with engine.begin() as connection:
+        if args.command == "compact":
+            print(f"Deleted {compact(connection, args.retention_days)} raw samples")
+        else:
+            since = datetime.combine(args.since, time.min, tzinfo=timezone.utc) if args.since else _retention_cutoff(
+                HABIT_DATA_RAW_RETENTION_DAYS
+            )
+            print(f"Rebuilt {rebuild(connection, since)} rollup buckets")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Streak calculations over completed days
+
+Completed days of a habit are kept as a bitmap (bit i = origin + i days), so
+marking today is O(1) and streak lengths come from word-level bit scans
+instead of sorting and walking every completion.
+"""
+
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.cache import TTLCache
+
+# Load environment variables
+load_dotenv()
+
+STREAK_CACHE_SIZE = int(os.getenv("STREAK_CACHE_SIZE", "50000"))
+# Entries are checked against the habit's shared version on every read, so the TTL
+# only bounds how long bitmaps of idle habits hold memory
+STREAK_CACHE_TTL_SECONDS = float(os.getenv("STREAK_CACHE_TTL_SECONDS", "3600"))
+
+
+class DayBitmap:
+    """
+    Set of days stored as bits in a bytearray
+    """
+
+    __slots__ = ("origin", "bits", "_lock")
+
+    def __init__(self, origin: Optional[date] = None):
+        self.origin = origin.toordinal() if origin else None
+        self.bits = bytearray()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_days(cls, days: Iterable[date]) -> "DayBitmap":
+        days = list(days)
+        bitmap = cls(min(days) if days else None)
+        for day in days:
+            bitmap.add(day)
+        return bitmap
+
+    def add(self, day: date) -> None:
+        with self._lock:
+            index = self._index_for_write(day)
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+    def discard(self, day: date) -> None:
+        with self._lock:
+            if self.origin is None:
+                return
+            index = day.toordinal() - self.origin
+            if 0 <= index < len(self.bits) * 8:
+                self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def __contains__(self, day: date) -> bool:
+        if self.origin is None:
+            return False
+        index = day.toordinal() - self.origin
+        return 0 <= index < len(self.bits) * 8 and bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self) -> int:
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def run_ending_at(self, day: date) -> int:
+        """
+        Number of consecutive set days ending at (and including) `day`
+        """
+        if self.origin is None:
+            return 0
+        index = day.toordinal() - self.origin
+        if not 0 <= index < len(self.bits) * 8:
+            return 0
+        window = int.from_bytes(self.bits, "little") & ((1 << (index + 1)) - 1)
+        # The highest unset bit at or below `index` marks where the run starts
+        gaps = ~window & ((1 << (index + 1)) - 1)
+        return index + 1 - gaps.bit_length()
+
+    def current_streak(self, today: date) -> int:
+        """
+        Run of completed days ending today, or yesterday if today is not done yet
+        """
+        if today in self:
+            return self.run_ending_at(today)
+        return self.run_ending_at(today - timedelta(days=1))
+
+    def longest_streak(self) -> int:
+        """
+        Longest run of consecutive set days
+        """
+        runs = int.from_bytes(self.bits, "little")
+        if not runs:
+            return 0
+        # runs_k has bit i set when days i..i+k-1 are all set; double k while possible...
+        length, powers = 1, []
+        while True:
+            doubled = runs & (runs >> length)
+            if not doubled:
+                break
+            powers.append((length, runs))
+            runs, length = doubled, length * 2
+        # ...then extend by the smaller powers of two, largest first
+        for step, runs_step in reversed(powers):
+            extended = runs & (runs_step >> length)
+            if extended:
+                runs, length = extended, length + step
+        return length
+
+    def last_day(self) -> Optional[date]:
+        value = int.from_bytes(self.bits, "little")
+        if not value:
+            return None
+        return date.fromordinal(self.origin + value.bit_length() - 1)
+
+    def _index_for_write(self, day: date) -> int:
+        ordinal = day.toordinal()
+        if self.origin is None:
+            self.origin = ordinal
+        if ordinal < self.origin:
+            # Rare: a backdated entry before the first known day; shift by whole bytes
+            shift_bytes = (self.origin - ordinal + 7) // 8
+            self.bits[0:0] = bytes(shift_bytes)
+            self.origin -= shift_bytes * 8
+        index = ordinal - self.origin
+        if (index >> 3) >= len(self.bits):
+            # Grow geometrically so appending day after day stays amortised O(1)
+            self.bits.extend(bytes(max((index >> 3) + 1 - len(self.bits), len(self.bits) // 2, 8)))
+        return index
+
+
+def streak_scope(habit_id: Any) -> str:
+    return f"streak:{habit_id}"
+
+
+class StreakIndex:
+    """
+    Per-process cache of completed-day bitmaps keyed by habit id
+
+    Each bitmap is stored with the version of the habit's streak scope it was
+    built at (see app.utils.versions). Log writes bump that version in their
+    transaction, so a bitmap is only served while no worker has written since.
+    """
+
+    def __init__(self, maxsize: int = STREAK_CACHE_SIZE, ttl: float = STREAK_CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def get(self, habit_id: Any, version: int) -> Optional[DayBitmap]:
+        entry = self._cache.get(str(habit_id))
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def put(self, habit_id: Any, version: int, bitmap: DayBitmap) -> DayBitmap:
+        self._cache.set(str(habit_id), (version, bitmap))
+        return bitmap
+
+    def advance(self, habit_id: Any, base: int, version: int, days: Optional[Iterable[date]]) -> None:
+        """
+        Apply a committed write that moved the habit from `base` to `version`
+
+        `days` are new completions, an O(1) update each; None means the write
+        changed days in some other way and the habit is reloaded on next read.
+        A bitmap cached at any version other than `base` missed a write and is
+        dropped.
+        """
+        key = str(habit_id)
+        entry = self._cache.get(key)
+        if entry is None:
+            return
+        cached_version, bitmap = entry
+        if days is None or cached_version != base:
+            self._cache.invalidate(key)
+            return
+        for day in days:
+            bitmap.add(day)
+        self._cache.set(key, (version, bitmap))
+
+    def invalidate(self, habit_id: Any) -> None:
+        self._cache.invalidate(str(habit_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+streak_index = StreakIndex()
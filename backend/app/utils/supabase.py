@@ -3,8 +3,15 @@ Supabase client configuration
 """
 
 import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from app.utils.log import get_logger
+
+logger = get_logger("supabase")
 
 # Load environment variables
 load_dotenv()
@@ -14,24 +21,162 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
+# Keep-alive pool for the raw HTTP client used for GoTrue and JWKS calls
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "20"))
+SUPABASE_HTTP_TIMEOUT = float(os.getenv("SUPABASE_HTTP_TIMEOUT", "10"))
+
+
+class SupabaseClientRegistry:
+    """
+    Process-wide, thread-safe home for Supabase clients.
+
+    Clients are created once (eagerly at startup, or lazily on first use) and
+    shared by every request, so their HTTP connections and TLS sessions are
+    reused instead of being rebuilt per dependency call.
+    """
+
+    def __init__(self, url: Optional[str], anon_key: Optional[str], service_role_key: Optional[str]):
+        self.url = url
+        self._keys = {"anon": anon_key, "admin": service_role_key}
+        self._clients: Dict[str, Client] = {}
+        self._http: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "clients_created": 0,
+            "client_acquisitions": 0,
+            "http_requests": 0,
+            "http_connections_opened": 0,
+        }
+
+    def get(self, name: str) -> Client:
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = create_client(self.url, self._keys[name])
+                    self._clients[name] = client
+                    self._stats["clients_created"] += 1
+        self._stats["client_acquisitions"] += 1
+        return client
+
+    def http(self) -> httpx.Client:
+        """
+        Shared keep-alive HTTP client for calls made outside supabase-py
+        """
+        if self._http is None:
+            with self._lock:
+                if self._http is None:
+                    self._http = httpx.Client(
+                        timeout=SUPABASE_HTTP_TIMEOUT,
+                        limits=httpx.Limits(
+                            max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+                        ),
+                        event_hooks={"request": [self._on_request]},
+                    )
+        return self._http
+
+    def start(self) -> None:
+        """
+        Create every configured client up front (called at application startup)
+        """
+        for name, key in self._keys.items():
+            if self.url and key:
+                self.get(name)
+        self.http()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections (called at application shutdown)
+        """
+        with self._lock:
+            for client in self._clients.values():
+                _close_client(client)
+            self._clients.clear()
+            if self._http is not None:
+                self._http.close()
+                self._http = None
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["clients_open"] = len(self._clients)
+        stats["http_connections_reused"] = max(0, stats["http_requests"] - stats["http_connections_opened"])
+        return stats
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self._stats["http_requests"] += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["http_connections_opened"] += 1
+
+
+def _close_client(client: Client) -> None:
+    # supabase-py does not expose close(); shut down the httpx sessions it holds
+    sessions = (
+        getattr(getattr(client, "_postgrest", None), "session", None),
+        getattr(getattr(client, "auth", None), "_http_client", None),
+    )
+    for session in sessions:
+        close = getattr(session, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as e:
+                logger.warning("Error closing client session: %s", e)
+
+
+_registry = SupabaseClientRegistry(SUPABASE_URL, SUPABASE_KEY, SUPABASE_SERVICE_ROLE_KEY)
+
+
+def get_supabase_registry() -> SupabaseClientRegistry:
+    """
+    Return the process-wide client registry
+    """
+    return _registry
+
+
 def get_supabase_client() -> Client:
     """
-    Create and return a Supabase client instance
+    Return the shared Supabase client instance
     """
     if not SUPABASE_URL or not SUPABASE_KEY:
         raise ValueError(
             "Supabase URL and API key are required. Please check your environment variables."
         )
-    
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+    return _registry.get("anon")
 
 def get_supabase_admin_client() -> Client:
     """
-    Create and return a Supabase client with service role (admin privileges)
+    Return the shared Supabase client with service role (admin privileges)
     """
     if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
         raise ValueError(
             "Supabase URL and service role key are required. Please check your environment variables."
         )
-    
-    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY) 
\ No newline at end of file
+
+    return _registry.get("admin")
+
+def sign_in_with_password(email: str, password: str) -> Dict[str, Any]:
+    """
+    Exchange email and password for a session via the GoTrue REST API.
+
+    This goes through the pooled HTTP client rather than the shared supabase-py
+    client, whose auth state would otherwise be overwritten by every login.
+    """
+    if not SUPABASE_URL or not SUPABASE_KEY:
+        raise ValueError(
+            "Supabase URL and API key are required. Please check your environment variables."
+        )
+
+    response = _registry.http().post(
+        f"{SUPABASE_URL.rstrip('/')}/auth/v1/token",
+        params={"grant_type": "password"},
+        headers={"apikey": SUPABASE_KEY},
+        json={"email": email, "password": password},
+    )
+    response.raise_for_status()
+    return response.json()
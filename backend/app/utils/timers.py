@@ -0,0 +1,215 @@
+"""
+Server-side timer sessions
+
+Timers persist their state transitions (start, pause, resume, stop) directly,
+but heartbeats only prove the client is still there. They are absorbed in
+memory and written at most every TIMER_HEARTBEAT_FLUSH_SECONDS as a single
+batched UPDATE, so thousands of running timers cost one statement per flush
+rather than one write per tick. If the process dies, a session loses at most
+one flush interval of liveness, never the session itself.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, select, update
+
+from app.models.timer_session import TimerSession
+from app.utils.cache import TTLCache
+from app.utils.database import AsyncSessionLocal
+from app.utils.log import get_logger
+
+logger = get_logger("timers")
+
+# Load environment variables
+load_dotenv()
+
+TIMER_HEARTBEAT_FLUSH_SECONDS = float(os.getenv("TIMER_HEARTBEAT_FLUSH_SECONDS", "30"))
+# A running timer without a heartbeat for this long is treated as abandoned: stopping
+# it counts time only up to the last heartbeat
+TIMER_ABANDON_AFTER_SECONDS = float(os.getenv("TIMER_ABANDON_AFTER_SECONDS", "600"))
+TIMER_SESSION_CACHE_SIZE = int(os.getenv("TIMER_SESSION_CACHE_SIZE", "50000"))
+
+# Rows per executemany batch
+_FLUSH_CHUNK = 5000
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def effective_end(session: TimerSession, last_seen: Optional[datetime], now: datetime) -> datetime:
+    """
+    When a running session really ended: now, or its last heartbeat if the client went away
+    """
+    last_seen = _aware(last_seen) or _aware(session.last_heartbeat_at) or _aware(session.segment_started_at)
+    if last_seen is not None and (now - last_seen).total_seconds() > TIMER_ABANDON_AFTER_SECONDS:
+        return last_seen
+    return now
+
+
+def elapsed_seconds(session: TimerSession, until: datetime) -> int:
+    elapsed = session.accumulated_seconds or 0
+    if session.status == "running" and session.segment_started_at is not None:
+        elapsed += max(0, int((until - _aware(session.segment_started_at)).total_seconds()))
+    return elapsed
+
+
+class HeartbeatBuffer:
+    """
+    Latest heartbeat per running session, flushed to timer_sessions in batches.
+
+    Ownership of recently seen running sessions is cached, so a heartbeat for
+    a known session touches neither the database nor the event loop beyond a
+    couple of dict operations. Pausing or stopping a session must call
+    `forget()` so later heartbeats fall through to the database check. A
+    session paused or stopped by another worker is only noticed here at the
+    next flush, which forgets every flushed session that is no longer running,
+    so it keeps accepting heartbeats for at most one flush interval.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = TIMER_HEARTBEAT_FLUSH_SECONDS,
+        cache_size: int = TIMER_SESSION_CACHE_SIZE,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.flush_interval = flush_interval
+        self._session_factory = session_factory
+        # session id -> owner id, for running sessions only
+        self._owners = TTLCache(cache_size, max(flush_interval * 4, TIMER_ABANDON_AFTER_SECONDS))
+        self._pending: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "heartbeats": 0,
+            "heartbeats_uncached": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "stale_sessions": 0,
+            "flush_errors": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    def remember(self, session: TimerSession) -> None:
+        self._owners.set(str(session.id), str(session.user_id))
+
+    def forget(self, session_id: Any) -> None:
+        self._owners.invalidate(str(session_id))
+        self._pending.pop(str(session_id), None)
+
+    def touch(self, session_id: Any, user_id: Any) -> bool:
+        """
+        Record a heartbeat; False if the session is not a cached running session of this user
+        """
+        session_id = str(session_id)
+        if self._owners.get(session_id) != str(user_id):
+            self._stats["heartbeats_uncached"] += 1
+            return False
+        self._pending[session_id] = utcnow()
+        self._stats["heartbeats"] += 1
+        return True
+
+    def last_seen(self, session_id: Any) -> Optional[datetime]:
+        """
+        The newest heartbeat not yet written to the database, if any
+        """
+        return self._pending.get(str(session_id))
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        rows = [{"session_id": uuid.UUID(session_id), "seen_at": seen_at} for session_id, seen_at in pending.items()]
+        table = TimerSession.__table__
+        # Stopped or paused sessions are left alone even if a late heartbeat was buffered
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("session_id"), table.c.status == "running")
+            .values(last_heartbeat_at=bindparam("seen_at"))
+        )
+
+        started = time.perf_counter()
+        running = set()
+        try:
+            async with self._session_factory() as db:
+                for start in range(0, len(rows), _FLUSH_CHUNK):
+                    chunk = rows[start:start + _FLUSH_CHUNK]
+                    await db.execute(statement, chunk)
+                    running.update((await db.execute(
+                        select(table.c.id).where(table.c.id.in_([row["session_id"] for row in chunk]), table.c.status == "running")
+                    )).scalars().all())
+                await db.commit()
+        except Exception:
+            # Put the heartbeats back unless a newer one arrived in the meantime
+            for session_id, seen_at in pending.items():
+                self._pending.setdefault(session_id, seen_at)
+            self._stats["flush_errors"] += 1
+            raise
+
+        # Paused, stopped or deleted elsewhere: the next heartbeat goes to the database check
+        for row in rows:
+            if row["session_id"] not in running:
+                self._owners.invalidate(str(row["session_id"]))
+                self._pending.pop(str(row["session_id"]), None)
+                self._stats["stale_sessions"] += 1
+        self._stats["flushes"] += 1
+        self._stats["rows_flushed"] += len(rows)
+        self._stats["last_flush_ms"] = (time.perf_counter() - started) * 1000
+        return len(rows)
+
+    async def run(self) -> None:
+        """
+        Background loop writing buffered heartbeats every flush interval
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Heartbeat flush failed: %s", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """
+        Stop the background loop and write out the remaining heartbeats
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Final heartbeat flush failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update({
+            "pending": len(self._pending),
+            "flush_interval_seconds": self.flush_interval,
+            "cached_sessions": self._owners.stats()["size"],
+            # Heartbeats absorbed per row written
+            "coalescing_ratio": stats["heartbeats"] / stats["rows_flushed"] if stats["rows_flushed"] else 0.0,
+        })
+        return stats
+
+
+heartbeat_buffer = HeartbeatBuffer()
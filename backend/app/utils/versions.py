@@ -0,0 +1,65 @@
+"""
+Shared version counters for per-worker caches
+
+A worker that caches something derived from the database (a streak bitmap, a
+listing's ETag token) cannot see writes served by another worker. Such caches
+key their entries by a scope ("streak:<habit id>", ...) whose counter lives in
+scope_versions and is bumped in the same transaction as the write, so a cached
+entry is valid exactly while its version is still the current one. Checking is
+a primary-key lookup, far cheaper than rebuilding the entry.
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.scope_version import ScopeVersion
+from app.utils.database import dialect_insert
+
+
+def bump_statement(dialect_name: str, scopes: Iterable[str]):
+    """
+    Upsert that increments each scope's version and returns (scope, version)
+    """
+    table = ScopeVersion.__table__
+    # Sorted, so concurrent transactions lock the rows in the same order
+    stmt = dialect_insert(dialect_name)(table).values([{"scope": scope, "version": 1} for scope in sorted(set(scopes))])
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.scope],
+        set_={"version": table.c.version + 1},
+    ).returning(table.c.scope, table.c.version)
+
+
+async def bump_versions(db: AsyncSession, scopes: Iterable[str]) -> Dict[str, int]:
+    """
+    Bump `scopes` before the write they cover is committed; returns the new versions
+    """
+    scopes = list(scopes)
+    if not scopes:
+        return {}
+    result = await db.execute(bump_statement(db.bind.dialect.name, scopes))
+    return dict(result.all())
+
+
+def bump_versions_sync(db: Session, scopes: Iterable[str]) -> Dict[str, int]:
+    scopes = list(scopes)
+    if not scopes:
+        return {}
+    return dict(db.execute(bump_statement(db.bind.dialect.name, scopes)).all())
+
+
+def version_query(scope: str):
+    return select(ScopeVersion.version).where(ScopeVersion.scope == scope)
+
+
+async def read_version(db: AsyncSession, scope: str) -> int:
+    """
+    Current version of `scope`; 0 until its first write
+    """
+    return (await db.execute(version_query(scope))).scalar() or 0
+
+
+def read_version_sync(db: Session, scope: str) -> int:
+    return db.execute(version_query(scope)).scalar() or 0
@@ -0,0 +1,76 @@
+"""
+Bulk ingestion benchmark: POST /habit-logs/bulk vs one POST /habit-logs per log
+
+Runs against a live API with a real access token. A throwaway habit is created
+for the run and deleted afterwards (its logs go with it).
+
+    python -m benchmarks.bulk_logs --token TOKEN [--base-url URL] [--sizes 1,100,10000] [--single 100]
+"""
+
+import argparse
+import time
+import uuid
+from datetime import date, timedelta
+
+import httpx
+
+
+def _logs(habit_id: str, count: int, run_id: str):
+    start = date.today() - timedelta(days=count)
+    return [
+        {
+            "habit_id": habit_id,
+            "date": (start + timedelta(days=i)).isoformat(),
+            "duration": 600,
+            "status": "completed",
+            "idempotency_key": f"bench-{run_id}-{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Bearer access token")
+    parser.add_argument("--sizes", default="1,100,10000", help="Comma-separated batch sizes")
+    parser.add_argument("--single", type=int, default=100, help="Logs to send one request at a time (0 to skip)")
+    args = parser.parse_args(argv)
+
+    with httpx.Client(base_url=args.base_url, headers={"Authorization": f"Bearer {args.token}"}, timeout=300) as client:
+        response = client.post("/habits/", json={"name": "Bulk benchmark", "category": "benchmark"})
+        response.raise_for_status()
+        habit_id = response.json()["id"]
+        try:
+            print(f"{'':28}{'logs':>8}{'seconds':>10}{'logs/s':>12}")
+
+            if args.single:
+                started = time.perf_counter()
+                for log in _logs(habit_id, args.single, uuid.uuid4().hex):
+                    log.pop("idempotency_key")
+                    client.post("/habit-logs/", json=log).raise_for_status()
+                elapsed = time.perf_counter() - started
+                print(f"{'POST /habit-logs (each)':28}{args.single:>8}{elapsed:>10.2f}{args.single / elapsed:>12.0f}")
+
+            for size in (int(s) for s in args.sizes.split(",")):
+                logs = _logs(habit_id, size, uuid.uuid4().hex)
+                started = time.perf_counter()
+                response = client.post("/habit-logs/bulk", json={"logs": logs})
+                elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                assert response.json()["created"] == size, response.json()
+                print(f"{'POST /habit-logs/bulk':28}{size:>8}{elapsed:>10.2f}{size / elapsed:>12.0f}")
+
+                # Replaying the same batch must insert nothing
+                started = time.perf_counter()
+                response = client.post("/habit-logs/bulk", json={"logs": logs})
+                elapsed = time.perf_counter() - started
+                response.raise_for_status()
+                assert response.json()["duplicates"] == size, response.json()
+                print(f"{'  ... replayed (duplicates)':28}{size:>8}{elapsed:>10.2f}{size / elapsed:>12.0f}")
+        finally:
+            client.delete(f"/habits/{habit_id}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Synthetic Apple Health export.xml generator
+
+Writes a deterministic export of the requested size (multi-GB is fine; the
+file is streamed out) for exercising the importer:
+
+    python -m benchmarks.health_fixture export.xml --size-mb 2048 [--seed 1]
+    python -m app.utils.health_import export.xml --user-id ID --source apple_health --workout-habit-id ID
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+
+HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Correlation|Workout)*)>
+<!ATTLIST HealthData locale CDATA #REQUIRED>
+]>
+<HealthData locale="en_US">
+ <ExportDate value="{now}"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-01-01"/>
+"""
+FOOTER = "</HealthData>\n"
+
+_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+_TZ = timezone(timedelta(hours=-8))
+
+
+def _minute_records(rng: random.Random, moment: datetime) -> str:
+    start = moment.strftime(_FORMAT)
+    end = (moment + timedelta(minutes=1)).strftime(_FORMAT)
+    return (
+        f' <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Synthetic Watch" unit="count/min" '
+        f'creationDate="{end}" startDate="{start}" endDate="{start}" value="{rng.randint(52, 160)}">\n'
+        f'  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="{rng.randint(0, 2)}"/>\n'
+        f' </Record>\n'
+        f' <Record type="HKQuantityTypeIdentifierStepCount" sourceName="Synthetic Phone" unit="count" '
+        f'creationDate="{end}" startDate="{start}" endDate="{end}" value="{rng.randint(0, 140)}"/>\n'
+    )
+
+
+def _daily_records(rng: random.Random, day: datetime) -> str:
+    sleep_start = day - timedelta(hours=rng.randint(1, 3))
+    sleep_end = day + timedelta(hours=rng.randint(5, 8))
+    workout_start = day + timedelta(hours=rng.randint(6, 19))
+    minutes = rng.randint(15, 90)
+    return (
+        f' <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Synthetic Watch" '
+        f'startDate="{sleep_start.strftime(_FORMAT)}" endDate="{sleep_end.strftime(_FORMAT)}" '
+        f'value="HKCategoryValueSleepAnalysisAsleepCore"/>\n'
+        f' <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="{minutes}" durationUnit="min" '
+        f'sourceName="Synthetic Watch" startDate="{workout_start.strftime(_FORMAT)}" '
+        f'endDate="{(workout_start + timedelta(minutes=minutes)).strftime(_FORMAT)}">\n'
+        f'  <WorkoutStatistics type="HKQuantityTypeIdentifierActiveEnergyBurned" sum="{minutes * 11}" unit="Cal"/>\n'
+        f' </Workout>\n'
+    )
+
+
+def generate(path: str, size_bytes: int, seed: int) -> int:
+    rng = random.Random(seed)
+    moment = datetime(2015, 1, 1, tzinfo=_TZ)
+    written = 0
+    with open(path, "w", encoding="utf-8") as out:
+        written += out.write(HEADER.format(now=moment.strftime(_FORMAT)))
+        while written < size_bytes:
+            if moment.hour == 0 and moment.minute == 0:
+                written += out.write(_daily_records(rng, moment))
+            written += out.write(_minute_records(rng, moment))
+            moment += timedelta(minutes=1)
+        written += out.write(FOOTER)
+    return written
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--size-mb", type=float, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    written = generate(args.path, int(args.size_mb * 1024 * 1024), args.seed)
+    print(f"Wrote {written / 1024 / 1024:.1f} MB to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Heatmap benchmark: GET /habit-logs/heatmap vs paging through GET /habit-logs
+
+Runs against a live API with a real access token and reports payload size and
+latency for a year of one user's data, fetched both ways.
+
+    python -m benchmarks.heatmap --token TOKEN --year 2024 [--base-url URL] [--habit-id ID] [--runs 20]
+"""
+
+import argparse
+import statistics
+import time
+
+import httpx
+
+
+def _list_endpoint(client: httpx.Client, year: int, habit_id):
+    params = {"start_date": f"{year}-01-01", "end_date": f"{year}-12-31", "limit": 500}
+    if habit_id:
+        params["habit_id"] = habit_id
+    total_bytes = 0
+    while True:
+        response = client.get("/habit-logs/", params=params)
+        response.raise_for_status()
+        total_bytes += len(response.content)
+        next_cursor = response.json()["next_cursor"]
+        if not next_cursor:
+            return total_bytes
+        params["cursor"] = next_cursor
+
+
+def _heatmap(client: httpx.Client, year: int, habit_id, encoding: str, etag=None):
+    params = {"year": year, "encoding": encoding}
+    if habit_id:
+        params["habit_id"] = habit_id
+    headers = {"If-None-Match": etag} if etag else {}
+    response = client.get("/habit-logs/heatmap", params=params, headers=headers)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return len(response.content), response.headers.get("etag")
+
+
+def _time(fn, runs: int):
+    timings, size = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        size = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return size, statistics.median(timings), max(timings)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Bearer access token")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--habit-id")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with httpx.Client(base_url=args.base_url, headers={"Authorization": f"Bearer {args.token}"}, timeout=60) as client:
+        _, etag = _heatmap(client, args.year, args.habit_id, "rle")
+        results = {
+            "GET /habit-logs (all pages)": _time(lambda: _list_endpoint(client, args.year, args.habit_id), args.runs),
+            "GET /habit-logs/heatmap raw": _time(lambda: _heatmap(client, args.year, args.habit_id, "raw")[0], args.runs),
+            "GET /habit-logs/heatmap rle": _time(lambda: _heatmap(client, args.year, args.habit_id, "rle")[0], args.runs),
+            "  ... with If-None-Match": _time(lambda: _heatmap(client, args.year, args.habit_id, "rle", etag)[0], args.runs),
+        }
+
+    print(f"{'':32}{'bytes':>10}{'p50 ms':>10}{'max ms':>10}")
+    for name, (size, p50, worst) in results.items():
+        print(f"{name:32}{size:>10}{p50:>10.1f}{worst:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
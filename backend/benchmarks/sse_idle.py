@@ -0,0 +1,150 @@
+"""
+Event stream load test: hold thousands of idle GET /events connections
+
+Opens --connections streams against a live API, keeps them open for
+--duration seconds while counting heartbeats, then (with --habit-id) touches
+the habit once and measures how long the change event takes to reach every
+stream. Finishes with the server's /debug/stats "events" section.
+
+All streams use the same token, so start the server with a per-user limit at
+least as large as --connections, and raise the open-file limit on both sides:
+
+    ulimit -n 65536
+    EVENTS_MAX_CONNECTIONS_PER_USER=5000 EVENTS_HEARTBEAT_SECONDS=5 DEBUG_STATS_TOKEN=secret uvicorn app.main:app
+    python -m benchmarks.sse_idle --token TOKEN --connections 5000 [--duration 60] [--habit-id ID] [--stats-token secret]
+
+Connections are raw asyncio streams rather than httpx clients, so the client
+side costs a few KB per connection and does not skew the measurement.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class Stream:
+    def __init__(self):
+        self.connected = False
+        self.heartbeats = 0
+        self.events = 0
+        self.first_event_at = None
+        self.error = None
+
+
+async def _hold(host: str, port: int, token: str, stream: Stream, stop: asyncio.Event) -> None:
+    writer = None
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f"GET /events/?access_token={token} HTTP/1.1\r\nHost: {host}\r\n"
+            "Accept: text/event-stream\r\n\r\n".encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if b" 200 " not in status_line:
+            stream.error = status_line.decode(errors="replace").strip() or "connection closed"
+            return
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        stream.connected = True
+
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                stream.error = "closed by server"
+                return
+            # Chunked framing lines are skipped along with the blank separators
+            if line.startswith(b": ping"):
+                stream.heartbeats += 1
+            elif line.startswith(b"event: change"):
+                stream.events += 1
+                if stream.first_event_at is None:
+                    stream.first_event_at = time.perf_counter()
+    except Exception as e:
+        stream.error = type(e).__name__
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def _run(args) -> None:
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+    stop = asyncio.Event()
+    streams = [Stream() for _ in range(args.connections)]
+    tasks = []
+
+    started = time.perf_counter()
+    for i, stream in enumerate(streams):
+        tasks.append(asyncio.create_task(_hold(host, port, args.token, stream, stop)))
+        if (i + 1) % args.ramp == 0:
+            await asyncio.sleep(0.1)
+    await asyncio.sleep(1)
+    connected = sum(stream.connected for stream in streams)
+    print(f"{connected}/{args.connections} streams open after {time.perf_counter() - started:.1f}s")
+
+    await asyncio.sleep(args.duration)
+    alive = [stream for stream in streams if stream.connected and stream.error is None]
+    heartbeats = [stream.heartbeats for stream in alive]
+    print(f"{len(alive)} streams alive after {args.duration}s, "
+          f"heartbeats per stream: median {statistics.median(heartbeats) if heartbeats else 0}, "
+          f"min {min(heartbeats, default=0)}")
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers) as client:
+        if args.habit_id:
+            habit = (await client.get(f"/habits/{args.habit_id}")).json()
+            published = time.perf_counter()
+            response = await client.put(f"/habits/{args.habit_id}", json={"name": habit["name"]})
+            response.raise_for_status()
+            await asyncio.sleep(args.fanout_wait)
+            latencies = sorted(
+                (stream.first_event_at - published) * 1000 for stream in alive if stream.first_event_at
+            )
+            if latencies:
+                print(f"change event reached {len(latencies)}/{len(alive)} streams: "
+                      f"p50 {latencies[len(latencies) // 2]:.1f} ms, "
+                      f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:.1f} ms, "
+                      f"max {latencies[-1]:.1f} ms")
+            else:
+                print("change event reached no streams")
+
+        if args.stats_token:
+            response = await client.get("/debug/stats", headers={"X-Debug-Token": args.stats_token})
+            if response.status_code == 200:
+                print("server:", json.dumps(response.json().get("events"), indent=2))
+
+    errors = {}
+    for stream in streams:
+        if stream.error:
+            errors[stream.error] = errors.get(stream.error, 0) + 1
+    if errors:
+        print("errors:", errors)
+
+    stop.set()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Bearer access token")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to hold the idle streams")
+    parser.add_argument("--ramp", type=int, default=200, help="Connections opened per 100 ms")
+    parser.add_argument("--habit-id", help="Habit to touch once to measure event fan-out")
+    parser.add_argument("--stats-token", help="The server's DEBUG_STATS_TOKEN, to print its event stream stats")
+    parser.add_argument("--fanout-wait", type=float, default=5, help="Seconds to wait for the event to arrive")
+    args = parser.parse_args(argv)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Streak benchmark: sort-and-scan vs day bitmap
+
+Simulates 10 years of daily completions and times the per-completion streak
+update both ways.
+
+    python -m benchmarks.streaks [--years 10] [--gap-every 37]
+"""
+
+import argparse
+import time
+from datetime import date, timedelta
+
+from app.utils.streaks import DayBitmap
+
+
+def sort_and_scan(completed_days):
+    """
+    Sort-and-scan over every completion, as habit_service._update_streak does
+    """
+    ordered = sorted(completed_days)
+    current_streak = 1
+    longest_streak = 1
+    prev = ordered[0]
+    for day in ordered[1:]:
+        diff_days = (day - prev).days
+        if diff_days <= 1:
+            current_streak += (1 if diff_days == 1 else 0)
+            longest_streak = max(longest_streak, current_streak)
+        else:
+            current_streak = 1
+        prev = day
+    return current_streak, longest_streak
+
+
+def _days(years: int, gap_every: int):
+    start = date.today() - timedelta(days=365 * years)
+    return [start + timedelta(days=i) for i in range(365 * years) if not gap_every or i % gap_every]
+
+
+def run(years: int, gap_every: int) -> None:
+    days = _days(years, gap_every)
+    print(f"{len(days)} completions over {years} years")
+
+    # Incremental: each completion triggers a streak update, as complete_habit does
+    history = []
+    started = time.perf_counter()
+    for day in days:
+        history.append(day)
+        expected = sort_and_scan(history)
+    sort_total = time.perf_counter() - started
+
+    bitmap = DayBitmap()
+    started = time.perf_counter()
+    for day in days:
+        bitmap.add(day)
+        result = (bitmap.run_ending_at(day), bitmap.longest_streak())
+    bitmap_total = time.perf_counter() - started
+    assert result == expected, (result, expected)
+
+    # Single read over the full history (GET /habits/{id}/streak)
+    started = time.perf_counter()
+    sort_and_scan(days)
+    sort_read = time.perf_counter() - started
+    started = time.perf_counter()
+    full = DayBitmap.from_days(days)
+    rebuild = time.perf_counter() - started
+    started = time.perf_counter()
+    full.current_streak(days[-1])
+    full.longest_streak()
+    bitmap_read = time.perf_counter() - started
+
+    print(f"{'':28}{'sort-and-scan':>16}{'bitmap':>16}")
+    print(f"{'all updates (total)':28}{sort_total * 1000:>13.1f} ms{bitmap_total * 1000:>13.1f} ms")
+    print(f"{'per update (mean)':28}{sort_total / len(days) * 1e6:>13.1f} us{bitmap_total / len(days) * 1e6:>13.1f} us")
+    print(f"{'full read':28}{sort_read * 1e6:>13.1f} us{bitmap_read * 1e6:>13.1f} us")
+    print(f"{'bitmap rebuild':28}{'':>16}{rebuild * 1e6:>13.1f} us")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--gap-every", type=int, default=37, help="Skip every Nth day to break streaks (0 = never)")
+    args = parser.parse_args(argv)
+    run(args.years, args.gap_every)
+
+
+if __name__ == "__main__":
+    main()
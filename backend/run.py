@@ -13,7 +13,10 @@ load_dotenv()
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
 DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
-WORKERS = 1 if DEBUG else int(os.getenv("UVICORN_WORKERS", "2"))
+WORKERS = int(os.getenv("WEB_CONCURRENCY") or (1 if DEBUG else os.getenv("UVICORN_WORKERS", "2")))
+
+# Workers size their connection pools (and pick ETag and event broker modes) from this
+os.environ["WEB_CONCURRENCY"] = str(WORKERS)
 
 print(f"Starting Ritual API on {API_HOST}:{API_PORT} | Debug: {DEBUG} | Workers: {WORKERS}")
 
@@ -18,12 +18,13 @@ from typing import Optional
 from sqlalchemy import text
 
 # Import existing models and database setup
-from app.utils.database import get_db, engine, Base
+from app.utils.database import get_db, engine
+from app.migrations import run_migrations
 from app.models.habit import Habit
 from app.utils.supabase import get_supabase_admin_client
 
-# Create tables if they don't exist
-Base.metadata.create_all(bind=engine)
+# Bring the schema up to date (creates tables and indexes if they don't exist)
+run_migrations(engine)
 
 # Pydantic models for API
 class HabitCreate(BaseModel):
@@ -0,0 +1,84 @@
+"""
+Test setup: a throwaway SQLite database brought up by the migrations, and
+locally signed HS256 access tokens, so no test talks to Supabase.
+
+The environment is set before any app module is imported, since the modules
+read their configuration at import time.
+"""
+
+import os
+import tempfile
+import time
+import uuid
+
+_DATA_DIR = tempfile.mkdtemp(prefix="ritual-tests-")
+JWT_SECRET = "test-jwt-secret-with-enough-bytes-for-hs256"
+
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_DATA_DIR}/test.db",
+    "SUPABASE_JWT_SECRET": JWT_SECRET,
+    "SUPABASE_AUTH_REMOTE_FALLBACK": "False",
+    "IMPORT_UPLOAD_DIR": os.path.join(_DATA_DIR, "imports"),
+    # Going over a route's query budget fails the request instead of logging a warning
+    "QUERY_BUDGET_ENFORCE": "True",
+    # TestClient runs the app in this one process
+    "WEB_CONCURRENCY": "1",
+})
+for _name in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_JWKS_URL"):
+    os.environ.pop(_name, None)
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.migrations import run_migrations
+from app.models.habit import Habit
+from app.models.user import Profile
+from app.utils.database import SessionLocal, engine
+
+run_migrations(engine)
+
+
+def make_token(user_id, expires_in: int = 3600) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {"sub": str(user_id), "aud": "authenticated", "role": "authenticated", "iat": now, "exp": now + expires_in},
+        JWT_SECRET,
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user():
+    """A fresh profile row"""
+    profile = Profile(id=uuid.uuid4(), email="tester@example.com", full_name="Test User")
+    with SessionLocal() as db:
+        db.add(profile)
+        db.commit()
+        db.refresh(profile)
+        db.expunge(profile)
+    return profile
+
+
+@pytest.fixture
+def auth_headers(user):
+    return {"Authorization": f"Bearer {make_token(user.id)}"}
+
+
+@pytest.fixture
+def habit(user):
+    """A habit owned by `user`"""
+    row = Habit(id=uuid.uuid4(), user_id=user.id, name="Run", category="manual")
+    with SessionLocal() as db:
+        db.add(row)
+        db.commit()
+        db.refresh(row)
+        db.expunge(row)
+    return row
@@ -0,0 +1,62 @@
+import asyncio
+import time
+import uuid
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app import dependencies
+from app.utils.jwt_verifier import SupabaseJWTVerifier
+from app.utils.supabase import get_supabase_registry
+from tests.conftest import make_token
+
+
+def test_authenticated_request_makes_no_outbound_call(client, auth_headers, monkeypatch):
+    def remote_validation(*args, **kwargs):
+        raise AssertionError("token was sent to Supabase")
+
+    monkeypatch.setattr(dependencies, "get_supabase_client", remote_validation)
+    before = get_supabase_registry().stats()["http_requests"]
+
+    for _ in range(3):
+        response = client.get("/habits/", headers=auth_headers)
+        assert response.status_code == 200
+
+    assert get_supabase_registry().stats()["http_requests"] == before
+
+
+def test_token_without_a_uuid_subject_is_rejected(client, user):
+    response = client.get("/habits/", headers={"Authorization": f"Bearer {make_token('not-a-uuid')}"})
+    assert response.status_code == 401
+
+
+def test_expired_token_is_rejected(client, user):
+    response = client.get("/habits/", headers={"Authorization": f"Bearer {make_token(user.id, expires_in=-60)}"})
+    assert response.status_code == 401
+
+
+def test_jwks_is_fetched_once_for_many_tokens():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    fetches = []
+
+    def fetch_jwks(url):
+        fetches.append(url)
+        return {"keys": [{**public_jwk, "kid": "key-1", "alg": "RS256", "use": "sig"}]}
+
+    verifier = SupabaseJWTVerifier(secret=None, jwks_url="https://example.invalid/jwks", fetch_jwks=fetch_jwks)
+    subject = str(uuid.uuid4())
+    token = jwt.encode(
+        {"sub": subject, "aud": "authenticated", "exp": int(time.time()) + 60},
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "key-1"},
+    )
+
+    async def verify_many():
+        return await asyncio.gather(*(verifier.verify(token) for _ in range(20)))
+
+    claims = asyncio.run(verify_many())
+    assert {c["sub"] for c in claims} == {subject}
+    assert len(fetches) == 1
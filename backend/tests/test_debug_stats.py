@@ -0,0 +1,22 @@
+from app import main
+
+
+def test_debug_stats_is_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(main, "DEBUG_STATS_TOKEN", None)
+    assert client.get("/debug/stats").status_code == 404
+    assert client.get("/debug/stats", headers={"X-Debug-Token": ""}).status_code == 404
+
+
+def test_debug_stats_requires_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(main, "DEBUG_STATS_TOKEN", "stats-secret")
+    assert client.get("/debug/stats").status_code == 404
+    assert client.get("/debug/stats", headers={"X-Debug-Token": "wrong"}).status_code == 404
+
+
+def test_debug_stats_serializes_every_cache(client, monkeypatch):
+    monkeypatch.setattr(main, "DEBUG_STATS_TOKEN", "stats-secret")
+    # A cache without expiry used to put Infinity in the payload, which JSON cannot encode
+    monkeypatch.setattr(main.listing_versions._tracked, "ttl", float("inf"))
+    response = client.get("/debug/stats", headers={"X-Debug-Token": "stats-secret"})
+    assert response.status_code == 200
+    assert response.json()["etag_versions"]["tracked"]["ttl_seconds"] is None
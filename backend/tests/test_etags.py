@@ -0,0 +1,54 @@
+import uuid
+
+from app.models.habit_unit import HabitUnit
+from app.utils.database import SessionLocal
+from app.utils.etags import HABIT_UNITS_SCOPE
+from app.utils.versions import read_version_sync
+
+
+def _queries(response) -> int:
+    # Server-Timing: db;dur=<ms>;desc="<n> queries", app;dur=<ms>
+    db_timing = response.headers["server-timing"].split(",")[0]
+    return int(db_timing.split('desc="')[1].split()[0])
+
+
+def test_unchanged_habit_list_is_a_304_without_sql(client, auth_headers):
+    first = client.get("/habits/", headers=auth_headers)
+    assert first.status_code == 200
+
+    again = client.get("/habits/", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+    assert _queries(again) == 0
+
+
+def test_unchanged_reference_list_is_a_304_without_sql(client):
+    first = client.get("/habit-units/")
+    assert first.status_code == 200
+
+    again = client.get("/habit-units/", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert _queries(again) == 0
+
+
+def test_subscription_write_changes_the_etag(client, auth_headers):
+    first = client.get("/subscriptions/", headers=auth_headers)
+    created = client.post(
+        "/subscriptions/",
+        json={"plan": "core", "status": "active", "start_date": "2024-01-01T00:00:00Z"},
+        headers=auth_headers,
+    )
+    assert created.status_code == 200, created.text
+
+    again = client.get("/subscriptions/", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200
+    assert again.headers["etag"] != first.headers["etag"]
+    assert len(again.json()) == 1
+
+
+def test_writes_outside_the_api_bump_reference_versions():
+    with SessionLocal() as db:
+        before = read_version_sync(db, HABIT_UNITS_SCOPE)
+        db.add(HabitUnit(id=uuid.uuid4(), type=f"type-{uuid.uuid4()}", default_unit="min", allowed_units="min"))
+        db.commit()
+        assert read_version_sync(db, HABIT_UNITS_SCOPE) == before + 1
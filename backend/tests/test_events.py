@@ -0,0 +1,31 @@
+import asyncio
+import uuid
+
+from app.utils.changes import record_change
+from app.utils.database import AsyncSessionLocal
+from app.utils.events import ChangeLogBroker
+
+
+def test_changelog_poll_reads_each_user_from_their_own_cursor(user, habit):
+    other_user = uuid.uuid4()
+    broker = ChangeLogBroker()
+
+    async def scenario():
+        mine = broker.subscribe(user.id)
+        theirs = broker.subscribe(other_user)
+        async with AsyncSessionLocal() as db:
+            await record_change(db, user.id, "habit", habit.id, "upsert")
+            await db.commit()
+        # First poll only finds where each stream starts
+        await broker.poll()
+
+        async with AsyncSessionLocal() as db:
+            await record_change(db, user.id, "habit", habit.id, "upsert")
+            await db.commit()
+        await broker.poll()
+        await broker.poll()
+        return [mine.queue.get_nowait() for _ in range(mine.queue.qsize())], theirs.queue.qsize()
+
+    events, other_events = asyncio.run(scenario())
+    assert events == [{"type": "change", "entity": "habit", "op": "upsert", "count": 1, "ids": [str(habit.id)]}]
+    assert other_events == 0
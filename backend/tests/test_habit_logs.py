@@ -0,0 +1,113 @@
+import uuid
+from datetime import date, timedelta
+
+from app.models.habit import Habit
+from app.models.user import Profile
+from app.utils.database import SessionLocal
+from app.utils.pagination import encode_cursor
+
+START = date(2024, 5, 1)
+
+
+def _log(client, auth_headers, habit_id, day):
+    response = client.post(
+        "/habit-logs/",
+        json={"habit_id": str(habit_id), "date": day.isoformat(), "status": "completed"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def _pages(client, auth_headers, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get("/habit-logs/", params={**params, **({"cursor": cursor} if cursor else {})}, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append([(item["date"], item["id"]) for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_walks_every_log_once_newest_first(client, auth_headers, habit):
+    other = client.post("/habits/", json={"name": "Read", "category": "manual"}, headers=auth_headers).json()
+    # Both habits logged on the same days, so pages break inside a date too
+    ids = {_log(client, auth_headers, h, START + timedelta(days=d)) for d in range(3) for h in (habit.id, other["id"])}
+
+    pages = _pages(client, auth_headers, limit=4)
+    assert [len(page) for page in pages] == [4, 2]
+    rows = [row for page in pages for row in page]
+    assert {log_id for _, log_id in rows} == ids
+    assert rows == sorted(rows, reverse=True)
+
+
+def test_habit_id_filter(client, auth_headers, habit):
+    other = client.post("/habits/", json={"name": "Read", "category": "manual"}, headers=auth_headers).json()
+    mine = {_log(client, auth_headers, habit.id, START + timedelta(days=d)) for d in range(3)}
+    _log(client, auth_headers, other["id"], START)
+
+    pages = _pages(client, auth_headers, habit_id=str(habit.id), limit=2)
+    assert {log_id for page in pages for _, log_id in page} == mine
+
+    dated = _pages(client, auth_headers, habit_id=str(habit.id), start_date=(START + timedelta(days=1)).isoformat())
+    assert [day for page in dated for day, _ in page] == ["2024-05-03", "2024-05-02"]
+
+
+def test_invalid_cursor_is_a_400(client, auth_headers):
+    for cursor in ("not-a-cursor", encode_cursor("2024-05-01"), encode_cursor("2024-13-01", "x")):
+        response = client.get("/habit-logs/", params={"cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 400, cursor
+
+
+def _bulk(client, auth_headers, logs):
+    response = client.post("/habit-logs/bulk", json={"logs": logs}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _item(habit_id, day, key=None):
+    return {"habit_id": str(habit_id), "date": (START + timedelta(days=day)).isoformat(), "status": "completed", "idempotency_key": key}
+
+
+def test_bulk_replay_reports_duplicates(client, auth_headers, habit, monkeypatch):
+    # Several INSERT statements per request
+    monkeypatch.setattr("app.routes.habit_log.BULK_INSERT_CHUNK", 2)
+    logs = [_item(habit.id, day, f"k{day}") for day in range(5)]
+    first = _bulk(client, auth_headers, logs + [_item(habit.id, 0, "k0")])
+    assert (first["created"], first["duplicates"], first["failed"]) == (5, 1, 0)
+    created = {result["index"]: result["id"] for result in first["results"]}
+    # Repeated within the request: resolves to the first item's log
+    assert created[5] == created[0]
+
+    replay = _bulk(client, auth_headers, logs)
+    assert (replay["created"], replay["duplicates"], replay["failed"]) == (0, 5, 0)
+    assert [result["id"] for result in replay["results"]] == [created[i] for i in range(5)]
+    assert len(_pages(client, auth_headers, habit_id=str(habit.id))[0]) == 5
+
+
+def test_bulk_reports_invalid_and_foreign_habits(client, auth_headers, habit):
+    stranger_id, foreign_id = uuid.uuid4(), uuid.uuid4()
+    with SessionLocal() as db:
+        db.add(Profile(id=stranger_id, email="stranger@example.com", full_name="Stranger"))
+        db.flush()
+        db.add(Habit(id=foreign_id, user_id=stranger_id, name="Theirs", category="manual"))
+        db.commit()
+
+    result = _bulk(client, auth_headers, [
+        _item(habit.id, 0),
+        _item("not-a-uuid", 1),
+        _item(foreign_id, 2),
+        _item(uuid.uuid4(), 3),
+        _item(habit.id, 4, "once"),
+    ])
+    assert (result["created"], result["duplicates"], result["failed"]) == (2, 0, 3)
+    assert [(r["status"], r["error"]) for r in result["results"]] == [
+        ("created", None),
+        ("error", "Invalid habit_id"),
+        ("error", "Habit not found"),
+        ("error", "Habit not found"),
+        ("created", None),
+    ]
+    assert len(_pages(client, auth_headers)[0]) == 2
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import uuid
+
+from sqlalchemy import select
+
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.models.habit_log import HabitLog
+from app.models.import_job import ImportJob
+from app.utils.database import SessionLocal
+from app.utils.health_import import run_import
+
+EXPORT = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (Record|Workout)*>
+<!ATTLIST Record type CDATA #REQUIRED>
+]>
+<HealthData locale="en_US">
+ <Record type="HKQuantityTypeIdentifierStepCount" sourceName="Watch" unit="count" value="120"
+   startDate="2024-01-01 08:00:00 +0000" endDate="2024-01-01 08:01:00 +0000"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" durationUnit="min"
+   startDate="2024-01-01 07:00:00 +0000" endDate="2024-01-01 07:30:00 +0000"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeCycling" duration="1" durationUnit="hr"
+   startDate="2024-01-02 07:00:00 +0000" endDate="2024-01-02 08:00:00 +0000"/>
+</HealthData>
+"""
+
+ENTITY_BOMB = """<?xml version="1.0"?>
+<!DOCTYPE HealthData [<!ENTITY a "aaaaaaaaaa"><!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>
+<HealthData><Record type="HKQuantityTypeIdentifierStepCount" value="&b;" startDate="2024-01-01 08:00:00 +0000"/></HealthData>
+"""
+
+
+def _import(tmp_path, user, habit, content):
+    path = tmp_path / "export.xml"
+    path.write_text(content)
+    job_id = uuid.uuid4()
+    job = ImportJob(
+        id=job_id, user_id=user.id, source="apple_health", file_path=str(path),
+        options=json.dumps({"workout_habit_id": str(habit.id)}),
+    )
+    with SessionLocal() as db:
+        db.add(job)
+        db.commit()
+    return asyncio.run(run_import(job_id))
+
+
+def test_workouts_become_logs_and_rollups(tmp_path, user, habit):
+    job = _import(tmp_path, user, habit, EXPORT)
+    assert job.status == "completed", job.error
+    assert (job.samples_imported, job.logs_imported) == (1, 2)
+
+    with SessionLocal() as db:
+        durations = db.execute(select(HabitLog.duration).where(HabitLog.habit_id == habit.id).order_by(HabitLog.date)).scalars().all()
+        rollups = db.execute(select(HabitDailyRollup.total_duration).where(HabitDailyRollup.habit_id == habit.id)).scalars().all()
+    assert durations == [1800, 3600]
+    assert sorted(rollups) == [1800, 3600]
+
+
+def test_entity_declarations_are_refused(tmp_path, user, habit):
+    job = _import(tmp_path, user, habit, ENTITY_BOMB)
+    assert job.status == "failed"
+    assert job.samples_imported == 0
+
+
+def _upload(client, auth_headers, habit, content):
+    response = client.post(
+        "/imports/",
+        files={"file": ("export.xml", content.encode(), "application/xml")},
+        data={"source": "apple_health", "workout_habit_id": str(habit.id)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 202, response.text
+    return response.json()["id"]
+
+
+def test_import_job_can_be_polled(client, auth_headers, habit):
+    # TestClient runs the background import before returning
+    job_id = _upload(client, auth_headers, habit, EXPORT)
+
+    response = client.get(f"/imports/{job_id}", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "completed"
+    assert response.json()["logs_imported"] == 2
+
+    assert client.get(f"/imports/{uuid.uuid4()}", headers=auth_headers).status_code == 404
+    assert client.get("/imports/not-a-uuid", headers=auth_headers).status_code == 422
+    assert client.post(f"/imports/{job_id}/resume", headers=auth_headers).status_code == 409
+
+
+def test_failed_import_job_can_be_resumed(client, auth_headers, habit):
+    job_id = _upload(client, auth_headers, habit, ENTITY_BOMB)
+    assert client.get(f"/imports/{job_id}", headers=auth_headers).json()["status"] == "failed"
+
+    # A corrected export in place of the rejected one
+    with SessionLocal() as db:
+        path = db.get(ImportJob, uuid.UUID(job_id)).file_path
+    with open(path, "w") as export:
+        export.write(EXPORT)
+
+    resumed = client.post(f"/imports/{job_id}/resume", headers=auth_headers)
+    assert resumed.status_code == 202, resumed.text
+    job = client.get(f"/imports/{job_id}", headers=auth_headers).json()
+    assert (job["status"], job["samples_imported"], job["logs_imported"]) == ("completed", 1, 2)
+    assert client.post(f"/imports/{uuid.uuid4()}/resume", headers=auth_headers).status_code == 404
@@ -0,0 +1,46 @@
+import base64
+import uuid
+from datetime import date
+
+from app.utils.heatmap import rle_decode
+
+
+def _complete(client, auth_headers, habit_id, day):
+    response = client.post(
+        "/habit-logs/",
+        json={"habit_id": str(habit_id), "date": day.isoformat(), "status": "completed"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+
+
+def _grids(response):
+    return {row["habit_id"]: rle_decode(base64.b64decode(row["data"])) for row in response.json()["habits"]}
+
+
+def test_heatmap_for_all_habits_and_one(client, auth_headers, habit):
+    other = client.post("/habits/", json={"name": "Read", "category": "manual"}, headers=auth_headers).json()
+    _complete(client, auth_headers, habit.id, date(2024, 1, 3))
+    _complete(client, auth_headers, other["id"], date(2024, 12, 31))
+
+    everything = client.get("/habit-logs/heatmap", params={"year": 2024}, headers=auth_headers)
+    assert everything.status_code == 200, everything.text
+    assert everything.json()["days"] == 366
+    grids = _grids(everything)
+    assert set(grids) == {str(habit.id), other["id"]}
+    assert grids[str(habit.id)][2] == 1 and sum(grids[str(habit.id)]) == 1
+    assert grids[other["id"]][365] == 1
+
+    one = client.get("/habit-logs/heatmap", params={"year": 2024, "habit_id": str(habit.id)}, headers=auth_headers)
+    assert one.status_code == 200, one.text
+    assert list(_grids(one)) == [str(habit.id)]
+    assert one.headers["etag"] != everything.headers["etag"]
+
+    raw = client.get("/habit-logs/heatmap", params={"year": 2024, "habit_id": str(habit.id), "encoding": "raw"}, headers=auth_headers)
+    assert base64.b64decode(raw.json()["habits"][0]["data"]) == grids[str(habit.id)]
+
+
+def test_heatmap_of_an_unknown_habit_is_a_404(client, auth_headers):
+    response = client.get("/habit-logs/heatmap", params={"year": 2024, "habit_id": str(uuid.uuid4())}, headers=auth_headers)
+    assert response.status_code == 404
+    assert client.get("/habit-logs/heatmap", params={"year": 2024, "encoding": "png"}, headers=auth_headers).status_code == 400
@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.models.habit_data_integration import HabitDataIntegration
+from app.utils.database import SessionLocal
+from app.utils.ingest import IngestBuffer, IngestTicket, ingest_row
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _rows(user, habit_id, count):
+    return [
+        ingest_row(user.id, habit_id, "test", "steps", 10, "count", START + timedelta(minutes=minute))
+        for minute in range(count)
+    ]
+
+
+def _stored(user):
+    with SessionLocal() as db:
+        return db.execute(select(func.count()).where(HabitDataIntegration.user_id == user.id)).scalar()
+
+
+def test_constraint_violation_drops_only_the_offending_rows(user, habit):
+    existing = _rows(user, habit.id, 1)
+    good = _rows(user, habit.id, 40)
+    # A row whose id is already stored, and one whose habit is gone
+    duplicate = dict(good[0], id=existing[0]["id"])
+    orphan = _rows(user, uuid.uuid4(), 1)[0]
+    buffer = IngestBuffer(flush_rows=1000, use_copy=False)
+
+    async def ingest():
+        await buffer.add(user.id, existing)
+        await buffer.flush_user(user.id)
+        await buffer.add(user.id, good[:20] + [duplicate, orphan] + good[20:])
+        return await buffer.flush_user(user.id)
+
+    assert asyncio.run(ingest()) == 40
+    assert _stored(user) == 41
+    stats = buffer.stats()
+    assert stats["rows_dropped"] == 2
+    assert stats["buffered_rows"] == 0
+    assert not stats["flushes_failing"]
+
+
+class _GatedBuffer(IngestBuffer):
+    """Holds every write until `gate` is set"""
+
+    def __init__(self, gate, **kwargs):
+        super().__init__(**kwargs)
+        self.gate = gate
+
+    async def _write(self, rows):
+        await self.gate.wait()
+        await super()._write(rows)
+
+
+def test_ticket_waits_for_a_concurrent_flush(user, habit):
+    async def ingest():
+        gate = asyncio.Event()
+        buffer = _GatedBuffer(gate, flush_rows=1000, use_copy=False)
+        ticket = IngestTicket()
+        await buffer.add(user.id, _rows(user, habit.id, 10), ticket)
+        # A periodic flush takes the rows before the request flushes its own buffer
+        periodic = asyncio.create_task(buffer.flush_all())
+        await asyncio.sleep(0)
+        assert await buffer.flush_user(user.id) == 0
+        waiting = asyncio.create_task(ticket.durable())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        gate.set()
+        durable = await waiting
+        await periodic
+        return durable
+
+    assert asyncio.run(ingest()) is True
+    assert _stored(user) == 10
+
+
+def test_ticket_is_not_durable_when_rows_are_dropped(user, habit):
+    async def ingest():
+        buffer = IngestBuffer(flush_rows=1000, use_copy=False)
+        existing = _rows(user, habit.id, 1)
+        await buffer.add(user.id, existing)
+        await buffer.flush_user(user.id)
+        # The same row again violates the primary key
+        ticket = IngestTicket()
+        await buffer.add(user.id, _rows(user, habit.id, 5) + existing, ticket)
+        await buffer.flush_user(user.id)
+        return await ticket.durable(), ticket
+
+    durable, ticket = asyncio.run(ingest())
+    assert not durable
+    assert (ticket.written, ticket.dropped) == (5, 1)
+
+
+def test_ticket_is_not_durable_when_the_flush_fails(user, habit):
+    class FailingBuffer(IngestBuffer):
+        async def _write(self, rows):
+            raise OperationalError("INSERT", {}, Exception("database is down"))
+
+    async def ingest():
+        buffer = FailingBuffer(flush_rows=1000, use_copy=False)
+        ticket = IngestTicket()
+        await buffer.add(user.id, _rows(user, habit.id, 3), ticket)
+        await buffer.flush_user(user.id)
+        return await ticket.durable(), buffer.stats()
+
+    durable, stats = asyncio.run(ingest())
+    assert not durable
+    assert stats["buffered_rows"] == 3 and stats["flushes_failing"]
+
+
+def test_sync_ingest_reports_durable_rows(client, auth_headers, user, habit):
+    lines = [
+        f'{{"habit_id": "{habit_id}", "source": "watch", "metric_name": "steps", "value": 5, "timestamp": "2024-01-01T00:0{minute}:00Z"}}'
+        for minute, habit_id in enumerate([habit.id, habit.id, uuid.uuid4()])
+    ]
+    response = client.post(
+        "/habit-data/ingest",
+        params={"sync": "true"},
+        content="\n".join(lines).encode(),
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 202, response.text
+    body = response.json()
+    assert (body["accepted"], body["rejected"], body["durable"]) == (2, 1, True)
+    assert _stored(user) == 2
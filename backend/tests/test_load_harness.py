@@ -0,0 +1,11 @@
+from benchmarks.load import failed_operations
+
+
+def _results(**operations):
+    return {"operations": {name: {"requests": requests, "errors": errors} for name, (requests, errors) in operations.items()}}
+
+
+def test_runs_with_errors_or_idle_operations_are_failed():
+    results = _results(list_habits=(1000, 10), create_log=(1000, 11), create_data=(0, 0))
+    assert failed_operations(results, max_error_rate=1) == ["create_log", "create_data"]
+    assert failed_operations(_results(list_habits=(1000, 0)), max_error_rate=1) == []
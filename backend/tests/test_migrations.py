@@ -0,0 +1,90 @@
+import importlib
+import uuid
+from datetime import date, datetime, timezone
+
+from sqlalchemy import create_engine, inspect, text
+
+from app.migrations import run_migrations
+from app.migrations.explain import check_hot_queries
+from app.models.db import Base
+from app.utils.database import engine
+
+
+def test_replay_builds_each_version_then_the_current_schema(tmp_path):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'replay.db'}")
+
+    run_migrations(fresh, target=1)
+    inspector = inspect(fresh)
+    # 0001 is the baseline only: later columns and indexes arrive with their own migrations
+    assert "idempotency_key" not in {column["name"] for column in inspector.get_columns("habit_logs")}
+    assert not inspector.get_indexes("habit_logs")
+    assert not inspector.has_table("change_log")
+
+    run_migrations(fresh)
+    inspector = inspect(fresh)
+    for table in Base.metadata.sorted_tables:
+        assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys()), table.name
+        expected_indexes = {index.name for index in table.indexes}
+        assert expected_indexes <= {index["name"] for index in inspector.get_indexes(table.name)}, table.name
+    fresh.dispose()
+
+
+def test_hot_queries_use_their_indexes():
+    with engine.connect() as connection:
+        checks = check_hot_queries(connection)
+    missing = [(check.description, check.plan) for check in checks if not check.uses_index]
+    assert not missing
+
+
+def test_rollup_migrations_backfill_existing_rows(tmp_path):
+    baseline = importlib.import_module("app.migrations.versions.0001_initial_schema")
+    fresh = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    run_migrations(fresh, target=2)
+
+    user_id, habit_id = uuid.uuid4(), uuid.uuid4()
+    with fresh.begin() as connection:
+        connection.execute(baseline.profiles.insert().values(id=user_id))
+        connection.execute(baseline.habits.insert().values(id=habit_id, user_id=user_id, name="Run", category="manual"))
+        connection.execute(baseline.habit_logs.insert(), [
+            {"id": uuid.uuid4(), "habit_id": habit_id, "user_id": user_id, "date": date(2024, 1, 1), "duration": 600, "status": "completed"},
+            {"id": uuid.uuid4(), "habit_id": habit_id, "user_id": user_id, "date": date(2024, 1, 1), "duration": 300, "status": "skipped"},
+        ])
+        connection.execute(baseline.habit_data_integrations.insert(), [
+            {"id": uuid.uuid4(), "user_id": user_id, "source": "test", "metric_name": "steps", "value": value,
+             "timestamp": datetime(2024, 1, 1, 8, minute, tzinfo=timezone.utc)}
+            for minute, value in ((0, 100), (30, 300))
+        ])
+
+    run_migrations(fresh)
+    with fresh.connect() as connection:
+        rollup = connection.execute(text("SELECT log_count, completed_count, total_duration FROM habit_daily_rollups")).one()
+        assert tuple(rollup) == (2, 1, 600)
+        buckets = connection.execute(text(
+            "SELECT resolution, sample_count, value_sum, value_min, value_max FROM habit_data_rollups ORDER BY resolution"
+        )).all()
+        assert [tuple(bucket) for bucket in buckets] == [("day", 2, 400, 100, 300), ("hour", 2, 400, 100, 300)]
+        seeded = connection.execute(text("SELECT entity, count(*) FROM change_log GROUP BY entity ORDER BY entity")).all()
+        assert [tuple(row) for row in seeded] == [("habit", 1), ("habit_log", 2)]
+    fresh.dispose()
+
+
+def test_change_log_rebuild_keeps_rows_and_never_reuses_a_seq(tmp_path):
+    previous = importlib.import_module("app.migrations.versions.0007_change_log")
+    fresh = create_engine(f"sqlite:///{tmp_path / 'change_log.db'}")
+    run_migrations(fresh, target=9)
+
+    user_id = uuid.uuid4()
+    with fresh.begin() as connection:
+        connection.execute(text("INSERT INTO profiles (id) VALUES (:id)"), {"id": user_id.hex})
+        connection.execute(previous.change_log.insert(), [
+            {"user_id": user_id, "entity": "habit", "entity_id": uuid.uuid4(), "op": "upsert"} for _ in range(3)
+        ])
+
+    run_migrations(fresh)
+    with fresh.begin() as connection:
+        assert connection.execute(text("SELECT seq FROM change_log ORDER BY seq")).scalars().all() == [1, 2, 3]
+        # Replace the newest change, as record_changes does
+        connection.execute(text("DELETE FROM change_log WHERE seq = 3"))
+        connection.execute(previous.change_log.insert().values(user_id=user_id, entity="habit", entity_id=uuid.uuid4(), op="upsert"))
+        assert connection.execute(text("SELECT max(seq) FROM change_log")).scalar() == 4
+    fresh.dispose()
@@ -0,0 +1,112 @@
+from datetime import date
+
+from app.utils.palette_search import PaletteEntry, PaletteIndex
+
+
+def _create(client, auth_headers, name, category="manual"):
+    response = client.post("/habits/", json={"name": name, "category": category}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _search(client, auth_headers, q, **params):
+    response = client.get("/palette/search", params={"q": q, **params}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return [item["name"] for item in response.json()]
+
+
+def test_ranking_prefers_closer_matches_then_usage():
+    index = PaletteIndex([
+        PaletteEntry("1", "Read a book"),
+        PaletteEntry("2", "Reading log", usage_count=50),
+        PaletteEntry("3", "Breathing", usage_count=50),
+        PaletteEntry("4", "Meditation"),
+    ])
+    assert [entry.id for _, entry in index.search("read")] == ["2", "1"]
+    assert [entry.id for _, entry in index.search("meditaton")] == ["4"]
+    assert [entry.id for _, entry in index.search("r")][:2] == ["2", "1"]
+
+
+def test_search_finds_the_users_habits(client, auth_headers):
+    _create(client, auth_headers, "Morning run")
+    _create(client, auth_headers, "Meditation")
+    _create(client, auth_headers, "Sleep", "wearable")
+
+    assert _search(client, auth_headers, "medit") == ["Meditation"]
+    assert _search(client, auth_headers, "runing") == ["Morning run"]
+    # Categories are not searchable text: "m" is a prefix of "manual" but only matches names
+    assert sorted(_search(client, auth_headers, "m")) == ["Meditation", "Morning run"]
+    assert _search(client, auth_headers, "w") == []
+    assert len(_search(client, auth_headers, "", limit=2)) == 2
+
+
+def test_completed_habits_rank_first(client, auth_headers):
+    _create(client, auth_headers, "Stretch")
+    stretch_daily = _create(client, auth_headers, "Stretch daily")
+    response = client.post(
+        "/habit-logs/",
+        json={"habit_id": stretch_daily["id"], "date": date.today().isoformat(), "status": "completed"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    # A new habit rebuilds the index, picking up the completion
+    _create(client, auth_headers, "Journal")
+
+    assert _search(client, auth_headers, "")[0] == "Stretch daily"
+
+
+def test_habit_writes_rebuild_the_index(client, auth_headers):
+    habit = _create(client, auth_headers, "Swim")
+    assert _search(client, auth_headers, "swim") == ["Swim"]
+
+    response = client.put(f"/habits/{habit['id']}", json={"name": "Cycle"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert _search(client, auth_headers, "swim") == []
+    assert _search(client, auth_headers, "cycle") == ["Cycle"]
+
+    assert client.delete(f"/habits/{habit['id']}", headers=auth_headers).status_code == 204
+    assert _search(client, auth_headers, "cycle") == []
+
+
+def _queries(response) -> int:
+    db_timing = response.headers["server-timing"].split(",")[0]
+    return int(db_timing.split('desc="')[1].split()[0])
+
+
+def test_palette_is_grouped_by_category(client, auth_headers):
+    _create(client, auth_headers, "walk")
+    _create(client, auth_headers, "Sleep", "wearable")
+    _create(client, auth_headers, "Journal")
+
+    response = client.get("/palette/", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    habits = response.json()["habits"]
+    assert [item["name"] for item in habits["manual"]] == ["Journal", "walk"]
+    assert [item["name"] for item in habits["wearable"]] == ["Sleep"]
+
+
+def test_unchanged_palette_is_served_from_the_snapshot(client, auth_headers):
+    _create(client, auth_headers, "Read")
+    first = client.get("/palette/", headers=auth_headers)
+    assert first.status_code == 200
+    assert first.headers["etag"] != client.get("/habits/", headers=auth_headers).headers["etag"]
+
+    again = client.get("/palette/", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert _queries(again) == 0
+
+    # Another device without the ETag gets the cached bytes, still without SQL
+    other = client.get("/palette/", headers=auth_headers)
+    assert other.content == first.content
+    assert _queries(other) == 0
+
+
+def test_habit_write_changes_the_palette_etag(client, auth_headers):
+    first = client.get("/palette/", headers=auth_headers)
+    assert first.json() == {"habits": {}}
+    _create(client, auth_headers, "Yoga")
+
+    again = client.get("/palette/", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert again.status_code == 200
+    assert again.headers["etag"] != first.headers["etag"]
+    assert [item["name"] for item in again.json()["habits"]["manual"]] == ["Yoga"]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.utils.database import SessionLocal
+from app.utils.query_stats import QueryBudgetExceeded, QueryStatsMiddleware, get_query_stats, query_budget
+
+app = FastAPI()
+app.add_middleware(QueryStatsMiddleware)
+
+
+def _run_statements(count: int) -> None:
+    with SessionLocal() as db:
+        for _ in range(count):
+            db.execute(text("SELECT 1"))
+
+
+@app.get("/within")
+@query_budget(2)
+def within_budget():
+    _run_statements(2)
+    return {}
+
+
+@app.get("/over")
+@query_budget(2)
+def over_budget():
+    _run_statements(3)
+    return {}
+
+
+def test_route_within_its_budget_passes():
+    with TestClient(app) as client:
+        response = client.get("/within")
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+
+
+def test_going_over_the_budget_fails_in_enforce_mode():
+    violations = get_query_stats()["budget_violations"]
+    with TestClient(app) as client, pytest.raises(QueryBudgetExceeded, match="issued 3 SQL statements, budget is 2"):
+        client.get("/over")
+    assert get_query_stats()["budget_violations"] == violations + 1
@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from app.models.habit_data_integration import HabitDataIntegration
+from app.models.habit_data_rollup import HabitDataRollup
+from app.utils.database import SessionLocal
+from app.utils.series import aggregate_samples
+
+SAMPLES = [
+    ("2024-01-01T08:05:00Z", 10),
+    ("2024-01-01T08:55:00Z", 30),
+    ("2024-01-01T09:10:00Z", 5),
+    ("2024-01-02T23:59:00Z", 7),
+]
+
+
+def _post(client, auth_headers, habit, timestamp, value, metric="steps"):
+    response = client.post(
+        "/habit-data/",
+        json={"habit_id": str(habit.id), "source": "watch", "metric_name": metric, "value": value, "timestamp": timestamp},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+
+
+def _series(client, auth_headers, resolution, start="2024-01-01T00:00:00Z", end="2024-01-03T00:00:00Z", metric="steps"):
+    return client.get(
+        "/habit-data/series",
+        params={"metric": metric, "from": start, "to": end, "resolution": resolution},
+        headers=auth_headers,
+    )
+
+
+def test_hourly_and_daily_buckets(client, auth_headers, habit):
+    for timestamp, value in SAMPLES:
+        _post(client, auth_headers, habit, timestamp, value)
+    _post(client, auth_headers, habit, "2024-01-01T08:30:00Z", 1000, metric="calories")
+
+    hourly = _series(client, auth_headers, "hour")
+    assert hourly.status_code == 200, hourly.text
+    body = hourly.json()
+    assert [start[:13] for start in body["bucket_starts"]] == ["2024-01-01T08", "2024-01-01T09", "2024-01-02T23"]
+    assert body["count"] == [2, 1, 1]
+    assert body["sum"] == [40, 5, 7]
+    assert (body["min"][0], body["max"][0], body["mean"][0]) == (10, 30, 20)
+
+    daily = _series(client, auth_headers, "day").json()
+    assert daily["count"] == [3, 1]
+    assert daily["sum"] == [45, 7]
+
+    # `to` is exclusive
+    first_hour = _series(client, auth_headers, "hour", end="2024-01-01T09:00:00Z").json()
+    assert first_hour["count"] == [2]
+
+
+def test_series_rejects_bad_ranges_and_resolutions(client, auth_headers):
+    assert _series(client, auth_headers, "hour", start="2024-01-02T00:00:00Z", end="2024-01-01T00:00:00Z").status_code == 400
+    assert _series(client, auth_headers, "hour", start="2024-01-01T00:00:00Z", end="2024-01-01T00:00:00Z").status_code == 400
+    assert _series(client, auth_headers, "minute").status_code == 400
+
+
+def test_rollups_match_raw_samples_after_posts_and_ingest(client, auth_headers, user, habit):
+    for timestamp, value in SAMPLES[:2]:
+        _post(client, auth_headers, habit, timestamp, value)
+    lines = "\n".join(
+        f'{{"habit_id": "{habit.id}", "source": "watch", "metric_name": "steps", "value": {value}, "timestamp": "{timestamp}"}}'
+        for timestamp, value in SAMPLES[2:] + [("2024-01-01T08:40:00Z", 2.5)]
+    )
+    response = client.post(
+        "/habit-data/ingest",
+        params={"sync": "true"},
+        content=lines.encode(),
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 202 and response.json()["durable"], response.text
+
+    with SessionLocal() as db:
+        raw = db.execute(
+            select(HabitDataIntegration.user_id, HabitDataIntegration.metric_name, HabitDataIntegration.value, HabitDataIntegration.timestamp)
+            .where(HabitDataIntegration.user_id == user.id)
+        ).all()
+        stored = db.execute(select(HabitDataRollup).where(HabitDataRollup.user_id == user.id)).scalars().all()
+        stored = {
+            (rollup.resolution, rollup.bucket_start.replace(tzinfo=timezone.utc)): (rollup.sample_count, rollup.value_sum, rollup.value_min, rollup.value_max)
+            for rollup in stored
+        }
+
+    expected = {
+        (resolution, start): tuple(bucket)
+        for (_, _, resolution, start), bucket in aggregate_samples(raw).items()
+    }
+    assert len(raw) == 5
+    assert stored == expected
+    assert stored[("hour", datetime(2024, 1, 1, 8, tzinfo=timezone.utc))] == (3, Decimal("42.5"), Decimal("2.5"), Decimal("30"))
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date
+
+from app.models.habit_daily_rollup import HabitDailyRollup
+from app.utils.database import AsyncSessionLocal, SessionLocal
+from app.utils.rollups import record_log_change
+from app.utils.streaks import streak_index, streak_scope
+from app.utils.versions import bump_statement
+
+TODAY = date(2024, 3, 10)
+
+
+def _log(client, auth_headers, habit, day, status="completed"):
+    response = client.post(
+        "/habit-logs/",
+        json={"habit_id": str(habit.id), "date": day.isoformat(), "status": status},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _streak(client, auth_headers, habit):
+    response = client.get(f"/habits/{habit.id}/streak", params={"today": TODAY.isoformat()}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()["current_streak"]
+
+
+def test_new_completion_updates_the_cached_bitmap(client, auth_headers, habit):
+    _log(client, auth_headers, habit, date(2024, 3, 9))
+    assert _streak(client, auth_headers, habit) == 1
+
+    _log(client, auth_headers, habit, TODAY)
+    cached = streak_index.get(habit.id, 2)
+    assert cached is not None and TODAY in cached
+    assert _streak(client, auth_headers, habit) == 2
+
+
+def test_rolled_back_log_leaves_the_streak_alone(client, auth_headers, habit):
+    _log(client, auth_headers, habit, date(2024, 3, 9))
+    assert _streak(client, auth_headers, habit) == 1
+
+    async def write_then_roll_back():
+        async with AsyncSessionLocal() as db:
+            snapshot = {"user_id": habit.user_id, "habit_id": habit.id, "date": TODAY, "status": "completed",
+                        "duration": None, "amount": None}
+            await record_log_change(db, None, snapshot)
+            await db.rollback()
+
+    asyncio.run(write_then_roll_back())
+    cached = streak_index.get(habit.id, 1)
+    assert cached is not None and TODAY not in cached
+    assert _streak(client, auth_headers, habit) == 1
+
+
+def test_write_from_another_worker_is_seen(client, auth_headers, habit):
+    _log(client, auth_headers, habit, date(2024, 3, 9))
+    assert _streak(client, auth_headers, habit) == 1
+
+    # What another worker's log write commits: the rollup row and a version bump,
+    # without touching this worker's cache
+    with SessionLocal() as db:
+        db.add(HabitDailyRollup(user_id=habit.user_id, habit_id=habit.id, day=TODAY, log_count=1, completed_count=1))
+        db.execute(bump_statement(db.bind.dialect.name, [streak_scope(habit.id)]))
+        db.commit()
+
+    assert _streak(client, auth_headers, habit) == 2
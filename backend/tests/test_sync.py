@@ -0,0 +1,21 @@
+def _sync(client, auth_headers, since=None):
+    response = client.get("/sync/", params={"since": since} if since else {}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_update_of_the_latest_row_reaches_a_synced_client(client, auth_headers):
+    created = client.post("/habits/", json={"name": "Read", "category": "manual"}, headers=auth_headers)
+    assert created.status_code == 201, created.text
+    habit_id = created.json()["id"]
+    first = _sync(client, auth_headers)
+    assert [habit["id"] for habit in first["habits"]] == [habit_id]
+
+    # The habit's change row is the newest one; replacing it must not reuse its seq
+    updated = client.put(f"/habits/{habit_id}", json={"name": "Read more"}, headers=auth_headers)
+    assert updated.status_code == 200, updated.text
+    second = _sync(client, auth_headers, first["next_cursor"])
+    assert [habit["name"] for habit in second["habits"]] == ["Read more"]
+    assert second["next_cursor"] != first["next_cursor"]
+
+    assert _sync(client, auth_headers, second["next_cursor"])["habits"] == []
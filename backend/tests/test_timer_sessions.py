@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app.models.habit_log import HabitLog
+from app.models.timer_session import TimerSession
+from app.utils.database import SessionLocal
+from app.utils.timers import heartbeat_buffer
+
+START = datetime(2024, 6, 1, 9, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls utcnow() in the timer routes and buffer"""
+    now = [START]
+
+    def advance(seconds):
+        now[0] += timedelta(seconds=seconds)
+
+    monkeypatch.setattr("app.routes.timer_session.utcnow", lambda: now[0])
+    monkeypatch.setattr("app.utils.timers.utcnow", lambda: now[0])
+    return advance
+
+
+def _start(client, auth_headers, habit):
+    response = client.post("/timer-sessions/", json={"habit_id": str(habit.id)}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def _post(client, auth_headers, session_id, action, expected=200, **kwargs):
+    response = client.post(f"/timer-sessions/{session_id}/{action}", headers=auth_headers, **kwargs)
+    assert response.status_code == expected, response.text
+    return response.json() if response.content else None
+
+
+def _stored(session_id):
+    with SessionLocal() as db:
+        return db.get(TimerSession, uuid.UUID(session_id))
+
+
+def test_session_lifecycle_logs_the_timed_duration(client, auth_headers, habit, clock):
+    session_id = _start(client, auth_headers, habit)
+    assert client.post("/timer-sessions/", json={"habit_id": str(habit.id)}, headers=auth_headers).status_code == 409
+
+    clock(60)
+    _post(client, auth_headers, session_id, "heartbeat", 204)
+    clock(60)
+    assert _post(client, auth_headers, session_id, "pause")["elapsed_seconds"] == 120
+    _post(client, auth_headers, session_id, "heartbeat", 409)
+    _post(client, auth_headers, session_id, "pause", 409)
+
+    clock(600)  # Paused time does not count
+    _post(client, auth_headers, session_id, "resume")
+    clock(30)
+    stopped = _post(client, auth_headers, session_id, "stop", json={"notes": "done"})
+    assert (stopped["status"], stopped["elapsed_seconds"]) == ("stopped", 150)
+    # A retried stop returns the same session and logs nothing more
+    assert _post(client, auth_headers, session_id, "stop")["habit_log_id"] == stopped["habit_log_id"]
+
+    with SessionLocal() as db:
+        log = db.get(HabitLog, uuid.UUID(stopped["habit_log_id"]))
+        assert (log.duration, log.status, log.notes) == (150, "completed", "done")
+    assert client.get("/timer-sessions/", headers=auth_headers).json() == []
+
+
+def test_flush_writes_the_latest_heartbeat(client, auth_headers, habit, clock):
+    session_id = _start(client, auth_headers, habit)
+    for _ in range(3):
+        clock(10)
+        _post(client, auth_headers, session_id, "heartbeat", 204)
+
+    assert asyncio.run(heartbeat_buffer.flush()) == 1
+    last_heartbeat = _stored(session_id).last_heartbeat_at.replace(tzinfo=timezone.utc)
+    assert last_heartbeat == START + timedelta(seconds=30)
+
+
+def test_flush_forgets_sessions_paused_by_another_worker(client, auth_headers, habit, clock):
+    session_id = _start(client, auth_headers, habit)
+    # Another worker pauses the session; this worker still has it cached as running
+    with SessionLocal() as db:
+        db.execute(update(TimerSession).where(TimerSession.id == uuid.UUID(session_id)).values(status="paused", segment_started_at=None))
+        db.commit()
+
+    clock(10)
+    _post(client, auth_headers, session_id, "heartbeat", 204)
+    asyncio.run(heartbeat_buffer.flush())
+
+    assert _stored(session_id).last_heartbeat_at.replace(tzinfo=timezone.utc) == START
+    _post(client, auth_headers, session_id, "heartbeat", 409)
@@ -2,10 +2,14 @@
 
 import { useState, useEffect, useRef } from "react"
 import { useHabits } from '@/hooks/useHabits'
+import apiClient from '@/lib/api-client'
 import { Play, Pause, Square } from "lucide-react"
 import { Button } from "@/components/ui/button"
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select"
 
+// Interval between heartbeats for a running server-side timer
+const HEARTBEAT_MS = 15000
+
 export default function TimeTracker() {
   const { habits, logHabitCompletion, loading: habitsLoading } = useHabits();
   const [selectedHabit, setSelectedHabit] = useState<string>("")
@@ -13,6 +17,8 @@ export default function TimeTracker() {
   const [isRunning, setIsRunning] = useState(false)
   const [isPaused, setIsPaused] = useState(false)
   const intervalRef = useRef<NodeJS.Timeout | null>(null)
+  // Server-side session; null if the timer could not be started on the server
+  const [sessionId, setSessionId] = useState<string | null>(null)
 
   const selectedHabitData = habits.find((h) => h.id === selectedHabit)
   // Use a default target of 30 minutes
@@ -37,20 +43,63 @@ export default function TimeTracker() {
     }
   }, [isRunning, isPaused])
 
+  // Restore a timer that was running or paused when the app was closed
+  useEffect(() => {
+    apiClient.timerSessions.getActive()
+      .then((sessions) => {
+        const session = sessions[0]
+        if (!session) return
+        setSessionId(session.id)
+        setSelectedHabit(session.habit_id)
+        setTime(session.elapsed_seconds)
+        setIsRunning(true)
+        setIsPaused(session.status === 'paused')
+      })
+      .catch((err) => console.error('❌ Failed to load active timers:', err))
+  }, [])
+
+  // Heartbeats let the server tell a running timer from an abandoned one
+  useEffect(() => {
+    if (!sessionId || !isRunning || isPaused) return
+    const heartbeat = setInterval(() => {
+      apiClient.timerSessions.heartbeat(sessionId).catch(() => {
+        // Best effort; the next one will try again
+      })
+    }, HEARTBEAT_MS)
+    return () => clearInterval(heartbeat)
+  }, [sessionId, isRunning, isPaused])
+
   const formatTime = (seconds: number) => {
     const mins = Math.floor(seconds / 60)
     const secs = seconds % 60
     return `${mins.toString().padStart(2, "0")}:${secs.toString().padStart(2, "0")}`
   }
 
-  const handleStart = () => {
+  const handleStart = async () => {
     if (!selectedHabit) return
     setIsRunning(true)
     setIsPaused(false)
+    try {
+      const session = await apiClient.timerSessions.start(selectedHabit)
+      setSessionId(session.id)
+    } catch (err) {
+      // Keep timing locally; the session is saved as a plain log on stop
+      console.error('❌ Failed to start server timer:', err)
+    }
   }
 
-  const handlePause = () => {
-    setIsPaused(!isPaused)
+  const handlePause = async () => {
+    const pausing = !isPaused
+    setIsPaused(pausing)
+    if (!sessionId) return
+    try {
+      const session = pausing
+        ? await apiClient.timerSessions.pause(sessionId)
+        : await apiClient.timerSessions.resume(sessionId)
+      setTime(session.elapsed_seconds)
+    } catch (err) {
+      console.error('❌ Failed to update server timer:', err)
+    }
   }
 
   const handleStop = async () => {
@@ -74,9 +123,16 @@ export default function TimeTracker() {
         console.log(`📊 Sending log data to authenticated endpoint:`, logData);
         console.log(`🔍 About to call logHabitCompletion...`);
         
-        // Use the real authenticated endpoint instead of test endpoint
-        const result = await logHabitCompletion(logData);
-        console.log(`🔍 logHabitCompletion result:`, result);
+        if (sessionId) {
+          // The server turns the session into a habit log with its own elapsed time
+          const session = await apiClient.timerSessions.stop(sessionId, { date: logData.date, notes: logData.notes });
+          console.log(`🔍 Timer session stopped, habit log:`, session.habit_log_id);
+          setSessionId(null);
+        } else {
+          // Use the real authenticated endpoint instead of test endpoint
+          const result = await logHabitCompletion(logData);
+          console.log(`🔍 logHabitCompletion result:`, result);
+        }
         
         console.log(`✅ Successfully saved ${formatTime(time)} session for ${selectedHabitData.name}`);
         
@@ -101,11 +157,21 @@ export default function TimeTracker() {
       }
     } else {
       // Reset timer even if no data to save
+      if (sessionId) {
+        apiClient.timerSessions.stop(sessionId, { discard: true }).catch(() => {});
+        setSessionId(null);
+      }
       setTime(0);
     }
   }
 
   const handleReset = () => {
+    if (sessionId) {
+      apiClient.timerSessions.stop(sessionId, { discard: true }).catch((err) => {
+        console.error('❌ Failed to discard server timer:', err)
+      })
+      setSessionId(null)
+    }
     setTime(0)
     setIsRunning(false)
     setIsPaused(false)
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import apiClient from '@/lib/api-client';
 
 export interface Habit {
@@ -27,11 +27,23 @@ export interface HabitLog {
   created_at: string;
 }
 
+// Replace changed rows by id, append new ones and drop deleted ones
+function mergeById<T extends { id: string }>(current: T[], changed: T[], deleted: Set<string>): T[] {
+  const changedById = new Map(changed.map(item => [item.id, item]));
+  const merged = current
+    .filter(item => !deleted.has(item.id))
+    .map(item => changedById.get(item.id) ?? item);
+  const existing = new Set(current.map(item => item.id));
+  return merged.concat(changed.filter(item => !existing.has(item.id)));
+}
+
 export function useHabits() {
   const [habits, setHabits] = useState<Habit[]>([]);
   const [habitLogs, setHabitLogs] = useState<HabitLog[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Position in the server's change feed; only changes after it are fetched
+  const syncCursor = useRef<string | undefined>(undefined);
 
   // Fetch all habits for the current user
   const fetchHabits = async () => {
@@ -61,6 +73,30 @@ export function useHabits() {
     }
   };
 
+  // Apply changes since the last sync instead of re-fetching everything
+  const syncChanges = async () => {
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const changes = await apiClient.sync.getChanges(syncCursor.current);
+        const { habits: changedHabits, habit_logs: changedLogs, deleted_habits, deleted_habit_logs } = changes;
+        const deletedHabits = new Set(deleted_habits);
+        const deletedLogs = new Set(deleted_habit_logs);
+        
+        setHabits(prev => mergeById(prev, changedHabits as Habit[], deletedHabits));
+        setHabitLogs(prev => mergeById(prev, changedLogs as HabitLog[], deletedLogs)
+          .filter(log => !deletedHabits.has(log.habit_id)));
+        syncCursor.current = changes.next_cursor;
+        hasMore = changes.has_more;
+      }
+    } catch (err) {
+      console.error('Error syncing habits:', err);
+      setError('Failed to sync habits');
+    } finally {
+      setLoading(false);
+    }
+  };
+
   // Create a new habit
   const createHabit = async (habitData: {
     name: string;
@@ -207,9 +243,20 @@ export function useHabits() {
     return streak;
   };
 
-  // Load habits on mount
+  // Load habits and logs on mount, then catch up whenever a timer saves a session
+  // or the server reports a change made elsewhere (another device, the native widget)
   useEffect(() => {
-    fetchHabits();
+    syncChanges();
+    
+    const handleTimerUpdate = () => {
+      syncChanges();
+    };
+    window.addEventListener('ritual-timer-updated', handleTimerUpdate);
+    const unsubscribe = apiClient.events.subscribe(() => syncChanges());
+    return () => {
+      window.removeEventListener('ritual-timer-updated', handleTimerUpdate);
+      unsubscribe();
+    };
   }, []);
 
   return {
@@ -219,6 +266,7 @@ export function useHabits() {
     error,
     fetchHabits,
     fetchHabitLogs,
+    syncChanges,
     createHabit,
     updateHabit,
     deleteHabit,
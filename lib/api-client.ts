@@ -35,6 +35,48 @@ const createRequest = async (
   return fetch(url, config)
 }
 
+// Last ETag and body per GET url, so unchanged listings come back as an empty 304
+const ETAG_CACHE_SIZE = 100
+const etagCache = new Map<string, { etag: string; body: unknown }>()
+
+/**
+ * Decodes a base64 heatmap grid into one value per day (index 0 = January 1st).
+ */
+export const decodeHeatmapGrid = (data: string, encoding: 'rle' | 'raw'): Uint8Array => {
+  const bytes = Uint8Array.from(atob(data), (c) => c.charCodeAt(0))
+  if (encoding === 'raw') {
+    return bytes
+  }
+
+  // RLE: (run length, value) byte pairs
+  let length = 0
+  for (let i = 0; i < bytes.length; i += 2) {
+    length += bytes[i]
+  }
+  const days = new Uint8Array(length)
+  let offset = 0
+  for (let i = 0; i < bytes.length; i += 2) {
+    days.fill(bytes[i + 1], offset, offset + bytes[i])
+    offset += bytes[i]
+  }
+  return days
+}
+
+/**
+ * A server-side timer; elapsed_seconds is computed by the server at response time.
+ */
+export interface TimerSession {
+  id: string
+  habit_id: string
+  status: 'running' | 'paused' | 'stopped'
+  started_at: string
+  elapsed_seconds: number
+  last_heartbeat_at: string | null
+  ended_at: string | null
+  habit_log_id: string | null
+  notes: string | null
+}
+
 /**
  * API client for the Ritual backend.
  */
@@ -60,13 +102,27 @@ const apiClient = {
       }
     }
     
-    const response = await createRequest(url)
+    const cached = etagCache.get(url)
+    const response = await createRequest(url, cached ? { headers: { 'If-None-Match': cached.etag } } : {})
     
+    if (response.status === 304 && cached) {
+      return cached.body as T
+    }
     if (!response.ok) {
       throw new Error(`API error: ${response.status} ${response.statusText}`)
     }
     
-    return response.json()
+    const body = await response.json()
+    const etag = response.headers.get('ETag')
+    if (etag) {
+      // Re-insert so the Map's order stays least recently stored first
+      etagCache.delete(url)
+      etagCache.set(url, { etag, body })
+      if (etagCache.size > ETAG_CACHE_SIZE) {
+        etagCache.delete(etagCache.keys().next().value as string)
+      }
+    }
+    return body
   },
   
   /**
@@ -183,9 +239,9 @@ const apiClient = {
   // Habit logs specific API methods
   habitLogs: {
     /**
-     * Get all habit logs with optional filtering.
+     * Get one page of habit logs (newest first) with optional filtering.
      */
-    async getAll(habitId?: string, startDate?: string, endDate?: string) {
+    async getPage(habitId?: string, startDate?: string, endDate?: string, cursor?: string, limit?: number) {
       const queryParams: Record<string, string> = {}
       
       if (habitId) {
@@ -197,8 +253,53 @@ const apiClient = {
       if (endDate) {
         queryParams.end_date = endDate
       }
+      if (cursor) {
+        queryParams.cursor = cursor
+      }
+      if (limit) {
+        queryParams.limit = String(limit)
+      }
       
-      return apiClient.get('/habit-logs', queryParams)
+      return apiClient.get<{ items: any[]; next_cursor: string | null }>('/habit-logs', queryParams)
+    },
+
+    /**
+     * Get all habit logs with optional filtering, following pagination cursors.
+     */
+    async getAll(habitId?: string, startDate?: string, endDate?: string) {
+      const logs: any[] = []
+      let cursor: string | undefined
+      
+      do {
+        const page = await apiClient.habitLogs.getPage(habitId, startDate, endDate, cursor, 500)
+        logs.push(...page.items)
+        cursor = page.next_cursor ?? undefined
+      } while (cursor)
+      
+      return logs
+    },
+
+    /**
+     * Get per-day completion counts for a year, one decoded array per habit.
+     */
+    async getHeatmap(year: number, habitId?: string) {
+      const queryParams: Record<string, string> = { year: String(year) }
+      
+      if (habitId) {
+        queryParams.habit_id = habitId
+      }
+      
+      const heatmap = await apiClient.get<{
+        year: number
+        days: number
+        encoding: 'rle' | 'raw'
+        habits: { habit_id: string; data: string }[]
+      }>('/habit-logs/heatmap', queryParams)
+      
+      return heatmap.habits.map(({ habit_id, data }) => ({
+        habitId: habit_id,
+        days: decodeHeatmapGrid(data, heatmap.encoding),
+      }))
     },
 
     /**
@@ -223,6 +324,118 @@ const apiClient = {
     },
   },
 
+  // Delta sync API methods
+  sync: {
+    /**
+     * Get habits and habit logs changed since a cursor (omit it for a full sync).
+     * Call again with next_cursor while has_more is true.
+     */
+    async getChanges(since?: string) {
+      const queryParams: Record<string, string> = {}
+      
+      if (since) {
+        queryParams.since = since
+      }
+      
+      return apiClient.get<{
+        habits: any[]
+        habit_logs: any[]
+        deleted_habits: string[]
+        deleted_habit_logs: string[]
+        next_cursor: string
+        has_more: boolean
+      }>('/sync', queryParams)
+    },
+  },
+
+  // Timer session API methods
+  timerSessions: {
+    /**
+     * Get the user's running and paused timers.
+     */
+    async getActive() {
+      return apiClient.get<TimerSession[]>('/timer-sessions')
+    },
+
+    /**
+     * Start a timer for a habit.
+     */
+    async start(habitId: string, notes?: string) {
+      return apiClient.post<TimerSession>('/timer-sessions', { habit_id: habitId, notes })
+    },
+
+    /**
+     * Tell the server a running timer is still alive (send every ~15s).
+     */
+    async heartbeat(sessionId: string) {
+      const response = await createRequest(`/timer-sessions/${sessionId}/heartbeat`, { method: 'POST' })
+      if (!response.ok) {
+        throw new Error(`API error: ${response.status} ${response.statusText}`)
+      }
+    },
+
+    async pause(sessionId: string) {
+      return apiClient.post<TimerSession>(`/timer-sessions/${sessionId}/pause`, {})
+    },
+
+    async resume(sessionId: string) {
+      return apiClient.post<TimerSession>(`/timer-sessions/${sessionId}/resume`, {})
+    },
+
+    /**
+     * Stop a timer; the server records it as a habit log (habit_log_id in the response).
+     */
+    async stop(sessionId: string, options: { date?: string; notes?: string; discard?: boolean } = {}) {
+      return apiClient.post<TimerSession>(`/timer-sessions/${sessionId}/stop`, options)
+    },
+  },
+
+  // Server-sent events
+  events: {
+    /**
+     * Listen for changes to the user's habits and habit logs. `onChange` fires for
+     * every change (and for `resync`, when events were dropped); the caller should
+     * catch up with sync.getChanges(). `onStatus` reports whether the stream is open,
+     * so callers can fall back to polling while it is not. Returns an unsubscribe function.
+     */
+    subscribe(onChange: (event: { type: string; entity?: string; op?: string; ids?: string[] }) => void, onStatus?: (open: boolean) => void) {
+      let source: EventSource | null = null
+      let retryTimer: ReturnType<typeof setTimeout> | null = null
+      let closed = false
+
+      const connect = async () => {
+        // EventSource cannot send headers, so the token goes in the query string;
+        // a fresh one is read on every (re)connect in case the old one expired
+        const { data: { session } } = await supabase.auth.getSession()
+        if (closed || !session?.access_token) {
+          return
+        }
+        source = new EventSource(`${API_BASE_URL}/events/?access_token=${encodeURIComponent(session.access_token)}`)
+        source.onopen = () => onStatus?.(true)
+        const handle = (message: MessageEvent) => onChange(JSON.parse(message.data))
+        source.addEventListener('change', handle as EventListener)
+        source.addEventListener('resync', handle as EventListener)
+        source.onerror = () => {
+          onStatus?.(false)
+          // EventSource retries network errors itself, but gives up on HTTP errors (e.g. 401)
+          if (source?.readyState === EventSource.CLOSED && !closed) {
+            source = null
+            retryTimer = setTimeout(connect, 5000)
+          }
+        }
+      }
+
+      connect()
+      return () => {
+        closed = true
+        if (retryTimer) {
+          clearTimeout(retryTimer)
+        }
+        source?.close()
+      }
+    },
+  },
+
   // User specific API methods
   users: {
     /**